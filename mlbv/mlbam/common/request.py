@@ -4,13 +4,34 @@ Handle HTTP requests
 This is a small wrapper around requests/json, with support for some very rudimentary caching.
 """
 
+import atexit
+import collections
+import concurrent.futures
+import gzip
+import hashlib
 import json
 import logging
+import lzma
+import marshal
 import os
+import random
+import re
+import sqlite3
 import sys
+import threading
 import time
+import urllib.parse
+
+try:
+    import fcntl
+except ImportError:  # windows: no cross-process rate limiting
+    fcntl = None
+
+from datetime import datetime
+from datetime import timezone
 
 import requests
+import requests.adapters
 
 import mlbv.mlbam.common.config as config
 import mlbv.mlbam.common.util as util
@@ -18,8 +39,35 @@ import mlbv.mlbam.common.util as util
 
 LOG = logging.getLogger(__name__)
 
-CACHE = dict()
-MAX_CACHE_FILENAME_LEN = 250
+
+class MemoryCache:
+    """The in-memory cache of parsed responses for this run, safe to share between threads."""
+
+    def __init__(self):
+        self.entries = dict()
+        self.lock = threading.Lock()
+
+    def get(self, cache_key):
+        with self.lock:
+            return self.entries.get(cache_key)
+
+    def put(self, cache_key, json_data):
+        with self.lock:
+            self.entries[cache_key] = json_data
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+CACHE = MemoryCache()
+
+# Cache keys are '<prefix>-<hash>', where the prefix is the (readable) output_filename
+# given by the caller, and the hash is taken from the normalized url. Files are
+# stored in subdirectories named after the first characters of the hash.
+MAX_CACHE_PREFIX_LEN = 48
+CACHE_KEY_HASH_LEN = 20
+CACHE_SHARD_LEN = 2
 
 # These values are used to control the stale times on cached data.
 # Values in seconds:
@@ -29,6 +77,96 @@ CACHE_HOUR = 60 * 60
 CACHE_DAY = 24 * CACHE_HOUR
 CACHE_FOREVER = sys.maxsize
 
+# TTL classes, used to pick the stale time based on the content of a response
+# rather than a fixed per-call value. See get_schedule_ttl_class().
+TTL_FINAL = "final"  # all games are complete, and have settled (see _is_settled)
+TTL_PAST = "past"  # games gone by, but not settled or not complete (e.g. postponed)
+TTL_EMPTY = "empty"  # no games (yet): off-days, unpublished dates
+TTL_LIVE = "live"  # one or more games in progress
+TTL_PREVIEW = "preview"  # games not started yet
+
+# Stale time for each TTL class, can be overridden in config via cache_ttl_policy.
+# Values are in seconds, or one of: forever, never, start (until the first game starts)
+DEFAULT_TTL_POLICY = {
+    TTL_FINAL: "forever",
+    TTL_PAST: str(CACHE_HOUR),
+    TTL_EMPTY: str(CACHE_HOUR),
+    TTL_LIVE: str(CACHE_SHORT),
+    TTL_PREVIEW: "start",
+}
+
+# Connection pooling defaults, can be overridden in config via
+# http_pool_connections, http_pool_maxsize and http_keepalive
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 16
+
+# Number of worker threads for request_json_many (config: http_max_workers).
+# This should not exceed the pool maxsize, otherwise connections are discarded.
+DEFAULT_MAX_WORKERS = 8
+
+# Cache size limits, can be overridden in config via cache_max_bytes and cache_max_entries
+DEFAULT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_CACHE_MAX_ENTRIES = 5000
+CACHE_FILE_SUFFIXES = (".json", ".meta", ".bin")
+
+# The binary cache holds a marshal'd copy of the parsed json, which loads several
+# times faster than json. It is tied to the python version which wrote it.
+# Disable via config: cache_binary=false
+BINARY_CACHE_HEADER = b"MLBVBIN" + bytes((1, sys.version_info[0], sys.version_info[1]))
+
+SQLITE_TIMEOUT_SECS = 30
+
+# Cached bodies can be stored compressed, via config: cache_compression=none|gzip|lzma
+# The format is detected from the header on reading, so the setting can be changed freely.
+COMPRESSION_HEADERS = {"gzip": b"\x1f\x8b", "lzma": b"\xfd7zXZ\x00"}
+GZIP_COMPRESSLEVEL = 6
+
+CACHE_STORE = None  # see _get_cache_store()
+CACHEDIR = None  # see _get_cachedir()
+CACHEDIR_PRIVATE = False  # only a private cache directory is trusted with marshal data
+CACHE_SHARDS = set()  # shard directories known to exist
+
+SESSION = None  # the shared requests.Session, see _get_session()
+SESSION_LOCK = threading.Lock()
+STATS = {"requests": 0}
+STATS_LOCK = threading.Lock()
+
+# Request timeouts and retries, config: http_connect_timeout, http_read_timeout (secs),
+# http_retries (attempts after the first) and http_retry_backoff (secs, doubled per retry)
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 20.0
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 0.5
+MAX_RETRY_BACKOFF = 10.0
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Hedged requests (config: http_hedge=true): if a request has not completed after the
+# p95 of recent request times, a duplicate is sent and whichever finishes first is used.
+# Until enough timings are recorded the delay is http_hedge_delay (secs).
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_HEDGE_DELAY = 0.05
+HEDGE_MIN_SAMPLES = 20
+LATENCIES = collections.deque(maxlen=200)  # recent request times, in secs
+HEDGE_EXECUTOR = None  # see _get_hedge_executor()
+
+# Client-side rate limiting, per host. Config http_rate_limit is a comma-separated list
+# of host:requests-per-second ('*' for any other host, 0 for unlimited), and
+# http_rate_burst is the number of requests which may be sent at once.
+# With http_rate_limit_shared=true the limit is shared by all mlbv processes.
+DEFAULT_RATE_LIMIT = "*:20"
+DEFAULT_RATE_BURST = 10
+RATE_LIMITERS = dict()  # host -> TokenBucket, see _get_rate_limiter()
+
+# Stale-while-revalidate (config: cache=swr): stale entries are returned immediately and
+# refreshed in the background, unless older than cache_swr_max_age seconds.
+DEFAULT_SWR_MAX_AGE = CACHE_DAY
+REFRESHES = dict()  # cache_key -> background refresh thread
+REFRESHES_LOCK = threading.Lock()
+
+# Requests in progress, so that concurrent requests for the same data share one fetch
+INFLIGHT = dict()  # cache key (or url) -> concurrent.futures.Future
+INFLIGHT_LOCK = threading.Lock()
+
 
 def _get_cache_stale_secs(cache_stale=None):
     # overrides config
@@ -42,51 +180,1446 @@ def _get_cache_stale_secs(cache_stale=None):
     return cache_stale
 
 
+def _get_swr_max_age():
+    """Returns the maximum age in seconds of a stale entry which may be served while it is
+    refreshed in the background, or 0 if stale-while-revalidate is not enabled."""
+    if config.CONFIG.parser.get("cache", "normal") != "swr":
+        return 0
+    return config.CONFIG.parser.getint("cache_swr_max_age", DEFAULT_SWR_MAX_AGE)
+
+
+def _get_ttl_policy():
+    """Returns the TTL policy table, the defaults updated from the cache_ttl_policy config.
+    Config format is a comma-separated list of class:value, e.g. 'live:30,preview:3600'"""
+    policy = dict(DEFAULT_TTL_POLICY)
+    for entry in util.get_csv_list(config.CONFIG.parser.get("cache_ttl_policy", "")):
+        if entry:
+            ttl_class, _, value = entry.partition(":")
+            policy[ttl_class.strip()] = value.strip()
+    return policy
+
+
+def _get_policy_stale_secs(ttl_class, start_time, fetch_time, cache_stale):
+    """Returns the stale time in seconds for a response of the given TTL class.
+    start_time is the epoch time of the first game (used by the 'start' policy),
+    fetch_time is the epoch time the response was retrieved.
+    Falls back to cache_stale if the class has no usable policy.
+    """
+    value = _get_ttl_policy().get(ttl_class)
+    if value is None:
+        return cache_stale
+    if value == "forever":
+        return CACHE_FOREVER
+    if value == "never":
+        return CACHE_NEVER
+    if value == "start":
+        if start_time is None:
+            return cache_stale
+        return max(int(start_time - fetch_time), 0)
+    try:
+        return int(value)
+    except ValueError:
+        LOG.warning("Invalid cache_ttl_policy value for %s: %s", ttl_class, value)
+        return cache_stale
+
+
+def _parse_game_time(game_date):
+    try:
+        return (
+            datetime.strptime(game_date, "%Y-%m-%dT%H:%M:%SZ")
+            .replace(tzinfo=timezone.utc)
+            .timestamp()
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_settled(date_str):
+    """Returns True if the games of the date have had time to settle: the date is
+    before yesterday (local time), so that games are at least a day or so old."""
+    yesterday = time.strftime("%Y-%m-%d", time.localtime(time.time() - CACHE_DAY))
+    return date_str < yesterday
+
+
+def get_schedule_ttl_class(json_data):
+    """TTL policy for schedule responses. Returns a (ttl_class, start_time) tuple.
+
+    - no games: empty (games can still be added, e.g. makeup games)
+    - any game in progress: live
+    - every game complete, on dates before yesterday: final
+    - every game complete, or dates before today: past
+    - otherwise: preview, with start_time the earliest start of a game not yet begun
+    Only final schedules are cached for good by default. Recently completed games
+    are past until they have settled, as their recaps, condensed games and archive
+    media are posted minutes to hours after the final out.
+    """
+    today = time.strftime("%Y-%m-%d")
+    has_games = False
+    all_past = True
+    all_final = True
+    all_settled = True
+    start_time = None
+    for date_rec in json_data.get("dates") or ():
+        if date_rec.get("date", today) >= today:
+            all_past = False
+        if not _is_settled(date_rec.get("date", today)):
+            all_settled = False
+        for game in date_rec.get("games", ()):
+            has_games = True
+            state = game.get("status", {}).get("abstractGameState")
+            if state == "Live":
+                return TTL_LIVE, None
+            if state != "Final":
+                all_final = False
+                game_time = _parse_game_time(game.get("gameDate"))
+                if game_time is not None and (
+                    start_time is None or game_time < start_time
+                ):
+                    start_time = game_time
+    if not has_games:
+        return TTL_EMPTY, None
+    if all_final and all_settled:
+        return TTL_FINAL, None
+    if all_final or all_past:
+        return TTL_PAST, None
+    return TTL_PREVIEW, start_time
+
+
+def get_game_ttl_policy(abstract_game_state, game_datetime=None):
+    """Returns a TTL policy function for a single game's data (e.g. boxscore),
+    for responses which do not include the game state themselves. A final game is
+    past until it has settled (see get_schedule_ttl_class), or if its date is not
+    known."""
+    ttl_class = {"Final": TTL_FINAL, "Live": TTL_LIVE}.get(
+        abstract_game_state, TTL_PREVIEW
+    )
+    if ttl_class == TTL_FINAL and (
+        game_datetime is None
+        or not _is_settled(game_datetime.astimezone().strftime("%Y-%m-%d"))
+    ):
+        ttl_class = TTL_PAST
+    start_time = None
+    if game_datetime is not None:
+        start_time = game_datetime.timestamp()
+
+    def ttl_policy(_):
+        return ttl_class, start_time
+
+    return ttl_policy
+
+
 def _get_cachedir():
-    cachedir = os.path.join(util.get_tempdir(), "cache")
-    if not os.path.exists(cachedir):
-        LOG.debug("Creating cache directory: " + cachedir)
-    if not os.path.exists(cachedir):
-        os.makedirs(cachedir)
-    return cachedir
+    global CACHEDIR, CACHEDIR_PRIVATE
+    if CACHEDIR is None:
+        cachedir = os.path.join(util.get_tempdir(), "cache")
+        if not os.path.exists(cachedir):
+            LOG.debug("Creating cache directory: " + cachedir)
+            os.makedirs(cachedir, mode=0o700, exist_ok=True)
+        CACHEDIR_PRIVATE = _is_private_dir(cachedir)
+        if not CACHEDIR_PRIVATE and config.CONFIG.parser.getboolean(
+            "cache_binary", True
+        ):
+            LOG.warning(
+                "Cache directory %s is not private, not using the binary cache",
+                cachedir,
+            )
+        CACHEDIR = cachedir
+    return CACHEDIR
+
+
+def _is_private_dir(path):
+    """Returns True if path is owned by the current user and nobody else can write to it.
+    The cache directory defaults to the shared tempdir, so other users could otherwise plant
+    binary cache files there for marshal to load."""
+    if not hasattr(os, "getuid"):
+        return True  # no posix ownership (windows): the tempdir is per-user
+    stat = os.stat(path)
+    if stat.st_uid != os.getuid():
+        return False
+    if stat.st_mode & 0o022:
+        try:
+            os.chmod(path, 0o700)
+        except OSError:
+            return False
+    return True
+
+
+def _normalize_url(url):
+    """Returns the url with lower-cased scheme/host and sorted query parameters,
+    so that equivalent urls map to the same cache key."""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(
+        sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)),
+        safe="[](),",
+    )
+    return urllib.parse.urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), parts.path, query, "")
+    )
+
+
+def get_projected_url(url, fields):
+    """Returns url with a statsapi 'fields' parameter, so that only the given fields are
+    included in the response. Field names match at any depth in the document, so the names
+    of the enclosing objects and lists must be included too.
+    Each projection is cached separately, as the url differs.
+    Can be disabled via config: api_fields=false
+    """
+    if not fields or not config.CONFIG.parser.getboolean("api_fields", True):
+        return url
+    return "{}{}fields={}".format(
+        url, "&" if "?" in url else "?", ",".join(sorted(set(fields)))
+    )
+
+
+def _get_cache_key(url, output_filename):
+    """Returns the cache key for a request, or None if output_filename is not given."""
+    if output_filename is None:
+        return None
+    url_hash = hashlib.sha1(_normalize_url(url).encode("utf-8")).hexdigest()
+    prefix = re.sub(r"[^\w.,\-]", "_", output_filename)[:MAX_CACHE_PREFIX_LEN]
+    return "{}-{}".format(prefix, url_hash[:CACHE_KEY_HASH_LEN])
+
+
+def _get_cache_file(cache_key, suffix=".json"):
+    shard = cache_key[-CACHE_KEY_HASH_LEN:][:CACHE_SHARD_LEN]
+    if shard not in CACHE_SHARDS:
+        os.makedirs(os.path.join(_get_cachedir(), shard), exist_ok=True)
+        CACHE_SHARDS.add(shard)
+    return os.path.join(_get_cachedir(), shard, cache_key + suffix)
+
+
+class CacheIndex:
+    """Tracks the size and last access time of each cache entry.
+
+    The index is kept in memory while running and merged back into the index file on
+    exit, at which point the least recently used entries are evicted if the cache is
+    over its configured limits (cache_max_bytes, cache_max_entries).
+    Access times are only kept to within ATIME_RESOLUTION, so that a run which just
+    reads fresh entries does not rewrite the index file.
+    """
+
+    INDEX_FILENAME = "index.json"
+    ATIME_RESOLUTION = CACHE_HOUR
+
+    def __init__(self, cachedir):
+        self.cachedir = cachedir
+        self.index_file = os.path.join(cachedir, self.INDEX_FILENAME)
+        # name -> {'size': bytes, 'raw': uncompressed bytes, 'atime': epoch secs}
+        self.entries = None
+        self.updated = dict()  # entries changed by this process
+        self.removed = set()
+        self.lock = threading.Lock()
+
+    def _read_index_file(self):
+        if not os.path.exists(self.index_file):
+            return dict()
+        try:
+            with open(self.index_file) as ifh:
+                return json.load(ifh)["entries"]
+        except (OSError, ValueError, KeyError):
+            LOG.warning("Ignoring corrupt cache index: %s", self.index_file)
+            return dict()
+
+    def _get_entries(self):
+        if self.entries is None:
+            self.entries = self._read_index_file()
+        return self.entries
+
+    def touch(self, name, size=None, raw_size=None):
+        """Records an access of the named entry, optionally with its new size.
+        raw_size is the uncompressed size, if different."""
+        now = int(time.time())
+        with self.lock:
+            entries = self._get_entries()
+            if (
+                size is None
+                and name in entries
+                and now - entries[name].get("atime", 0) < self.ATIME_RESOLUTION
+            ):
+                return
+            entry = dict(entries.get(name, {"size": 0}))
+            entry["atime"] = now
+            if size is not None:
+                entry["size"] = size
+                entry["raw"] = size if raw_size is None else raw_size
+            entries[name] = entry
+            self.updated[name] = entry
+            self.removed.discard(name)
+
+    def remove(self, name):
+        with self.lock:
+            self._get_entries().pop(name, None)
+            self.updated.pop(name, None)
+            self.removed.add(name)
+        for suffix in CACHE_FILE_SUFFIXES:
+            cache_file = _get_cache_file(name, suffix)
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
+
+    def rebuild(self):
+        """Re-creates the index from the files in the cache directory."""
+        entries = dict()
+        for shard in os.listdir(self.cachedir):
+            shard_dir = os.path.join(self.cachedir, shard)
+            if len(shard) != CACHE_SHARD_LEN or not os.path.isdir(shard_dir):
+                continue
+            with os.scandir(shard_dir) as dir_entries:
+                for dir_entry in dir_entries:
+                    name, suffix = os.path.splitext(dir_entry.name)
+                    if suffix not in CACHE_FILE_SUFFIXES or not dir_entry.is_file():
+                        continue
+                    stat = dir_entry.stat()
+                    entry = entries.setdefault(name, {"size": 0, "atime": 0})
+                    entry["size"] += stat.st_size
+                    entry["atime"] = max(entry["atime"], int(stat.st_atime))
+        with self.lock:
+            self.entries = entries
+            self.updated = dict(entries)
+            self.removed = set()
+
+    def get_stats(self):
+        with self.lock:
+            entries = dict(self._get_entries())
+        stats = {
+            "entries": len(entries),
+            "bytes": sum(entry["size"] for entry in entries.values()),
+            "raw_bytes": sum(
+                entry.get("raw", entry["size"]) for entry in entries.values()
+            ),
+            "oldest": None,
+            "newest": None,
+        }
+        if entries:
+            stats["oldest"] = min(entry["atime"] for entry in entries.values())
+            stats["newest"] = max(entry["atime"] for entry in entries.values())
+        return stats
+
+    def evict(self, max_bytes, max_entries):
+        """Removes the least recently used entries until the cache is within the limits.
+        Returns the number of entries removed."""
+        with self.lock:
+            entries = self._get_entries()
+            total_bytes = sum(entry["size"] for entry in entries.values())
+            num_entries = len(entries)
+            lru_names = sorted(entries, key=lambda name: entries[name]["atime"])
+        evicted = 0
+        for name in lru_names:
+            if total_bytes <= max_bytes and num_entries <= max_entries:
+                break
+            total_bytes -= entries[name]["size"]
+            num_entries -= 1
+            LOG.debug("Evicting cache entry: %s", name)
+            self.remove(name)
+            evicted += 1
+        return evicted
+
+    def save(self):
+        """Merges our updates into the index file, then evicts if over the limits.
+        Nothing is written if there are no updates."""
+        if self.entries is None or not (self.updated or self.removed):
+            return
+        with self.lock:
+            # merge with any changes made by other processes since we loaded
+            entries = self._read_index_file()
+            for name in self.removed:
+                entries.pop(name, None)
+            for name, entry in self.updated.items():
+                if name not in entries or entries[name]["atime"] <= entry["atime"]:
+                    entries[name] = entry
+            self.entries = entries
+            self.updated = dict()
+            self.removed = set()
+        evicted = self.evict(_get_cache_max_bytes(), _get_cache_max_entries())
+        if evicted:
+            LOG.debug("Evicted %s cache entries", evicted)
+        with self.lock:
+            tmp_file = "{}.{}.tmp".format(self.index_file, os.getpid())
+            with open(tmp_file, "w", encoding="utf-8") as out:
+                json.dump({"entries": self.entries}, out)
+            os.replace(tmp_file, self.index_file)
+
+
+def _get_cache_max_bytes():
+    return config.CONFIG.parser.getint("cache_max_bytes", DEFAULT_CACHE_MAX_BYTES)
+
+
+def _get_cache_max_entries():
+    return config.CONFIG.parser.getint("cache_max_entries", DEFAULT_CACHE_MAX_ENTRIES)
+
+
+def _use_binary_cache():
+    return CACHEDIR_PRIVATE and config.CONFIG.parser.getboolean("cache_binary", True)
+
+
+def _get_cache_compression():
+    compression = config.CONFIG.parser.get("cache_compression", "none")
+    if compression != "none" and compression not in COMPRESSION_HEADERS:
+        LOG.warning("Unknown cache_compression '%s', not compressing", compression)
+        return "none"
+    return compression
+
+
+def _compress(data):
+    """Compresses data according to the cache_compression config."""
+    compression = _get_cache_compression()
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_COMPRESSLEVEL)
+    if compression == "lzma":
+        return lzma.compress(data)
+    return data
+
+
+def _decompress(data):
+    """Decompresses data if it has a gzip or lzma header, otherwise returns it unchanged."""
+    try:
+        if data.startswith(COMPRESSION_HEADERS["gzip"]):
+            return gzip.decompress(data)
+        if data.startswith(COMPRESSION_HEADERS["lzma"]):
+            return lzma.decompress(data)
+    except (OSError, EOFError, lzma.LZMAError) as ex:
+        raise ValueError("Invalid compressed cache data") from ex
+    return data
+
+
+def _encode_body(content, json_data):
+    """Returns the stored form of a response body: the binary (marshal) form of json_data
+    if enabled, otherwise the original json content."""
+    if _use_binary_cache():
+        return BINARY_CACHE_HEADER + marshal.dumps(json_data)
+    return content
+
+
+def _decode_body(data):
+    """Returns the json data from a stored body, detecting the format from its header.
+    Raises ValueError if the body cannot be decoded (e.g. written by a different python)."""
+    data = _decompress(data)
+    if data.startswith(BINARY_CACHE_HEADER):
+        if not CACHEDIR_PRIVATE:
+            raise ValueError(
+                "Binary cache data in a cache directory that is not private"
+            )
+        try:
+            return marshal.loads(data[len(BINARY_CACHE_HEADER) :])
+        except (EOFError, TypeError) as ex:
+            raise ValueError("Invalid binary cache data") from ex
+    if data.startswith(BINARY_CACHE_HEADER[:7]):
+        raise ValueError("Binary cache data from another python version")
+    return json.loads(data)
+
+
+class CacheStore:
+    """Interface for the response cache storage backends.
+
+    Each entry holds a response body plus its metadata: the url, fetch_time (epoch secs),
+    the etag/last_modified validators and the ttl_class/start_time from the TTL policy.
+    """
+
+    def read_meta(self, cache_key):
+        """Returns the metadata dictionary for cache_key, or None if not cached."""
+        raise NotImplementedError
+
+    def read(self, cache_key):
+        """Returns the cached json data for cache_key, or None if not cached."""
+        raise NotImplementedError
+
+    def write(self, cache_key, content, json_data, meta):
+        """Stores a response; content is the raw response body, json_data the parsed form."""
+        raise NotImplementedError
+
+    def touch(self, cache_key):
+        """Marks the cached entry as freshly fetched (e.g. after a 304 Not Modified)."""
+        raise NotImplementedError
+
+    def get_stats(self):
+        """Returns a dictionary with: location, entries, bytes, oldest, newest."""
+        raise NotImplementedError
+
+    def prune(self):
+        """Evicts least recently used entries down to the configured limits.
+        Returns the number of entries removed."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FileCacheStore(CacheStore):
+    """Stores each response as a json file, with a .meta file for its metadata and an
+    optional .bin file holding the pre-parsed (marshal) form, which is preferred on load.
+    The json and .bin files are compressed if enabled. The file mtime is the fetch time."""
+
+    def __init__(self, cachedir):
+        self.cachedir = cachedir
+        self.index = CacheIndex(cachedir)
+
+    def read_meta(self, cache_key):
+        json_file = _get_cache_file(cache_key)
+        try:
+            fetch_time = os.path.getmtime(json_file)
+        except OSError:
+            return None
+        meta = dict()
+        meta_file = _get_cache_file(cache_key, ".meta")
+        if os.path.exists(meta_file):
+            try:
+                with open(meta_file) as mfh:
+                    meta = json.load(mfh)
+            except (OSError, ValueError):
+                LOG.debug("Ignoring unreadable cache meta file: %s", meta_file)
+        meta["fetch_time"] = fetch_time
+        return meta
+
+    def _read_binary(self, cache_key, json_file):
+        bin_file = _get_cache_file(cache_key, ".bin")
+        try:
+            if os.path.getmtime(bin_file) < os.path.getmtime(json_file):
+                return None
+            with open(bin_file, "rb") as bfh:
+                return _decode_body(bfh.read())
+        except (OSError, ValueError):
+            return None
+
+    def read(self, cache_key):
+        json_file = _get_cache_file(cache_key)
+        json_data = None
+        if _use_binary_cache():
+            json_data = self._read_binary(cache_key, json_file)
+        if json_data is None:
+            try:
+                with open(json_file, "rb") as jfh:
+                    json_data = _decode_body(jfh.read())
+            except FileNotFoundError:
+                return None
+            except ValueError:
+                LOG.debug("Ignoring unreadable cache file: %s", json_file)
+                return None
+            if _use_binary_cache():
+                self._write_binary(cache_key, json_data)
+        self.index.touch(cache_key)
+        return json_data
+
+    @staticmethod
+    def _replace_file(cache_file, data):
+        """Writes data to cache_file atomically, as background refreshes and other
+        processes may replace files being read."""
+        tmp_file = "{}.{}.{}.tmp".format(cache_file, os.getpid(), threading.get_ident())
+        with open(tmp_file, "wb") as out:
+            out.write(data)
+        os.replace(tmp_file, cache_file)
+
+    def _write_file(self, cache_file, data):
+        """Writes data to cache_file, compressed if enabled. Returns the bytes written."""
+        stored = _compress(data)
+        self._replace_file(cache_file, stored)
+        return len(stored)
+
+    def _write_binary(self, cache_key, json_data):
+        data = BINARY_CACHE_HEADER + marshal.dumps(json_data)
+        return self._write_file(_get_cache_file(cache_key, ".bin"), data), len(data)
+
+    def write(self, cache_key, content, json_data, meta):
+        # Note: this fails on windows in some cases https://github.com/kennethreitz/requests-html/issues/171
+        cache_size = self._write_file(_get_cache_file(cache_key), content)
+        raw_size = len(content)
+        if _use_binary_cache():
+            bin_size, bin_raw_size = self._write_binary(cache_key, json_data)
+            cache_size += bin_size
+            raw_size += bin_raw_size
+        meta_file = _get_cache_file(cache_key, ".meta")
+        if meta.get("etag") or meta.get("last_modified") or meta.get("ttl_class"):
+            self._replace_file(meta_file, json.dumps(meta).encode("utf-8"))
+        elif os.path.exists(meta_file):
+            try:
+                os.remove(meta_file)
+            except FileNotFoundError:
+                pass
+        self.index.touch(cache_key, cache_size, raw_size)
+
+    def touch(self, cache_key):
+        os.utime(_get_cache_file(cache_key))
+        bin_file = _get_cache_file(cache_key, ".bin")
+        if os.path.exists(bin_file):
+            os.utime(bin_file)
+        self.index.touch(cache_key)
 
+    def get_stats(self):
+        stats = self.index.get_stats()
+        stats["location"] = self.cachedir
+        return stats
 
-def request_json(url, output_filename=None, cache_stale=None):
+    def prune(self):
+        # remove files left over from the old, flat cache directory layout
+        with os.scandir(self.cachedir) as dir_entries:
+            for dir_entry in dir_entries:
+                if (
+                    dir_entry.is_file()
+                    and dir_entry.name != CacheIndex.INDEX_FILENAME
+                    and os.path.splitext(dir_entry.name)[1] in CACHE_FILE_SUFFIXES
+                ):
+                    os.remove(dir_entry.path)
+        self.index.rebuild()
+        return self.index.evict(_get_cache_max_bytes(), _get_cache_max_entries())
+
+    def close(self):
+        self.index.save()
+
+
+class SqliteCacheStore(CacheStore):
+    """Stores responses in a single SQLite database, in WAL mode so that several mlbv
+    processes can read and write at once. Each thread uses its own connection.
+    As with the CacheIndex, access times are only kept to within ATIME_RESOLUTION, and
+    are written in a single transaction on exit. The cache is only pruned on exit if
+    this process wrote to it."""
+
+    DB_FILENAME = "cache.sqlite"
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS responses ("
+        " key TEXT PRIMARY KEY, url TEXT, body BLOB, size INTEGER, raw_size INTEGER,"
+        " fetch_time REAL, atime REAL, etag TEXT, last_modified TEXT,"
+        " ttl_class TEXT, start_time REAL)",
+        "CREATE INDEX IF NOT EXISTS responses_atime ON responses (atime)",
+    )
+    META_COLUMNS = (
+        "url",
+        "fetch_time",
+        "etag",
+        "last_modified",
+        "ttl_class",
+        "start_time",
+    )
+
+    def __init__(self, cachedir):
+        self.db_file = os.path.join(cachedir, self.DB_FILENAME)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.atimes = dict()  # key -> access time, not yet written
+        self.written = False
+
+    def _get_connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=SQLITE_TIMEOUT_SECS)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+            self.local.conn = conn
+        return conn
+
+    def read_meta(self, cache_key):
+        row = (
+            self._get_connection()
+            .execute(
+                "SELECT {} FROM responses WHERE key = ?".format(
+                    ", ".join(self.META_COLUMNS)
+                ),
+                (cache_key,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return dict(zip(self.META_COLUMNS, row))
+
+    def read(self, cache_key):
+        conn = self._get_connection()
+        row = conn.execute(
+            "SELECT body, atime FROM responses WHERE key = ?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            json_data = _decode_body(row[0])
+        except ValueError:
+            LOG.debug("Ignoring undecodable cache entry: %s", cache_key)
+            return None
+        now = time.time()
+        if now - (row[1] or 0) >= CacheIndex.ATIME_RESOLUTION:
+            with self.lock:
+                self.atimes[cache_key] = now
+        return json_data
+
+    def write(self, cache_key, content, json_data, meta):
+        raw_body = _encode_body(content, json_data)
+        body = _compress(raw_body)
+        now = time.time()
+        conn = self._get_connection()
+        self.written = True
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, url, body, size, raw_size, fetch_time, atime, etag, last_modified,"
+                " ttl_class, start_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cache_key,
+                    meta.get("url"),
+                    body,
+                    len(body),
+                    len(raw_body),
+                    now,
+                    now,
+                    meta.get("etag"),
+                    meta.get("last_modified"),
+                    meta.get("ttl_class"),
+                    meta.get("start_time"),
+                ),
+            )
+
+    def touch(self, cache_key):
+        now = time.time()
+        conn = self._get_connection()
+        with conn:
+            conn.execute(
+                "UPDATE responses SET fetch_time = ?, atime = ? WHERE key = ?",
+                (now, now, cache_key),
+            )
+
+    def get_stats(self):
+        row = (
+            self._get_connection()
+            .execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0),"
+                " MIN(atime), MAX(atime) FROM responses"
+            )
+            .fetchone()
+        )
+        return {
+            "location": self.db_file,
+            "entries": row[0],
+            "bytes": row[1],
+            "raw_bytes": row[2],
+            "oldest": row[3],
+            "newest": row[4],
+        }
+
+    def prune(self):
+        max_bytes = _get_cache_max_bytes()
+        max_entries = _get_cache_max_entries()
+        conn = self._get_connection()
+        with conn:
+            stats = self.get_stats()
+            if stats["entries"] <= max_entries and stats["bytes"] <= max_bytes:
+                return 0
+            total_bytes = stats["bytes"]
+            num_entries = stats["entries"]
+            evict_keys = list()
+            for key, size in conn.execute(
+                "SELECT key, size FROM responses ORDER BY atime"
+            ):
+                if total_bytes <= max_bytes and num_entries <= max_entries:
+                    break
+                evict_keys.append((key,))
+                total_bytes -= size
+                num_entries -= 1
+            conn.executemany("DELETE FROM responses WHERE key = ?", evict_keys)
+        return len(evict_keys)
+
+    def close(self):
+        with self.lock:
+            atimes = [(atime, key) for key, atime in self.atimes.items()]
+            self.atimes.clear()
+        if atimes:
+            conn = self._get_connection()
+            with conn:
+                conn.executemany(
+                    "UPDATE responses SET atime = MAX(atime, ?) WHERE key = ?", atimes
+                )
+        if not self.written:
+            return
+        evicted = self.prune()
+        if evicted:
+            LOG.debug("Evicted %s cache entries", evicted)
+
+
+CACHE_STORES = {"files": FileCacheStore, "sqlite": SqliteCacheStore}
+
+
+def _get_cache_store():
+    """Returns the cache storage backend, selected by config: cache_backend=files|sqlite"""
+    global CACHE_STORE
+    if CACHE_STORE is None:
+        with SESSION_LOCK:
+            if CACHE_STORE is None:
+                backend = config.CONFIG.parser.get("cache_backend", "files")
+                if backend not in CACHE_STORES:
+                    LOG.warning("Unknown cache_backend '%s', using 'files'", backend)
+                    backend = "files"
+                CACHE_STORE = CACHE_STORES[backend](_get_cachedir())
+                atexit.register(_close_cache_store)
+    return CACHE_STORE
+
+
+def _close_cache_store():
+    if CACHE_STORE is None:
+        return
+    try:
+        CACHE_STORE.close()
+    except (OSError, sqlite3.Error):
+        LOG.exception("Could not close cache store")
+
+
+def display_cache_stats():
+    """Displays the cache statistics."""
+    stats = _get_cache_store().get_stats()
+    print("Cache location: {}".format(stats["location"]))
+    print("Entries: {} (max: {})".format(stats["entries"], _get_cache_max_entries()))
+    print(
+        "Size: {:.1f} MB (max: {:.1f} MB)".format(
+            stats["bytes"] / (1024 * 1024), _get_cache_max_bytes() / (1024 * 1024)
+        )
+    )
+    if stats["bytes"]:
+        print(
+            "Compression: {} (ratio: {:.1f}x)".format(
+                _get_cache_compression(), stats["raw_bytes"] / stats["bytes"]
+            )
+        )
+    for label in ("oldest", "newest"):
+        if stats[label]:
+            print(
+                "{} access: {}".format(
+                    label.title(),
+                    time.strftime("%Y-%m-%d %H:%M", time.localtime(stats[label])),
+                )
+            )
+
+
+def prune_cache():
+    """Evicts the least recently used cache entries to get under the configured limits."""
+    evicted = _get_cache_store().prune()
+    print("Pruned {} cache entries".format(evicted))
+    display_cache_stats()
+
+
+def _get_session():
+    """Returns the process-wide requests.Session.
+
+    All requests go through a single pooled transport, so repeat lookups against
+    the same host reuse the existing keep-alive connection rather than paying for
+    a new DNS/TCP/TLS handshake each time.
+    """
+    global SESSION
+    if SESSION is not None:
+        return SESSION
+    with SESSION_LOCK:
+        if SESSION is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=config.CONFIG.parser.getint(
+                    "http_pool_connections", DEFAULT_POOL_CONNECTIONS
+                ),
+                pool_maxsize=config.CONFIG.parser.getint(
+                    "http_pool_maxsize", DEFAULT_POOL_MAXSIZE
+                ),
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = config.CONFIG.ua_iphone
+            if not config.CONFIG.parser.getboolean("http_keepalive", True):
+                session.headers["Connection"] = "close"
+            session.verify = config.VERIFY_SSL
+            atexit.register(_log_connection_stats)
+            SESSION = session
+    return SESSION
+
+
+def _count_stat(name, value=1):
+    with STATS_LOCK:
+        STATS[name] = STATS.get(name, 0) + value
+
+
+class TokenBucket:
+    """Token bucket rate limiter: allows bursts of up to 'burst' requests, refilled at
+    'rate' requests per second."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _take(self, tokens, updated, now):
+        """Takes a token from the bucket state (tokens, updated).
+        Returns the new tokens and how long to wait for the token to be available."""
+        tokens = min(self.burst, tokens + (now - updated) * self.rate) - 1
+        return tokens, max(-tokens / self.rate, 0)
+
+    def _reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens, wait = self._take(self.tokens, self.updated, now)
+            self.updated = now
+        return wait
+
+    def acquire(self):
+        """Waits until a request may be sent. Returns the time waited, in seconds."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """A token bucket whose state is kept in a locked file, shared between processes."""
+
+    def __init__(self, rate, burst, state_file):
+        super().__init__(rate, burst)
+        self.state_file = state_file
+
+    def _reserve(self):
+        with self.lock, open(self.state_file, "a+") as sfh:
+            fcntl.flock(sfh, fcntl.LOCK_EX)
+            try:
+                sfh.seek(0)
+                try:
+                    tokens, updated = (float(val) for val in sfh.read().split())
+                except ValueError:
+                    tokens, updated = self.burst, 0
+                # wall clock time, as monotonic time is not comparable between processes
+                now = time.time()
+                tokens, wait = self._take(tokens, min(updated, now), now)
+                sfh.seek(0)
+                sfh.truncate()
+                sfh.write("{} {}".format(tokens, now))
+                sfh.flush()
+            finally:
+                fcntl.flock(sfh, fcntl.LOCK_UN)
+        return wait
+
+
+def _get_rate_limits():
+    limits = dict()
+    for entry in util.get_csv_list(
+        config.CONFIG.parser.get("http_rate_limit", DEFAULT_RATE_LIMIT)
+    ):
+        if entry:
+            host, _, value = entry.rpartition(":")
+            try:
+                limits[host.strip().lower()] = float(value)
+            except ValueError:
+                LOG.warning("Invalid http_rate_limit value for %s: %s", host, value)
+    return limits
+
+
+def _get_rate_limiter(host):
+    """Returns the TokenBucket for host, or None if it is not rate limited."""
+    with SESSION_LOCK:
+        if host not in RATE_LIMITERS:
+            limits = _get_rate_limits()
+            rate = limits.get(host, limits.get("*", 0))
+            burst = config.CONFIG.parser.getint("http_rate_burst", DEFAULT_RATE_BURST)
+            if rate <= 0:
+                RATE_LIMITERS[host] = None
+            elif config.CONFIG.parser.getboolean("http_rate_limit_shared", False):
+                if fcntl is None:
+                    LOG.warning(
+                        "Shared rate limiting is not supported on this platform"
+                    )
+                    RATE_LIMITERS[host] = TokenBucket(rate, burst)
+                else:
+                    state_file = os.path.join(
+                        util.get_tempdir(), "ratelimit-{}".format(host)
+                    )
+                    RATE_LIMITERS[host] = SharedTokenBucket(rate, burst, state_file)
+            else:
+                RATE_LIMITERS[host] = TokenBucket(rate, burst)
+        return RATE_LIMITERS[host]
+
+
+def _wait_for_rate_limit(url):
+    limiter = _get_rate_limiter(urllib.parse.urlsplit(url).hostname or "")
+    if limiter is not None:
+        wait = limiter.acquire()
+        if wait > 0:
+            LOG.debug("Rate limited for %.3fs: url=%s", wait, url)
+            _count_stat("rate_limited")
+            _count_stat("rate_wait", wait)
+
+
+def _get_timeout():
+    return (
+        config.CONFIG.parser.getfloat("http_connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+        config.CONFIG.parser.getfloat("http_read_timeout", DEFAULT_READ_TIMEOUT),
+    )
+
+
+def _timed_get(session, url, headers):
+    """Sends one GET request, recording how long it took."""
+    _wait_for_rate_limit(url)
+    start = time.monotonic()
+    _count_stat("requests")
+    response = session.get(url, headers=headers, timeout=_get_timeout())
+    with STATS_LOCK:
+        LATENCIES.append(time.monotonic() - start)
+    return response
+
+
+def _get_hedge_delay():
+    """Returns the p95 of the recent request times, which is how long to wait before
+    sending a hedged request."""
+    with STATS_LOCK:
+        latencies = sorted(LATENCIES)
+    if len(latencies) < HEDGE_MIN_SAMPLES:
+        return config.CONFIG.parser.getfloat("http_hedge_delay", DEFAULT_HEDGE_DELAY)
+    return max(latencies[int(len(latencies) * 0.95)], MIN_HEDGE_DELAY)
+
+
+def _get_hedge_executor():
+    # separate from the request_json_many workers, which may be waiting on these
+    global HEDGE_EXECUTOR
+    with SESSION_LOCK:
+        if HEDGE_EXECUTOR is None:
+            HEDGE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+                max_workers=2
+                * config.CONFIG.parser.getint("http_max_workers", DEFAULT_MAX_WORKERS),
+                thread_name_prefix="hedge",
+            )
+    return HEDGE_EXECUTOR
+
+
+def _hedged_get(session, url, headers):
+    """Sends a GET request, plus a duplicate if the first is slower than usual.
+    Returns the first successful response."""
+    executor = _get_hedge_executor()
+    futures = [executor.submit(_timed_get, session, url, headers)]
+    done, _ = concurrent.futures.wait(futures, timeout=_get_hedge_delay())
+    if not done:
+        LOG.debug("Hedging slow request: url=%s", url)
+        _count_stat("hedged")
+        futures.append(executor.submit(_timed_get, session, url, headers))
+    pending = set(futures)
+    while True:
+        done, pending = concurrent.futures.wait(
+            pending, return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        for future in done:
+            if future.exception() is None or not pending:
+                if future is not futures[0]:
+                    _count_stat("hedge_wins")
+                for other in futures:
+                    if other is not future:
+                        other.add_done_callback(_close_response)
+                return future.result()
+
+
+def _close_response(future):
+    """Closes the response of a losing hedged request once it completes, returning its
+    connection to the pool."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _get(session, url, headers):
+    """Sends a GET request, retrying connection errors, timeouts and server errors with
+    jittered exponential backoff. Returns the final response."""
+    retries = config.CONFIG.parser.getint("http_retries", DEFAULT_RETRIES)
+    backoff = config.CONFIG.parser.getfloat("http_retry_backoff", DEFAULT_RETRY_BACKOFF)
+    hedge = config.CONFIG.parser.getboolean("http_hedge", False)
+    attempt = 0
+    while True:
+        util.log_http(url, "get", headers, "request_json")
+        try:
+            if hedge:
+                response = _hedged_get(session, url, headers)
+            else:
+                response = _timed_get(session, url, headers)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                return response
+            LOG.debug("Retrying url=%s: status %s", url, response.status_code)
+            delay = _get_retry_after(response)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as ex:
+            if attempt >= retries:
+                raise
+            LOG.debug("Retrying url=%s: %s", url, ex)
+            delay = None
+        if delay is None:
+            delay = random.uniform(0, min(backoff * 2**attempt, MAX_RETRY_BACKOFF))
+        attempt += 1
+        _count_stat("retries")
+        time.sleep(delay)
+
+
+def _get_retry_after(response):
+    """Returns the Retry-After delay in seconds from response, if given (and reasonable)."""
+    try:
+        return min(float(response.headers.get("Retry-After")), MAX_RETRY_BACKOFF)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_connection_stats():
+    """Returns a dictionary of request/connection counters for the shared session.
+
+    'opened' is the number of new connections made, 'reused' is the number of
+    requests which were served on an already-open keep-alive connection.
+    """
+    stats = {
+        "requests": STATS["requests"],
+        "revalidated": STATS.get("revalidated", 0),
+        "stale": STATS.get("stale", 0),
+        "coalesced": STATS.get("coalesced", 0),
+        "retries": STATS.get("retries", 0),
+        "hedged": STATS.get("hedged", 0),
+        "hedge_wins": STATS.get("hedge_wins", 0),
+        "rate_limited": STATS.get("rate_limited", 0),
+        "rate_wait": STATS.get("rate_wait", 0),
+        "opened": 0,
+        "reused": 0,
+    }
+    if SESSION is None:
+        return stats
+    for adapter in set(SESSION.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                stats["opened"] += pool.num_connections
+    stats["reused"] = max(stats["requests"] - stats["opened"], 0)
+    return stats
+
+
+def _log_connection_stats():
+    stats = get_connection_stats()
+    LOG.debug(
+        "HTTP stats: requests=%s (not modified: %s, served stale: %s, coalesced: %s), "
+        "retries=%s, hedged=%s (won: %s), rate limited=%s (%.2fs), "
+        "connections opened=%s, reused=%s",
+        stats["requests"],
+        stats["revalidated"],
+        stats["stale"],
+        stats["coalesced"],
+        stats["retries"],
+        stats["hedged"],
+        stats["hedge_wins"],
+        stats["rate_limited"],
+        stats["rate_wait"],
+        stats["opened"],
+        stats["reused"],
+    )
+
+
+def _load_cached(cache_key, cache_stale):
+    """Returns the cached json data for cache_key, or None if there is no fresh copy."""
+    if not cache_key or not cache_stale:
+        return None
+    json_data = CACHE.get(cache_key)
+    if json_data is not None:
+        return json_data
+    meta = _get_cache_store().read_meta(cache_key)
+    if meta is None:
+        return None
+    if cache_stale != CACHE_FOREVER and meta.get("ttl_class"):
+        cache_stale = _get_policy_stale_secs(
+            meta["ttl_class"], meta.get("start_time"), meta["fetch_time"], cache_stale
+        )
+    if int(time.time()) - meta["fetch_time"] < cache_stale:
+        json_data = _get_cache_store().read(cache_key)
+        if json_data is None:
+            return None
+        CACHE.put(cache_key, json_data)
+        if config.DEBUG:
+            LOG.info("Loaded from cache: %s", cache_key)
+        return json_data
+    return None
+
+
+def _load_stale(cache_key, max_age):
+    """Returns the cached json data for cache_key if it is no older than max_age seconds,
+    however stale it is, otherwise None."""
+    meta = _get_cache_store().read_meta(cache_key)
+    if meta is None or int(time.time()) - meta["fetch_time"] >= max_age:
+        return None
+    return _get_cache_store().read(cache_key)
+
+
+def _refresh(url, cache_key, cache_stale, ttl_policy):
+    try:
+        _fetch_json(url, cache_key, cache_stale, ttl_policy)
+    except (requests.exceptions.RequestException, ValueError, OSError) as ex:
+        LOG.debug("Background refresh failed: url=%s: %s", url, ex)
+    finally:
+        with REFRESHES_LOCK:
+            REFRESHES.pop(cache_key, None)
+
+
+def _start_refresh(url, cache_key, cache_stale, ttl_policy):
+    """Refreshes the cache entry on a background thread, unless one is already running.
+    The thread is not a daemon, so the new copy is saved before the program exits."""
+    with REFRESHES_LOCK:
+        if cache_key in REFRESHES:
+            return
+        thread = threading.Thread(
+            target=_refresh,
+            args=(url, cache_key, cache_stale, ttl_policy),
+            name="refresh-{}".format(cache_key),
+        )
+        REFRESHES[cache_key] = thread
+    thread.start()
+
+
+def _join_refreshes(timeout=None):
+    """Waits for any running background refreshes to finish."""
+    with REFRESHES_LOCK:
+        threads = list(REFRESHES.values())
+    for thread in threads:
+        thread.join(timeout)
+
+
+def _get_conditional_headers(cache_key):
+    """Returns the If-None-Match/If-Modified-Since headers for revalidating a cached response.
+    These are built from the validators saved with the cached response."""
+    headers = dict()
+    meta = _get_cache_store().read_meta(cache_key)
+    if meta is None:
+        return headers
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def get_cached_json(url, output_filename, cache_stale=None):
+    """Returns the cached json data for a request if there is a fresh copy, otherwise None.
+    Nothing is fetched."""
+    return _load_cached(
+        _get_cache_key(url, output_filename), _get_cache_stale_secs(cache_stale)
+    )
+
+
+def has_cache_entry(url, output_filename, cache_stale=None):
+    """Returns True if there is a cache entry for a request, however stale, which
+    request_json() can revalidate or serve while it is refreshed."""
+    cache_key = _get_cache_key(url, output_filename)
+    if cache_key is None or not _get_cache_stale_secs(cache_stale):
+        return False
+    return (
+        CACHE.get(cache_key) is not None
+        or _get_cache_store().read_meta(cache_key) is not None
+    )
+
+
+def download_json(url):
+    """Fetches url, bypassing the cache. Returns (json_data, validators), where
+    validators are the etag and last_modified keyword arguments for save_json().
+    For responses which are cached in parts, e.g. a date range which is cached by day.
+    """
+    LOG.debug("Getting url=%s ...", url)
+    response = _get(_get_session(), url, dict())
+    response.raise_for_status()
+    return response.json(), {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def request_json(url, output_filename=None, cache_stale=None, ttl_policy=None):
     """Sends a request expecting a json-formatted response.
     If output_filename is given, then the output is saved to file.
     This also enables basic caching, where cache_stale is the number of seconds
     since file is last modified before the cached file is considered stale (0 means disable the cache).
+    ttl_policy is an optional function taking the json data and returning a (ttl_class, start_time)
+    tuple, which refines cache_stale according to the cache_ttl_policy table
+    (e.g. get_schedule_ttl_class).
     """
     cache_stale = _get_cache_stale_secs(cache_stale)
-    # Guard against very long filenames:
-    if output_filename and len(output_filename) >= MAX_CACHE_FILENAME_LEN:
-        output_filename = output_filename[0 : MAX_CACHE_FILENAME_LEN - 1]
-    if output_filename and cache_stale:
-        if output_filename in CACHE:
-            return CACHE[output_filename]
-        json_file = os.path.join(_get_cachedir(), "{}.json".format(output_filename))
-        if os.path.exists(json_file) and (
-            int(time.time()) - os.path.getmtime(json_file) < cache_stale
-        ):
-            with open(json_file) as jfh:
-                CACHE[output_filename] = json.load(jfh)
-            if config.DEBUG:
-                LOG.info("Loaded from cache: %s", output_filename)
-            return CACHE[output_filename]
+    cache_key = _get_cache_key(url, output_filename)
+    json_data = _load_cached(cache_key, cache_stale)
+    if json_data is not None:
+        return json_data
+
+    swr_max_age = _get_swr_max_age()
+    if cache_key and cache_stale and swr_max_age:
+        json_data = _load_stale(cache_key, swr_max_age)
+        if json_data is not None:
+            LOG.debug("Serving stale, refreshing: url=%s, key=%s", url, cache_key)
+            _count_stat("stale")
+            _start_refresh(url, cache_key, cache_stale, ttl_policy)
+            return json_data
+    return _fetch_json(url, cache_key, cache_stale, ttl_policy)
+
+
+def _fetch_json(url, cache_key, cache_stale, ttl_policy):
+    """Retrieves url and saves it to the cache (see request_json).
+    Concurrent calls for the same data are coalesced: the first caller makes the request
+    and the others wait for, and share, its result (or exception)."""
+    flight_key = cache_key or _normalize_url(url)
+    with INFLIGHT_LOCK:
+        future = INFLIGHT.get(flight_key)
+        leader = future is None
+        if leader:
+            future = concurrent.futures.Future()
+            INFLIGHT[flight_key] = future
+    if not leader:
+        LOG.debug("Waiting for in-flight request: url=%s", url)
+        _count_stat("coalesced")
+        return future.result()
+    try:
+        json_data = None
+        if cache_key and cache_stale:
+            # may have been completed by a request which finished since we checked
+            json_data = CACHE.get(cache_key)
+        if json_data is None:
+            json_data = _download_json(url, cache_key, cache_stale, ttl_policy)
+        future.set_result(json_data)
+        return json_data
+    except BaseException as ex:
+        future.set_exception(ex)
+        raise
+    finally:
+        with INFLIGHT_LOCK:
+            INFLIGHT.pop(flight_key, None)
+
+
+def _download_json(url, cache_key, cache_stale, ttl_policy):
+    # a stale cached copy can be revalidated rather than downloaded again
+    headers = dict()
+    if cache_key and cache_stale:
+        headers = _get_conditional_headers(cache_key)
 
     LOG.debug("Getting url=%s ...", url)
-    headers = {"User-Agent": config.CONFIG.ua_iphone, "Connection": "close"}
-    util.log_http(url, "get", headers, sys._getframe().f_code.co_name)
-    response = requests.get(url, headers=headers, verify=config.VERIFY_SSL)
+    session = _get_session()
+    response = _get(session, url, headers)
+    if response.status_code == 304 and headers:
+        # not modified: bump the freshness of the cached copy and use it
+        LOG.debug("Not modified: url=%s, key=%s", url, cache_key)
+        _count_stat("revalidated")
+        _get_cache_store().touch(cache_key)
+        json_data = _get_cache_store().read(cache_key)
+        if json_data is not None:
+            CACHE.put(cache_key, json_data)
+            return json_data
+        # the entry has gone away since, so fetch it again in full
+        response = _get(session, url, dict())
     response.raise_for_status()
+    json_data = response.json()
+
+    if cache_key is None and config.DEBUG and config.SAVE_JSON_FILE:
+        cache_key = _get_cache_key(url, "request")
+    _save_to_cache(
+        url,
+        cache_key,
+        cache_stale,
+        ttl_policy,
+        response.content,
+        json_data,
+        response.headers.get("ETag"),
+        response.headers.get("Last-Modified"),
+    )
+    return json_data
+
+
+def _save_to_cache(
+    url,
+    cache_key,
+    cache_stale,
+    ttl_policy,
+    content,
+    json_data,
+    etag=None,
+    last_modified=None,
+):
+    if cache_key is not None:
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "ttl_class": None,
+            "start_time": None,
+        }
+        if ttl_policy is not None:
+            meta["ttl_class"], meta["start_time"] = ttl_policy(json_data)
+        _get_cache_store().write(cache_key, content, json_data, meta)
+    if cache_stale and cache_key is not None:
+        LOG.debug("Caching url=%s, key=%s", url, cache_key)
+        CACHE.put(cache_key, json_data)
+
+
+def save_json(
+    url,
+    output_filename,
+    json_data,
+    cache_stale=None,
+    ttl_policy=None,
+    etag=None,
+    last_modified=None,
+):
+    """Saves json_data to the cache as the response for url, as if it had been requested
+    via request_json(). For when a response covers several requests, e.g. a date range
+    which is cached by day. etag and last_modified are the validators of the response
+    it came from (see download_json()), so that the entry can be revalidated."""
+    cache_stale = _get_cache_stale_secs(cache_stale)
+    cache_key = _get_cache_key(url, output_filename)
+    if cache_key is None or not cache_stale:
+        return
+    _save_to_cache(
+        url,
+        cache_key,
+        cache_stale,
+        ttl_policy,
+        json.dumps(json_data).encode("utf-8"),
+        json_data,
+        etag,
+        last_modified,
+    )
+
+
+def request_json_many(jobs, max_workers=None, fetch=None):
+    """Sends a batch of json requests, fetching concurrently where possible.
+
+    jobs is a list of (url, output_filename, cache_stale[, ttl_policy]) tuples, as per request_json().
+    Cache hits are served immediately; the remaining requests are fetched on a bounded
+    pool of worker threads (config: http_max_workers).
+
+    Returns a list of (json_data, error) tuples in the same order as jobs. For a failed
+    request json_data is None and error holds the exception.
+    fetch is called with the arguments of each job not served from the cache, in place
+    of request_json(), if given.
+    """
+    return list(request_json_iter(jobs, max_workers, fetch))
+
+
+def request_json_iter(jobs, max_workers=None, fetch=None):
+    """As request_json_many(), but yields each (json_data, error) result in order as soon
+    as it is available, while the later requests are still being fetched."""
+    results = [None] * len(jobs)
+    pending = list()
+    for index, job in enumerate(jobs):
+        json_data = _load_cached(
+            _get_cache_key(job[0], job[1]), _get_cache_stale_secs(job[2])
+        )
+        if json_data is not None:
+            results[index] = (json_data, None)
+        else:
+            pending.append(index)
+    if not pending:
+        yield from results
+        return
 
-    # Note: this fails on windows in some cases https://github.com/kennethreitz/requests-html/issues/171
-    if output_filename is not None or (config.DEBUG and config.SAVE_JSON_FILE):
-        json_file = os.path.join(_get_cachedir(), "{}.json".format(output_filename))
-        with open(json_file, "w", encoding="utf-8") as out:  # write date to json_file
-            out.write(response.text)
-    if cache_stale:
-        LOG.debug("Caching url=%s, filename=%s", url, output_filename)
-        CACHE[output_filename] = response.json()
-        return CACHE[output_filename]
-    return response.json()
+    if max_workers is None:
+        max_workers = config.CONFIG.parser.getint(
+            "http_max_workers", DEFAULT_MAX_WORKERS
+        )
+    max_workers = max(1, min(max_workers, len(pending)))
+    LOG.debug(
+        "Fetching %s of %s requests, workers=%s", len(pending), len(jobs), max_workers
+    )
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            index: executor.submit(fetch or request_json, *jobs[index])
+            for index in pending
+        }
+        for index in range(len(jobs)):
+            if index in futures:
+                try:
+                    results[index] = (futures[index].result(), None)
+                except (
+                    requests.exceptions.RequestException,
+                    ValueError,
+                    OSError,
+                ) as ex:
+                    LOG.debug("Request failed: url=%s: %s", jobs[index][0], ex)
+                    results[index] = (None, ex)
+            yield results[index]
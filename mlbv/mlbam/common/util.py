@@ -20,6 +20,11 @@ import mlbv.mlbam.common.config as config
 
 
 LOG = None
+TEMPDIR = None  # see get_tempdir()
+
+# the statsapi date times, which have fractional seconds in some places
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+DATETIME_FRACTION_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 
 
 class Usage(Exception):
@@ -67,7 +72,11 @@ def die(msg, exit_code=1):
 
 
 def get_tempdir():
-    """Create a directory for ourselves in the system tempdir."""
+    """Create a directory for ourselves in the system tempdir.
+    This is resolved once, on the first call."""
+    global TEMPDIR
+    if TEMPDIR is not None:
+        return TEMPDIR
     tempdir = config.CONFIG.parser.get("tempdir", None)
     if tempdir:
         if "<timestamp>" in tempdir:
@@ -76,8 +85,9 @@ def get_tempdir():
         script_name = os.path.splitext(os.path.basename(sys.argv[0]))[0]
         tempdir = os.path.join(tempfile.gettempdir(), script_name)
     if not os.path.exists(tempdir):
-        os.makedirs(tempdir)
-    return tempdir
+        os.makedirs(tempdir, exist_ok=True)
+    TEMPDIR = tempdir
+    return TEMPDIR
 
 
 def convert_time_to_local(d):
@@ -99,6 +109,27 @@ def has_reached_time(datetime_val_utc):
     return datetime_val_utc < datetime.now(timezone.utc)
 
 
+def parse_datetime(datetime_str):
+    """Parses the UTC date times returned by statsapi, e.g. 2023-07-01T23:05:00Z
+    (optionally with milli or microseconds), into an aware datetime.
+    Anything else is left to dateutil, which is much slower and slow to import.
+    """
+    if datetime_str.endswith("Z"):
+        # (datetime.fromisoformat is faster, but needs python 3.7)
+        time_format = (
+            DATETIME_FRACTION_FORMAT if "." in datetime_str else DATETIME_FORMAT
+        )
+        try:
+            return datetime.strptime(datetime_str, time_format).replace(
+                tzinfo=timezone.utc
+            )
+        except ValueError:
+            pass
+    from dateutil import parser
+
+    return parser.parse(datetime_str)
+
+
 def get_csv_list(csv_string):
     """Returns a normalized list from a csv string."""
     return [l.strip() for l in csv_string.split(",")]
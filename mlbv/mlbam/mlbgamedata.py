@@ -2,13 +2,14 @@
 Models the game data retrieved via JSON.
 """
 
+import itertools
 import logging
 import pprint
+import sys
 import time
 
 from datetime import datetime
 from datetime import timedelta
-from dateutil import parser
 
 import mlbv.mlbam.mlbapidata as mlbapidata
 import mlbv.mlbam.common.config as config
@@ -44,29 +45,779 @@ FEEDTYPE_MAP = {
 }
 
 
+# The fields read from the schedule response (see _parse_games, get_schedule_ttl_class
+# and GameDatePresenter), passed to statsapi to leave out everything else.
+SCHEDULE_FIELDS = (
+    "dates",
+    "date",
+    "games",
+    "gamePk",
+    "gameDate",
+    "resumeDate",
+    "resumedFrom",
+    "status",
+    "abstractGameState",
+    "codedGameState",
+    "detailedState",
+    "doubleHeader",
+    "gameNumber",
+    "gamesInSeries",
+    "seriesGameNumber",
+    "linescore",
+    "currentInning",
+    "currentInningOrdinal",
+    "inningState",
+    "inningHalf",
+    "outs",
+    "innings",
+    "num",
+    "runs",
+    "hits",
+    "errors",
+    "teams",
+    "away",
+    "home",
+    "team",
+    "name",
+    "abbrev",
+    "display",
+    "brief",
+    "full",
+    "league",
+    "division",
+    "abbreviation",
+    "shortName",
+    "teamName",
+    "probablePitcher",
+    "fullName",
+    "note",
+    "content",
+    "editorial",
+    "recap",
+    "mlb",
+    "headline",
+    "subhead",
+    "seoTitle",
+    "body",
+    "media",
+    "epg",
+    "epgAlternate",
+    "title",
+    "items",
+    "id",
+    "mediaId",
+    "mediaFeedType",
+    "mediaState",
+    "mediaPlaybackId",
+    "contentId",
+    "callLetters",
+    "playbacks",
+    "url",
+)
+
+# The fields read from the boxscore response (see GameDatePresenter._get_formatted_boxscore).
+# The players map is keyed by 'ID<player id>', its entries are filtered like any other object.
+BOXSCORE_FIELDS = (
+    "teams",
+    "away",
+    "home",
+    "team",
+    "name",
+    "batters",
+    "pitchers",
+    "players",
+    "person",
+    "fullName",
+    "position",
+    "abbreviation",
+    "stats",
+    "seasonStats",
+    "teamStats",
+    "batting",
+    "pitching",
+    "atBats",
+    "runs",
+    "hits",
+    "homeRuns",
+    "rbi",
+    "baseOnBalls",
+    "strikeOuts",
+    "leftOnBase",
+    "avg",
+    "ops",
+    "inningsPitched",
+    "earnedRuns",
+    "era",
+    "whip",
+    "info",
+    "title",
+    "fieldList",
+    "label",
+    "value",
+)
+
+
+# Maximum number of days fetched by one schedule request
+MAX_RANGE_DAYS = 7
+
+# Schedule hydrations. Only those needed for what is displayed are requested,
+# see get_hydrate_profile()
+HYDRATE_TEAM = "team"
+HYDRATE_MEDIA = "media"  # game feeds
+HYDRATE_LINESCORE = "linescore"  # scores
+HYDRATE_EDITORIAL = "editorial"  # preview/recap articles
+HYDRATE_PROBABLE_PITCHER = "probablePitcher"  # for previews
+HYDRATE_ALL = frozenset(
+    (
+        HYDRATE_TEAM,
+        HYDRATE_MEDIA,
+        HYDRATE_LINESCORE,
+        HYDRATE_EDITORIAL,
+        HYDRATE_PROBABLE_PITCHER,
+    )
+)
+
+
+def get_hydrate_profile(show_scores=True, show_info=False, play_stream=False):
+    """Returns the set of schedule hydrations needed for the output.
+    play_stream is set when a game is to be played rather than listed."""
+    profile = {HYDRATE_TEAM, HYDRATE_MEDIA}
+    if play_stream:
+        return frozenset(profile)
+    if show_scores:
+        # also covers --linescore and --boxscore, which need scores
+        profile.add(HYDRATE_LINESCORE)
+    if show_info:
+        profile.update((HYDRATE_EDITORIAL, HYDRATE_PROBABLE_PITCHER))
+    return frozenset(profile)
+
+
+def _get_hydrate(profile):
+    game = list()
+    if HYDRATE_MEDIA in profile:
+        game.append("content(media(epg))")
+    if HYDRATE_EDITORIAL in profile:
+        game.append("editorial(preview,recap)")
+    hydrate = list()
+    if game:
+        hydrate.append("game({})".format(",".join(game)))
+    if HYDRATE_LINESCORE in profile:
+        hydrate.append("linescore")
+    if HYDRATE_TEAM in profile:
+        hydrate.append("team")
+    if HYDRATE_PROBABLE_PITCHER in profile:
+        hydrate.append("probablePitcher(note)")
+    return "hydrate=" + ",".join(hydrate)
+
+
+def _get_superset_profiles(profile):
+    """Yields profile, then every richer profile, leanest first."""
+    extra = sorted(HYDRATE_ALL - profile)
+    for count in range(len(extra) + 1):
+        for parts in itertools.combinations(extra, count):
+            yield profile.union(parts)
+
+
+def _get_dates_in_range(start_date_str, end_date_str):
+    """Returns the date strings from start_date_str to end_date_str, inclusive."""
+    date_strs = list()
+    date = datetime.strptime(start_date_str, "%Y-%m-%d")
+    while date <= datetime.strptime(end_date_str, "%Y-%m-%d"):
+        date_strs.append(datetime.strftime(date, "%Y-%m-%d"))
+        date += timedelta(days=1)
+    return date_strs
+
+
+def _get_date_ranges(date_strs, first_day_alone=False):
+    """Groups the date strings into runs of consecutive days, of up to MAX_RANGE_DAYS.
+    With first_day_alone, the earliest day is put in a range of its own.
+    Returns a list of (start_date_str, end_date_str) tuples."""
+    date_ranges = list()
+    for date_str in sorted(date_strs):
+        if (
+            date_ranges
+            and not (first_day_alone and len(date_ranges) == 1)
+            and len(_get_dates_in_range(*date_ranges[-1])) < MAX_RANGE_DAYS
+            and _get_dates_in_range(date_ranges[-1][1], date_str)
+            == [date_ranges[-1][1], date_str]
+        ):
+            date_ranges[-1] = (date_ranges[-1][0], date_str)
+        else:
+            date_ranges.append((date_str, date_str))
+    return date_ranges
+
+
+def _fetch_schedule(url, output_filename, cache_stale, ttl_policy=None):
+    """Fetches a schedule request for GameDataRetriever.iter_game_data(): a single day
+    with a cache entry through the cache, or a date range (with no output_filename)
+    directly, giving (json_data, validators) for splitting by day."""
+    if output_filename is None:
+        return request.download_json(url)
+    return request.request_json(url, output_filename, cache_stale, ttl_policy)
+
+
+# marks the lazily parsed GameRecord fields not yet parsed
+_UNPARSED = object()
+
+
+class _Record:
+    """Base for the game data records. Records are slotted objects with native values
+    (ints, datetimes), but also support read-only mapping access by the original
+    dictionary keys, returning the original string forms, for existing callers.
+    A key is only present when its attribute is not None.
+    """
+
+    __slots__ = ()
+    KEYS = dict()  # key: (attribute, conversion to the legacy form or None)
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        attr, conversion = self.KEYS[key]
+        value = getattr(self, attr)
+        if value is None:
+            raise KeyError(key)
+        if conversion is None:
+            return value
+        return conversion(value)
+
+    def __contains__(self, key):
+        return key in self.KEYS and getattr(self, self.KEYS[key][0]) is not None
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def keys(self):
+        return [key for key in self.KEYS if key in self]
+
+    def __repr__(self):
+        return "{}({})".format(
+            type(self).__name__,
+            ", ".join(
+                "{}={!r}".format(attr, getattr(self, attr))
+                for attr in self.__slots__
+                if not attr.startswith("_")
+            ),
+        )
+
+
+class TeamInfo(_Record):
+    """A team's names. abbrev is lower case."""
+
+    __slots__ = ("abbrev", "display", "brief", "full", "league", "division")
+    KEYS = {attr: (attr, None) for attr in __slots__}
+
+    def __init__(self, abbrev, display, brief, full, league="n/a", division="n/a"):
+        self.abbrev = abbrev
+        self.display = display
+        self.brief = brief
+        self.full = full
+        self.league = league
+        self.division = division
+
+
+class TeamScore(_Record):
+    """A team's runs, hits and errors."""
+
+    __slots__ = ("runs", "hits", "errors")
+    KEYS = {attr: (attr, str) for attr in __slots__}
+
+    def __init__(self, runs, hits, errors):
+        self.runs = runs
+        self.hits = hits
+        self.errors = errors
+
+
+class Linescore(_Record):
+    """The game's linescore. has_data is False when the schedule had no linescore;
+    away and home are None without team totals. innings is a tuple of
+    (num, away_runs, home_runs), the runs being None for innings not (yet) played.
+    """
+
+    __slots__ = (
+        "has_data",
+        "current_inning",
+        "current_inning_ordinal",
+        "inning_state",
+        "outs",
+        "innings",
+        "away",
+        "home",
+    )
+    KEYS = {
+        "currentInning": ("current_inning", str),
+        "currentInningOrdinal": ("current_inning_ordinal", None),
+        "inningState": ("inning_state", None),
+        "away": ("away", None),
+        "home": ("home", None),
+    }
+
+    def __init__(
+        self,
+        has_data,
+        current_inning=None,
+        current_inning_ordinal=None,
+        inning_state=None,
+        outs=None,
+        innings=(),
+        away=None,
+        home=None,
+    ):
+        self.has_data = has_data
+        self.current_inning = current_inning
+        self.current_inning_ordinal = current_inning_ordinal
+        self.inning_state = inning_state
+        self.outs = outs
+        self.innings = innings
+        self.away = away
+        self.home = home
+
+
+class Feed(_Record):
+    """A game's media feed (or highlight)."""
+
+    __slots__ = (
+        "media_playback_id",
+        "content_id",
+        "media_state",
+        "event_id",
+        "call_letters",
+        "playback_url",
+    )
+    KEYS = {
+        "mediaPlaybackId": ("media_playback_id", None),
+        "contentId": ("content_id", None),
+        "mediaState": ("media_state", None),
+        "eventId": ("event_id", None),
+        "callLetters": ("call_letters", None),
+        "playback_url": ("playback_url", None),
+    }
+
+    def __init__(
+        self,
+        media_playback_id=None,
+        content_id=None,
+        media_state=None,
+        event_id=None,
+        call_letters=None,
+        playback_url=None,
+    ):
+        self.media_playback_id = media_playback_id
+        self.content_id = content_id
+        self.media_state = media_state
+        self.event_id = event_id
+        self.call_letters = call_letters
+        self.playback_url = playback_url
+
+
+class GameRecord(_Record):
+    """A scheduled game. feed is a dictionary of Feed indexed by feed type.
+    preview, summary and feed are only extracted from the game's schedule JSON
+    (kept by reference) when first accessed, as most runs use none of them.
+    """
+
+    __slots__ = (
+        "game_pk",
+        "abstract_game_state",  # Preview, Live, Final
+        "coded_game_state",  # is something like: F, O, C, I
+        # is something like: Scheduled, Live, Final, In Progress, Critical, Postponed:
+        "detailed_state",
+        "double_header",
+        "game_number",
+        "mlbdate",
+        "resume_date",
+        "resumed_from",
+        "games_in_series",
+        "series_game_number",
+        "linescore",
+        "away",
+        "home",
+        "favourite",
+        "_game",
+        "_preview",
+        "_summary",
+        "_feed",
+    )
+    KEYS = {
+        "game_pk": ("game_pk", str),
+        "abstractGameState": ("abstract_game_state", None),
+        "codedGameState": ("coded_game_state", None),
+        "detailedState": ("detailed_state", None),
+        "doubleHeader": ("double_header", None),
+        "gameNumber": ("game_number", str),
+        "mlbdate": ("mlbdate", None),
+        "resumeDate": ("resume_date", None),
+        "resumedFrom": ("resumed_from", None),
+        "gamesInSeries": ("games_in_series", str),
+        "seriesGameNumber": ("series_game_number", str),
+        "linescore": ("linescore", None),
+        "away": ("away", None),
+        "home": ("home", None),
+        "favourite": ("favourite", None),
+        "preview": ("preview", None),
+        "summary": ("summary", None),
+        "feed": ("feed", None),
+    }
+
+    def __init__(
+        self,
+        game_pk,
+        abstract_game_state=None,
+        coded_game_state=None,
+        detailed_state=None,
+        double_header="N",
+        game_number=1,
+        mlbdate=None,
+        games_in_series=0,
+        series_game_number=0,
+        game=None,
+    ):
+        self.game_pk = game_pk
+        self.abstract_game_state = abstract_game_state
+        self.coded_game_state = coded_game_state
+        self.detailed_state = detailed_state
+        self.double_header = double_header
+        self.game_number = game_number
+        self.mlbdate = mlbdate
+        self.resume_date = None
+        self.resumed_from = None
+        self.games_in_series = games_in_series
+        self.series_game_number = series_game_number
+        self.linescore = None
+        self.away = None
+        self.home = None
+        self.favourite = None
+        self._game = game
+        self._preview = _UNPARSED
+        self._summary = _UNPARSED
+        self._feed = _UNPARSED
+
+    @property
+    def preview(self):
+        if self._preview is _UNPARSED:
+            self._preview = None
+            if self._game is not None:
+                self._preview = _parse_preview(
+                    self._game,
+                    config.CONFIG.parser.getboolean("info_display_articles", True),
+                )
+        return self._preview
+
+    @property
+    def summary(self):
+        if self._summary is _UNPARSED:
+            self._summary = None
+            if self._game is not None:
+                self._summary = _parse_summary(
+                    self._game,
+                    config.CONFIG.parser.getboolean("info_display_articles", True),
+                )
+        return self._summary
+
+    @property
+    def feed(self):
+        if self._feed is _UNPARSED:
+            self._feed = dict()
+            if self._game is not None:
+                self._feed = _parse_feeds(
+                    self, self._game, config.CONFIG.parser["playback_scenario"]
+                )
+        return self._feed
+
+
+def _parse_team_info(team_json):
+    # seems to be two different formats for away/home team info(!)
+    if "name" in team_json["team"] and "abbrev" in team_json["team"]["name"]:
+        return TeamInfo(
+            abbrev=str(team_json["team"]["name"]["abbrev"]).lower(),
+            display=str(team_json["team"]["name"]["display"]),
+            brief=str(team_json["team"]["name"]["brief"]),
+            full=str(team_json["team"]["name"]["full"]),
+            league=str(team_json["league"]),
+            division=str(team_json["division"]),
+        )
+    if "abbreviation" in team_json["team"]:
+        return TeamInfo(
+            abbrev=str(team_json["team"]["abbreviation"]).lower(),
+            display=str(team_json["team"]["shortName"]),
+            brief=str(team_json["team"]["teamName"]),
+            full=str(team_json["team"]["name"]),
+            league="n/a",
+            division="n/a",
+        )
+    LOG.error("Unexpected game['teams'] entry")
+    pprint.pprint(team_json)
+    return TeamInfo(
+        abbrev="n/a",
+        display="n/a",
+        brief="n/a",
+        full="n/a",
+        league="n/a",
+        division="n/a",
+    )
+
+
+def _parse_linescore(game, detailed_state):
+    if "linescore" not in game:
+        return Linescore(
+            has_data=False,
+            current_inning_ordinal=detailed_state,
+            inning_state="",
+            innings=(),
+        )
+    linescore_json = game["linescore"]
+    linescore = Linescore(has_data=True, outs=linescore_json.get("outs"))
+    if "currentInning" in linescore_json:
+        linescore.current_inning = int(linescore_json["currentInning"])
+    if "currentInningOrdinal" in linescore_json:
+        linescore.current_inning_ordinal = str(linescore_json["currentInningOrdinal"])
+        linescore.inning_state = str(
+            linescore_json.get("inningState", linescore_json.get("inningHalf"))
+        )[:3]
+    else:
+        linescore.current_inning_ordinal = "Not Started"
+        linescore.inning_state = ""
+    linescore.innings = tuple(
+        (
+            inning["num"],
+            inning["away"].get("runs"),
+            inning["home"].get("runs"),
+        )
+        for inning in linescore_json.get("innings", ())
+    )
+    for teamtype in ("away", "home"):
+        if (
+            teamtype in linescore_json.get("teams", ())
+            and "runs" in linescore_json["teams"][teamtype]
+        ):
+            team_json = linescore_json["teams"][teamtype]
+            setattr(
+                linescore,
+                teamtype,
+                TeamScore(
+                    runs=int(team_json["runs"]),
+                    hits=int(team_json["hits"]),
+                    errors=int(team_json["errors"]),
+                ),
+            )
+    return linescore
+
+
+def _parse_preview(game, display_articles):
+    """Returns the preview lines for a game (the probable pitchers)."""
+    preview = list()
+    try:
+        if (
+            "probablePitcher" in game["teams"]["away"]
+            or "probablePitcher" in game["teams"]["home"]
+        ):
+            preview.append("Probable Pitchers")
+            preview.append("-----------------")
+            for teamtype in ("away", "home"):
+                if "probablePitcher" in game["teams"][teamtype]:
+                    # if config.CONFIG.parser['info_display_articles'] and 'fullName' in game['teams'][teamtype]['probablePitcher']:
+                    if "fullName" in game["teams"][teamtype]["probablePitcher"]:
+                        pitcher_name = " ".join(
+                            reversed(
+                                game["teams"][teamtype]["probablePitcher"][
+                                    "fullName"
+                                ].split(",")
+                            )
+                        ).strip()
+                        if (
+                            display_articles
+                            and "note" in game["teams"][teamtype]["probablePitcher"]
+                        ):
+                            note = game["teams"][teamtype]["probablePitcher"]["note"]
+                            preview.append(
+                                "{}: {}: {}".format(
+                                    game["teams"][teamtype]["team"]["teamName"],
+                                    pitcher_name,
+                                    note,
+                                )
+                            )
+                        else:
+                            preview.append(
+                                "{}: {}".format(
+                                    game["teams"][teamtype]["team"]["teamName"],
+                                    pitcher_name,
+                                )
+                            )
+                        if display_articles and teamtype == "away":
+                            preview.append("")
+
+    except:
+        preview = None
+    return preview
+
+
+def _parse_summary(game, display_articles):
+    """Returns the summary lines for a game (the recap article)."""
+    summary = list()
+    try:
+        if "headline" in game["content"]["editorial"]["recap"]["mlb"]:
+            summary.append(
+                "SUMMARY: " + game["content"]["editorial"]["recap"]["mlb"]["headline"]
+            )
+        if "subhead" in game["content"]["editorial"]["recap"]["mlb"]:
+            summary.append(
+                "         " + game["content"]["editorial"]["recap"]["mlb"]["subhead"]
+            )
+        if display_articles:
+            if len(summary) > 0:
+                summary.append("")
+            if "seoTitle" in game["content"]["editorial"]["recap"]["mlb"]:
+                # game_rec['summary'].append('TITLE: ' + game['content']['editorial']['recap']['mlb']['seoTitle'])
+                summary.append(game["content"]["editorial"]["recap"]["mlb"]["seoTitle"])
+                summary.append(
+                    "-" * len(game["content"]["editorial"]["recap"]["mlb"]["seoTitle"])
+                )
+            if "body" in game["content"]["editorial"]["recap"]["mlb"]:
+                summary.append(game["content"]["editorial"]["recap"]["mlb"]["body"])
+    except:
+        summary = None
+    return summary
+
+
+def _parse_feeds(game_rec, game, playback_scenario):
+    """Returns a dictionary of Feed indexed by feed type, for the game's media."""
+    feeds = dict()
+    if game_rec.abstract_game_state == "Preview":
+        return feeds
+
+    # epg
+    if "media" in game["content"] and "epg" in game["content"]["media"]:
+        for media in game["content"]["media"]["epg"]:
+            if media["title"] == "MLBTV":
+                for stream in media["items"]:
+                    if (
+                        stream["mediaFeedType"] != "COMPOSITE"
+                        and stream["mediaFeedType"] != "ISO"
+                    ):
+                        feedtype = str(
+                            stream["mediaFeedType"]
+                        ).lower()  # home, away, national, french, ...
+                        # Fix Issue #23 - resumed games show up on original day media feeds, with multiple entries for home and away
+                        # Handle it by naming the feed away-resume, home-resume, etc
+                        if (
+                            game_rec.resume_date is not None
+                            or game_rec.resumed_from is not None
+                        ):
+                            resume_feedtype = feedtype + "-resume"
+                            if resume_feedtype not in feeds:
+                                feedtype = resume_feedtype
+                        else:
+                            # Maybe there is other cases where there is multiple home/away feeds?
+                            extrafeednum = 2
+                            while feedtype in feeds:
+                                feedtype += "{}".format(extrafeednum)
+                        feeds[feedtype] = Feed()
+                        if "mediaId" in stream:
+                            feeds[feedtype] = Feed(
+                                media_playback_id=str(stream["mediaId"]),
+                                content_id=str(stream["contentId"])
+                                if "contentId" in stream
+                                else None,
+                                media_state=str(stream["mediaState"]),
+                                event_id=str(stream["id"]),
+                                call_letters=str(stream["callLetters"]),
+                            )
+        if "epgAlternate" in game["content"]["media"]:
+            for media in game["content"]["media"]["epgAlternate"]:
+                if media["title"] == "Extended Highlights":
+                    feedtype = "condensed"
+                    if len(media["items"]) > 0:
+                        stream = media["items"][0]
+                        feeds[feedtype] = Feed(
+                            media_playback_id=str(stream["mediaPlaybackId"])
+                        )
+                        for playback_item in stream["playbacks"]:
+                            if playback_item["name"] == playback_scenario:
+                                feeds[feedtype].playback_url = playback_item["url"]
+                elif media["title"] == "Daily Recap":
+                    feedtype = "recap"
+                    if len(media["items"]) > 0:
+                        feeds[feedtype] = Feed()
+                        stream = media["items"][0]
+                        for playback_item in stream["playbacks"]:
+                            if playback_item["name"] == playback_scenario:
+                                feeds[feedtype].playback_url = playback_item["url"]
+                        if feeds[feedtype].media_playback_id is not None:
+                            feeds[feedtype].media_playback_id = str(
+                                stream["mediaPlaybackId"]
+                            )
+                        else:
+                            # For Issue #46
+                            LOG.debug(
+                                "No mediaPlaybackId for %s: %s at %s, game#: %s",
+                                game_rec.game_pk,
+                                game_rec.away.abbrev,
+                                game_rec.home.abbrev,
+                                game_rec.game_number,
+                            )
+                # elif media['title'] == 'Audio':
+                #     for stream in media['items']:
+                #         feedtype = 'audio-' + str(stream['mediaFeedType']).lower()  # home, away, national, french, ...
+                #         game_rec['feed'][feedtype] = dict()
+                #         game_rec['feed'][feedtype]['mediaPlaybackId'] = str(stream['mediaId'])
+                #         game_rec['feed'][feedtype]['eventId'] = str(stream['id'])
+                #         game_rec['feed'][feedtype]['callLetters'] = str(stream['callLetters'])
+    return feeds
+
+
 class GameDataRetriever:
     """Retrieves and parses game data from statsapi.mlb.com"""
 
-    def _get_games_by_date(self, date_str=None):
-        if date_str is None:
-            date_str = time.strftime("%Y-%m-%d")
+    def __init__(self, hydrate_profile=HYDRATE_ALL):
+        self.hydrate_profile = frozenset(hydrate_profile)
 
+    def _get_schedule_url(self, start_date_str, end_date_str, hydrate_profile=None):
         # https://statsapi.mlb.com/api/v1/schedule?sportId=1&startDate=2018-03-26&endDate=2018-03-26&hydrate=schedule.teams,schedule.linescore,schedule.game.content.media.epg
-        # hydrate = 'hydrate=schedule.teams,schedule.linescore,schedule.game.content.media.epg'
-        hydrate = "hydrate=broadcasts(all),game(content(media(epg)),editorial(preview,recap)),linescore,team,probablePitcher(note)"
-        # hydrate = 'hydrate=linescore,team,game(content(summary,media(epg),editorial(preview,recap),highlights(highlights(items))))'
-
-        # "&hydrate=linescore,team,game(content(summary,media(epg),editorial(preview,recap),highlights(highlights(items))))"
-
-        # hydrate = 'hydrate=linescore,team,game(content(summary,media(epg)),tickets)'
-        url = "{0}/api/v1/schedule?sportId=1&startDate={1}&endDate={1}&{2}".format(
-            config.CONFIG.parser["api_url"], date_str, hydrate
+        if hydrate_profile is None:
+            hydrate_profile = self.hydrate_profile
+        url = "{0}/api/v1/schedule?sportId=1&startDate={1}&endDate={2}&{3}".format(
+            config.CONFIG.parser["api_url"],
+            start_date_str,
+            end_date_str,
+            _get_hydrate(hydrate_profile),
         )
+        return request.get_projected_url(url, SCHEDULE_FIELDS)
 
-        json_data = request.request_json(
-            url, "gamedata-{}".format(date_str), cache_stale=request.CACHE_SHORT
+    def _get_schedule_job(self, date_str, hydrate_profile=None):
+        """Returns the (url, output_filename, cache_stale, ttl_policy) request for the given date."""
+        url = self._get_schedule_url(date_str, date_str, hydrate_profile)
+        return (
+            url,
+            "gamedata-{}".format(date_str),
+            request.CACHE_SHORT,
+            request.get_schedule_ttl_class,
         )
 
+    def _get_cached_schedule(self, date_str):
+        """Returns a fresh cached schedule for the date, if there is one for our hydrate
+        profile or any richer one (each profile is cached separately)."""
+        for hydrate_profile in _get_superset_profiles(self.hydrate_profile):
+            url, output_filename, cache_stale, _ = self._get_schedule_job(
+                date_str, hydrate_profile
+            )
+            json_data = request.get_cached_json(url, output_filename, cache_stale)
+            if json_data is not None:
+                return json_data
+        return None
+
+    def _get_games_by_date(self, date_str=None):
+        if date_str is None:
+            date_str = time.strftime("%Y-%m-%d")
+        json_data = self._get_cached_schedule(date_str)
+        if json_data is None:
+            json_data = request.request_json(*self._get_schedule_job(date_str))
+        return self._parse_games(json_data, date_str)
+
+    def _parse_games(self, json_data, date_str):
+        """Returns a dictionary of GameRecord indexed by game_pk string,
+        or None if there are no games."""
         game_records = dict()  # we return this dictionary
 
         if json_data["dates"] is None or len(json_data["dates"]) < 1:
@@ -75,321 +826,30 @@ class GameDataRetriever:
 
         for game in json_data["dates"][0]["games"]:
             # LOG.debug('game: {}'.format(game))
-            game_pk_str = str(game["gamePk"])
-            game_records[game_pk_str] = dict()
-            game_rec = game_records[game_pk_str]
-            game_rec["game_pk"] = game_pk_str
-
-            game_rec["abstractGameState"] = str(
-                game["status"]["abstractGameState"]
-            )  # Preview, Live, Final
-            game_rec["codedGameState"] = str(
-                game["status"]["codedGameState"]
-            )  # is something like: F, O, C, I
-            # is something like: Scheduled, Live, Final, In Progress, Critical, Postponed:
-            game_rec["detailedState"] = str(game["status"]["detailedState"])
-            game_rec["doubleHeader"] = str(game["doubleHeader"])
-            game_rec["gameNumber"] = str(game["gameNumber"])
-            game_rec["mlbdate"] = parser.parse(str(game["gameDate"]))
+            game_rec = GameRecord(
+                game_pk=int(game["gamePk"]),
+                abstract_game_state=str(game["status"]["abstractGameState"]),
+                coded_game_state=str(game["status"]["codedGameState"]),
+                detailed_state=str(game["status"]["detailedState"]),
+                double_header=str(game["doubleHeader"]),
+                game_number=int(game["gameNumber"]),
+                mlbdate=util.parse_datetime(str(game["gameDate"])),
+                games_in_series=int(game.get("gamesInSeries", 0)),
+                series_game_number=int(game.get("seriesGameNumber", 0)),
+                game=game,
+            )
+            game_records[str(game_rec.game_pk)] = game_rec
 
             # Issue #23 handle resumed games
             if "resumeDate" in game:
-                game_rec["resumeDate"] = parser.parse(str(game["resumeDate"]))
+                game_rec.resume_date = util.parse_datetime(str(game["resumeDate"]))
             if "resumedFrom" in game:
-                game_rec["resumedFrom"] = parser.parse(str(game["resumedFrom"]))
-
-            if "gamesInSeries" in game:
-                game_rec["gamesInSeries"] = str(game["gamesInSeries"])
-                game_rec["seriesGameNumber"] = str(game["seriesGameNumber"])
-            else:
-                game_rec["gamesInSeries"] = "0"
-                game_rec["seriesGameNumber"] = "0"
-
-            game_rec["linescore"] = dict()
-            if "linescore" in game:
-                game_rec["linescore"]["raw"] = game["linescore"]
-                if "Delayed" in game_rec["detailedState"]:
-                    game_rec["linescore"]["currentInning"] = str(
-                        game_rec["detailedState"]
-                    )
-                    game_rec["linescore"]["currentInningOrdinal"] = "Not Started"
-                    game_rec["linescore"]["inningState"] = ""
-                elif "currentInning" in game["linescore"]:
-                    game_rec["linescore"]["currentInning"] = str(
-                        game["linescore"]["currentInning"]
-                    )
-                else:
-                    game_rec["linescore"]["currentInningOrdinal"] = "0"
-                if "currentInningOrdinal" in game["linescore"]:
-                    game_rec["linescore"]["currentInningOrdinal"] = str(
-                        game["linescore"]["currentInningOrdinal"]
-                    )
-                    if "inningState" in game["linescore"]:
-                        game_rec["linescore"]["inningState"] = str(
-                            game["linescore"]["inningState"]
-                        )[:3]
-                    else:
-                        game_rec["linescore"]["inningState"] = str(
-                            game["linescore"]["inningHalf"]
-                        )[:3]
-                else:
-                    game_rec["linescore"]["currentInningOrdinal"] = "Not Started"
-                    game_rec["linescore"]["inningState"] = ""
-            else:
-                game_rec["linescore"]["currentInning"] = "n/a"
-                game_rec["linescore"]["inningState"] = ""
-                game_rec["linescore"]["currentInningOrdinal"] = game_rec[
-                    "detailedState"
-                ]
-
-            for teamtype in ("home", "away"):
-                # pprint.pprint(game['teams'])
-                game_rec[teamtype] = dict()
-                # seems to be two different formats for away/home team info(!)
-                if (
-                    "name" in game["teams"][teamtype]["team"]
-                    and "abbrev" in game["teams"][teamtype]["team"]["name"]
-                ):
-                    game_rec[teamtype] = {
-                        "abbrev": str(
-                            game["teams"][teamtype]["team"]["name"]["abbrev"]
-                        ).lower(),
-                        "display": str(
-                            game["teams"][teamtype]["team"]["name"]["display"]
-                        ),
-                        "brief": str(game["teams"][teamtype]["team"]["name"]["brief"]),
-                        "full": str(game["teams"][teamtype]["team"]["name"]["full"]),
-                        "league": str(game["teams"][teamtype]["league"]),
-                        "division": str(game["teams"][teamtype]["division"]),
-                    }
-                elif "abbreviation" in game["teams"][teamtype]["team"]:
-                    game_rec[teamtype] = {
-                        "abbrev": str(
-                            game["teams"][teamtype]["team"]["abbreviation"]
-                        ).lower(),
-                        "display": str(game["teams"][teamtype]["team"]["shortName"]),
-                        "brief": str(game["teams"][teamtype]["team"]["teamName"]),
-                        "full": str(game["teams"][teamtype]["team"]["name"]),
-                        "league": "n/a",
-                        "division": "n/a",
-                    }
-                else:
-                    LOG.error("Unexpected game['teams'] for teamtype=%s", teamtype)
-                    pprint.pprint(game["teams"][teamtype])
-                    game_rec[teamtype] = {
-                        "abbrev": "n/a",
-                        "display": "n/a",
-                        "brief": "n/a",
-                        "full": "n/a",
-                        "league": "n/a",
-                        "division": "n/a",
-                    }
-
-                if (
-                    "linescore" in game
-                    and teamtype in game["linescore"]["teams"]
-                    and "runs" in game["linescore"]["teams"][teamtype]
-                ):
-                    game_rec["linescore"][teamtype] = {
-                        "runs": str(game["linescore"]["teams"][teamtype]["runs"]),
-                        "hits": str(game["linescore"]["teams"][teamtype]["hits"]),
-                        "errors": str(game["linescore"]["teams"][teamtype]["errors"]),
-                    }
-                else:
-                    game_rec["linescore"][teamtype] = {
-                        "runs": "0",
-                        "hits": "0",
-                        "errors": "0",
-                    }
-
-            game_rec["favourite"] = gamedata.is_fav(game_rec)
-
-            game_rec["preview"] = list()
-            try:
-                if (
-                    "probablePitcher" in game["teams"]["away"]
-                    or "probablePitcher" in game["teams"]["home"]
-                ):
-                    game_rec["preview"].append("Probable Pitchers")
-                    game_rec["preview"].append("-----------------")
-                    for teamtype in ("away", "home"):
-                        if "probablePitcher" in game["teams"][teamtype]:
-                            # if config.CONFIG.parser['info_display_articles'] and 'fullName' in game['teams'][teamtype]['probablePitcher']:
-                            if "fullName" in game["teams"][teamtype]["probablePitcher"]:
-                                pitcher_name = " ".join(
-                                    reversed(
-                                        game["teams"][teamtype]["probablePitcher"][
-                                            "fullName"
-                                        ].split(",")
-                                    )
-                                ).strip()
-                                if (
-                                    config.CONFIG.parser.getboolean(
-                                        "info_display_articles"
-                                    )
-                                    and "note"
-                                    in game["teams"][teamtype]["probablePitcher"]
-                                ):
-                                    note = game["teams"][teamtype]["probablePitcher"][
-                                        "note"
-                                    ]
-                                    game_rec["preview"].append(
-                                        "{}: {}: {}".format(
-                                            game["teams"][teamtype]["team"]["teamName"],
-                                            pitcher_name,
-                                            note,
-                                        )
-                                    )
-                                else:
-                                    game_rec["preview"].append(
-                                        "{}: {}".format(
-                                            game["teams"][teamtype]["team"]["teamName"],
-                                            pitcher_name,
-                                        )
-                                    )
-                                if (
-                                    config.CONFIG.parser.getboolean(
-                                        "info_display_articles"
-                                    )
-                                    and teamtype == "away"
-                                ):
-                                    game_rec["preview"].append("")
-
-            except:
-                game_rec["preview"] = None
-
-            game_rec["summary"] = list()
-            try:
-                if "headline" in game["content"]["editorial"]["recap"]["mlb"]:
-                    game_rec["summary"].append(
-                        "SUMMARY: "
-                        + game["content"]["editorial"]["recap"]["mlb"]["headline"]
-                    )
-                if "subhead" in game["content"]["editorial"]["recap"]["mlb"]:
-                    game_rec["summary"].append(
-                        "         "
-                        + game["content"]["editorial"]["recap"]["mlb"]["subhead"]
-                    )
-                if config.CONFIG.parser.getboolean("info_display_articles", True):
-                    if len(game_rec["summary"]) > 0:
-                        game_rec["summary"].append("")
-                    if "seoTitle" in game["content"]["editorial"]["recap"]["mlb"]:
-                        # game_rec['summary'].append('TITLE: ' + game['content']['editorial']['recap']['mlb']['seoTitle'])
-                        game_rec["summary"].append(
-                            game["content"]["editorial"]["recap"]["mlb"]["seoTitle"]
-                        )
-                        game_rec["summary"].append(
-                            "-"
-                            * len(
-                                game["content"]["editorial"]["recap"]["mlb"]["seoTitle"]
-                            )
-                        )
-                    if "body" in game["content"]["editorial"]["recap"]["mlb"]:
-                        game_rec["summary"].append(
-                            game["content"]["editorial"]["recap"]["mlb"]["body"]
-                        )
-            except:
-                game_rec["summary"] = None
-
-            game_rec["feed"] = dict()
-            if game_rec["abstractGameState"] == "Preview":
-                continue
+                game_rec.resumed_from = util.parse_datetime(str(game["resumedFrom"]))
 
-            # epg
-            if "media" in game["content"] and "epg" in game["content"]["media"]:
-                for media in game["content"]["media"]["epg"]:
-                    if media["title"] == "MLBTV":
-                        for stream in media["items"]:
-                            if (
-                                stream["mediaFeedType"] != "COMPOSITE"
-                                and stream["mediaFeedType"] != "ISO"
-                            ):
-                                feedtype = str(
-                                    stream["mediaFeedType"]
-                                ).lower()  # home, away, national, french, ...
-                                # Fix Issue #23 - resumed games show up on original day media feeds, with multiple entries for home and away
-                                # Handle it by naming the feed away-resume, home-resume, etc
-                                if (
-                                    "resumeDate" in game_rec
-                                    or "resumedFrom" in game_rec
-                                ):
-                                    resume_feedtype = feedtype + "-resume"
-                                    if resume_feedtype not in game_rec["feed"]:
-                                        feedtype = resume_feedtype
-                                else:
-                                    # Maybe there is other cases where there is multiple home/away feeds?
-                                    extrafeednum = 2
-                                    while feedtype in game_rec["feed"]:
-                                        feedtype += "{}".format(extrafeednum)
-                                game_rec["feed"][feedtype] = dict()
-                                if "mediaId" in stream:
-                                    game_rec["feed"][feedtype]["mediaPlaybackId"] = str(
-                                        stream["mediaId"]
-                                    )
-                                    if "contentId" in stream:
-                                        game_rec["feed"][feedtype]["contentId"] = str(
-                                            stream["contentId"]
-                                        )
-                                    game_rec["feed"][feedtype]["mediaState"] = str(
-                                        stream["mediaState"]
-                                    )
-                                    game_rec["feed"][feedtype]["eventId"] = str(
-                                        stream["id"]
-                                    )
-                                    game_rec["feed"][feedtype]["callLetters"] = str(
-                                        stream["callLetters"]
-                                    )
-                if "epgAlternate" in game["content"]["media"]:
-                    for media in game["content"]["media"]["epgAlternate"]:
-                        if media["title"] == "Extended Highlights":
-                            feedtype = "condensed"
-                            if len(media["items"]) > 0:
-                                game_rec["feed"][feedtype] = dict()
-                                stream = media["items"][0]
-                                game_rec["feed"][feedtype]["mediaPlaybackId"] = str(
-                                    stream["mediaPlaybackId"]
-                                )
-                                for playback_item in stream["playbacks"]:
-                                    if (
-                                        playback_item["name"]
-                                        == config.CONFIG.parser["playback_scenario"]
-                                    ):
-                                        game_rec["feed"][feedtype][
-                                            "playback_url"
-                                        ] = playback_item["url"]
-                        elif media["title"] == "Daily Recap":
-                            feedtype = "recap"
-                            if len(media["items"]) > 0:
-                                game_rec["feed"][feedtype] = dict()
-                                stream = media["items"][0]
-                                for playback_item in stream["playbacks"]:
-                                    if (
-                                        playback_item["name"]
-                                        == config.CONFIG.parser["playback_scenario"]
-                                    ):
-                                        game_rec["feed"][feedtype][
-                                            "playback_url"
-                                        ] = playback_item["url"]
-                                if "mediaPlaybackId" in game_rec["feed"][feedtype]:
-                                    game_rec["feed"][feedtype]["mediaPlaybackId"] = str(
-                                        stream["mediaPlaybackId"]
-                                    )
-                                else:
-                                    # For Issue #46
-                                    LOG.debug(
-                                        "No mediaPlaybackId for %s: %s at %s, game#: %s",
-                                        game_rec["game_pk"],
-                                        game_rec["away"]["abbrev"],
-                                        game_rec["home"]["abbrev"],
-                                        game_rec["gameNumber"],
-                                    )
-                        # elif media['title'] == 'Audio':
-                        #     for stream in media['items']:
-                        #         feedtype = 'audio-' + str(stream['mediaFeedType']).lower()  # home, away, national, french, ...
-                        #         game_rec['feed'][feedtype] = dict()
-                        #         game_rec['feed'][feedtype]['mediaPlaybackId'] = str(stream['mediaId'])
-                        #         game_rec['feed'][feedtype]['eventId'] = str(stream['id'])
-                        #         game_rec['feed'][feedtype]['callLetters'] = str(stream['callLetters'])
+            game_rec.linescore = _parse_linescore(game, game_rec.detailed_state)
+            game_rec.away = _parse_team_info(game["teams"]["away"])
+            game_rec.home = _parse_team_info(game["teams"]["home"])
+            game_rec.favourite = gamedata.is_fav(game_rec)
 
         return game_records
 
@@ -398,26 +858,145 @@ class GameDataRetriever:
         pass
 
     def process_game_data(self, game_date, num_days=1):
-        game_days_list = list()
+        """Returns a list of (date_str, game_records) for each day with games."""
+        return list(self.iter_game_data(game_date, num_days))
+
+    def iter_game_data(self, game_date, num_days=1):
+        """Yields (date_str, game_records) for each day with games, in date order, as soon
+        as each day is available. Cached days are yielded straight away. A day with a
+        stale cache entry is requested on its own, so that it can be revalidated or
+        served while it is refreshed. The days with no entry at all are fetched in date
+        ranges, with the first day on its own if it is one of them so that it can be
+        shown as soon as possible. The requests are all made concurrently."""
+        game_dates = list()
         for _ in range(0, num_days):
-            game_records = self._get_games_by_date(game_date)
-            if game_records is not None:
-                game_days_list.append((game_date, game_records))
+            game_dates.append(game_date)
             game_date = datetime.strftime(
                 datetime.strptime(game_date, "%Y-%m-%d") + timedelta(days=1), "%Y-%m-%d"
             )
-        return game_days_list
+        schedules = {
+            date_str: self._get_cached_schedule(date_str) for date_str in game_dates
+        }
+        # (start_date_str, end_date_str, job) for each request, in date order
+        requests = list()
+        uncached_dates = list()
+        for date_str in game_dates:
+            if schedules[date_str] is not None:
+                continue
+            job = self._get_schedule_job(date_str)
+            if request.has_cache_entry(*job[:3]):
+                requests.append((date_str, date_str, job))
+            else:
+                uncached_dates.append(date_str)
+        # one request per run of uncached days, which is then cached by day
+        for start_date_str, end_date_str in _get_date_ranges(
+            uncached_dates,
+            # nothing to show until the first day is in
+            first_day_alone=bool(game_dates) and game_dates[0] in uncached_dates,
+        ):
+            requests.append(
+                (
+                    start_date_str,
+                    end_date_str,
+                    (self._get_schedule_url(start_date_str, end_date_str), None, None),
+                )
+            )
+        requests.sort(key=lambda item: item[0])
+        results = request.request_json_iter(
+            [job for _, _, job in requests], fetch=_fetch_schedule
+        )
+        request_results = zip(requests, results)
+        for date_str in game_dates:
+            if schedules[date_str] is None:
+                # this day starts the next request: wait for it
+                (start_date_str, end_date_str, job), (result, error) = next(
+                    request_results
+                )
+                if error is not None:
+                    raise error
+                if job[1] is not None:
+                    schedules[date_str] = result
+                else:
+                    json_data, validators = result
+                    schedules.update(
+                        self._split_schedule(
+                            json_data, start_date_str, end_date_str, validators
+                        )
+                    )
+            game_records = self._parse_games(schedules[date_str], date_str)
+            if game_records is not None:
+                yield date_str, game_records
+
+    def _split_schedule(self, json_data, start_date_str, end_date_str, validators=None):
+        """Splits a schedule response for a date range into one per day, caching each
+        with the response's validators (see request.download_json()).
+        Returns a dictionary of the schedules indexed by date string."""
+        dates = {date_rec["date"]: date_rec for date_rec in json_data["dates"] or ()}
+        schedules = dict()
+        for date_str in _get_dates_in_range(start_date_str, end_date_str):
+            schedule = dict(json_data)
+            # days without games are left out of the response
+            schedule["dates"] = [dates[date_str]] if date_str in dates else []
+            url, output_filename, cache_stale, ttl_policy = self._get_schedule_job(
+                date_str
+            )
+            request.save_json(
+                url,
+                output_filename,
+                schedule,
+                cache_stale,
+                ttl_policy,
+                **(validators or {})
+            )
+            schedules[date_str] = schedule
+        return schedules
 
     @staticmethod
-    def get_boxscore(game_pk):
-        url = "{0}/api/v1/game/{1}/boxscore".format(
-            config.CONFIG.parser["api_url"], game_pk
+    def _get_boxscore_job(game_pk, game_rec=None):
+        url = request.get_projected_url(
+            "{0}/api/v1/game/{1}/boxscore".format(
+                config.CONFIG.parser["api_url"], game_pk
+            ),
+            BOXSCORE_FIELDS,
         )
+        ttl_policy = None
+        if game_rec is not None:
+            # the boxscore does not carry the game state, so use what the schedule says
+            ttl_policy = request.get_game_ttl_policy(
+                game_rec.abstract_game_state, game_rec.mlbdate
+            )
+        return url, "boxscore-{}".format(game_pk), request.CACHE_SHORT, ttl_policy
+
+    @staticmethod
+    def get_boxscore(game_pk, game_rec=None):
         json_data = request.request_json(
-            url, "boxscore-{}".format(game_pk), cache_stale=request.CACHE_SHORT
+            *GameDataRetriever._get_boxscore_job(game_pk, game_rec)
         )
         return json_data
 
+    @staticmethod
+    def get_boxscores(game_recs, max_workers=None):
+        """Fetches the boxscores for the given games concurrently.
+        Returns a dictionary of boxscore json data indexed by game_pk.
+        Failed fetches are logged and left out.
+        """
+        results = request.request_json_many(
+            [
+                GameDataRetriever._get_boxscore_job(game_rec.game_pk, game_rec)
+                for game_rec in game_recs
+            ],
+            max_workers,
+        )
+        boxscores = dict()
+        for game_rec, (json_data, error) in zip(game_recs, results):
+            if error is not None:
+                LOG.error(
+                    "Could not retrieve boxscore for %s: %s", game_rec.game_pk, error
+                )
+                continue
+            boxscores[game_rec.game_pk] = json_data
+        return boxscores
+
 
 class GameDatePresenter:
     """Formats game data for CLI output."""
@@ -425,7 +1004,7 @@ class GameDatePresenter:
     def __get_feeds_for_display(self, game_rec):
         non_highlight_feeds = list()
         use_short_feeds = config.CONFIG.parser.getboolean("use_short_feeds", True)
-        for feed in sorted(game_rec["feed"].keys()):
+        for feed in sorted(game_rec.feed):
             if feed not in config.HIGHLIGHT_FEEDTYPES and not feed.startswith("audio-"):
                 if use_short_feeds:
                     non_highlight_feeds.append(
@@ -434,7 +1013,7 @@ class GameDatePresenter:
                 else:
                     non_highlight_feeds.append(feed)
         highlight_feeds = list()
-        for feed in game_rec["feed"].keys():
+        for feed in game_rec.feed:
             if feed in config.HIGHLIGHT_FEEDTYPES and not feed.startswith("audio-"):
                 if use_short_feeds:
                     highlight_feeds.append(
@@ -523,27 +1102,38 @@ class GameDatePresenter:
         header = self._get_header(border, game_date, show_scores, show_linescore)
         outl.extend(header)
 
-        games_displayed_count = 0
-        for game_pk in game_records:
-            if (
-                gamedata.apply_filter(game_records[game_pk], filter, mlbapidata.FILTERS)
-                is not None
-            ):
-                games_displayed_count += 1
-                outl.extend(
-                    self._display_game_details(
-                        header,
-                        game_pk,
-                        game_records[game_pk],
-                        show_linescore,
-                        show_boxscore,
-                        show_info,
-                        games_displayed_count,
-                    )
+        game_pks = [
+            game_pk
+            for game_pk in game_records
+            if gamedata.apply_filter(game_records[game_pk], filter, mlbapidata.FILTERS)
+            is not None
+        ]
+        boxscores = dict()
+        if show_boxscore and game_pks:
+            # fetch all the boxscores concurrently up front, rendering then reads them
+            # from memory rather than fetching one game at a time
+            boxscores = GameDataRetriever.get_boxscores(
+                [game_records[game_pk] for game_pk in game_pks]
+            )
+
+        for games_displayed_count, game_pk in enumerate(game_pks, 1):
+            outl.extend(
+                self._display_game_details(
+                    header,
+                    game_pk,
+                    game_records[game_pk],
+                    show_linescore,
+                    show_boxscore,
+                    show_info,
+                    games_displayed_count,
+                    boxscores.get(game_records[game_pk].game_pk),
                 )
-        if games_displayed_count > 0:
+            )
+        if game_pks:
             for line in outl:
                 print(line)
+            # show each day as it is done, when output is piped/buffered
+            sys.stdout.flush()
 
     def _display_game_details(
         self,
@@ -554,7 +1144,9 @@ class GameDatePresenter:
         show_boxscore,
         show_info,
         games_displayed_count,
+        boxscore=None,
     ):
+        """boxscore is the game's prefetched boxscore json, if any."""
         show_scores = config.CONFIG.parser.getboolean("scores")
         outl = list()
         if games_displayed_count > 1:
@@ -575,80 +1167,78 @@ class GameDatePresenter:
             if config.CONFIG.parser["fav_colour"] != "":
                 color_on = ANSI.fg(config.CONFIG.parser["fav_colour"])
                 color_off = ANSI.reset()
-        if game_rec["abstractGameState"] == "Live":
+        if game_rec.abstract_game_state == "Live":
             color_on += ANSI.control_code("bold")
             color_off = ANSI.reset()
-        if game_rec["doubleHeader"] == "N":
+        if game_rec.double_header == "N":
             series_info = "{sgn}/{gis}".format(
-                sgn=game_rec["seriesGameNumber"], gis=game_rec["gamesInSeries"]
+                sgn=game_rec.series_game_number, gis=game_rec.games_in_series
             )
         else:
             # series_info = "DH{gn} {sgn}/{gis}".format(sgn=game_rec['seriesGameNumber'],
             #                                           gis=game_rec['gamesInSeries'],
             #                                           gn=game_rec['gameNumber'])
-            series_info = "DH-{gn}".format(gn=game_rec["gameNumber"])
+            series_info = "DH-{gn}".format(gn=game_rec.game_number)
 
         game_info_str = "{time}: {a1} ({a2}) at {h1} ({h2})".format(
-            time=util.convert_time_to_local(game_rec["mlbdate"]),
-            a1=game_rec["away"]["display"],
-            a2=game_rec["away"]["abbrev"].upper(),
-            h1=game_rec["home"]["display"],
-            h2=game_rec["home"]["abbrev"].upper(),
+            time=util.convert_time_to_local(game_rec.mlbdate),
+            a1=game_rec.away.display,
+            a2=game_rec.away.abbrev.upper(),
+            h1=game_rec.home.display,
+            h2=game_rec.home.abbrev.upper(),
         )
         game_state = ""
         game_state_color_on = color_on
         game_state_color_off = color_off
 
-        if game_rec["abstractGameState"] in ("Preview",):
-            if game_rec["detailedState"] != "Scheduled":
-                if "Delayed" in game_rec["detailedState"]:
+        if game_rec.abstract_game_state in ("Preview",):
+            if game_rec.detailed_state != "Scheduled":
+                if "Delayed" in game_rec.detailed_state:
                     game_state = "Delayed"
                 else:
-                    game_state = game_rec["detailedState"]
+                    game_state = game_rec.detailed_state
         else:
             if show_scores:
-                if game_rec["detailedState"] in ("Critical",):
+                if game_rec.detailed_state in ("Critical",):
                     game_state_color_on = ANSI.fg(
                         config.CONFIG.parser["game_critical_colour"]
                     )
                     game_state_color_off = ANSI.reset()
-                if game_rec["detailedState"] in ("Final",):
-                    game_state = game_rec["detailedState"]
-                    if (
-                        "currentInning" in game_rec["linescore"]
-                        and int(game_rec["linescore"]["currentInning"]) != 9
-                    ):
-                        game_state += "({})".format(
-                            game_rec["linescore"]["currentInning"]
-                        )
+                if game_rec.detailed_state in ("Final",):
+                    game_state = game_rec.detailed_state
+                    current_inning = game_rec.linescore.current_inning
+                    if current_inning is not None and current_inning != 9:
+                        game_state += "({})".format(current_inning)
                 else:
-                    if game_rec["linescore"]["inningState"] != "":
+                    if game_rec.linescore.inning_state != "":
                         game_state = "{} {}".format(
-                            game_rec["linescore"]["inningState"].title(),
-                            game_rec["linescore"]["currentInningOrdinal"],
+                            game_rec.linescore.inning_state.title(),
+                            game_rec.linescore.current_inning_ordinal,
                         )
                     else:
-                        game_state = game_rec["linescore"]["currentInningOrdinal"]
+                        game_state = game_rec.linescore.current_inning_ordinal
             else:
-                game_state = game_rec["abstractGameState"]
-                if "In Progress - " in game_rec["detailedState"]:
-                    game_state = game_rec["detailedState"].split("In Progress - ")[-1]
-                elif game_rec["detailedState"] not in (
+                game_state = game_rec.abstract_game_state
+                if "In Progress - " in game_rec.detailed_state:
+                    game_state = game_rec.detailed_state.split("In Progress - ")[-1]
+                elif game_rec.detailed_state not in (
                     "Live",
                     "Final",
                     "Scheduled",
                     "In Progress",
                 ):
-                    game_state = game_rec["detailedState"]
+                    game_state = game_rec.detailed_state
 
         if show_scores:
             score = ""
-            if game_rec["abstractGameState"] not in ("Preview",) and game_rec[
-                "detailedState"
-            ] not in ("Postponed",):
+            if game_rec.abstract_game_state not in (
+                "Preview",
+            ) and game_rec.detailed_state not in ("Postponed",):
                 score = "{}-{}".format(
-                    game_rec["linescore"]["away"]["runs"],
-                    game_rec["linescore"]["home"]["runs"],
+                    *(
+                        team.runs if team is not None else 0
+                        for team in (game_rec.linescore.away, game_rec.linescore.home)
+                    )
                 )
 
             # linescore
@@ -686,13 +1276,11 @@ class GameDatePresenter:
                     game_info_str = "{series:7}".format(series=series_info)
                 else:
                     if (
-                        game_rec["abstractGameState"] in ("Live",)
-                        and game_rec["linescore"]["inningState"] != "Mid"
-                        and "raw" in game_rec["linescore"]
+                        game_rec.abstract_game_state in ("Live",)
+                        and game_rec.linescore.inning_state != "Mid"
+                        and game_rec.linescore.has_data
                     ):
-                        outs_info = ", {} out".format(
-                            game_rec["linescore"]["raw"]["outs"]
-                        )
+                        outs_info = ", {} out".format(game_rec.linescore.outs)
                     else:
                         outs_info = ""
                     if score:
@@ -773,29 +1361,29 @@ class GameDatePresenter:
                 )
             )
 
-        if "resumeDate" in game_rec:
+        if game_rec.resume_date is not None:
             outl.append(
                 "  --> Will resume on: {} at {}".format(
-                    datetime.strftime(game_rec["resumeDate"], "%Y-%m-%d"),
-                    util.convert_time_to_local(game_rec["resumeDate"]),
+                    datetime.strftime(game_rec.resume_date, "%Y-%m-%d"),
+                    util.convert_time_to_local(game_rec.resume_date),
                 )
             )
-        if "resumedFrom" in game_rec:
+        if game_rec.resumed_from is not None:
             outl.append(
                 "  --> Resumed from: {} at {}".format(
-                    datetime.strftime(game_rec["resumedFrom"], "%Y-%m-%d"),
-                    util.convert_time_to_local(game_rec["resumedFrom"]),
+                    datetime.strftime(game_rec.resumed_from, "%Y-%m-%d"),
+                    util.convert_time_to_local(game_rec.resumed_from),
                 )
             )
 
         if show_info:
             # found_info = False
-            for text_type in ("summary", "preview"):
-                if text_type in game_rec and game_rec[text_type]:
+            for text in (game_rec.summary, game_rec.preview):
+                if text:
                     # if text_type == 'summary':
                     #     outl.append('')
                     outl.append("")
-                    for line in game_rec[text_type]:
+                    for line in text:
                         outl.append(
                             "{coloron}{text}{coloroff}".format(
                                 coloron=color_on,
@@ -808,7 +1396,9 @@ class GameDatePresenter:
                     break
 
         if show_boxscore:
-            outl.extend(self._get_formatted_boxscore(game_rec, color_on, color_off))
+            outl.extend(
+                self._get_formatted_boxscore(game_rec, color_on, color_off, boxscore)
+            )
 
         return outl
 
@@ -818,29 +1408,22 @@ class GameDatePresenter:
         TOR  1  0  0  0  0  0  0  3  0  0  0  4  8  0
         NYY  0  0  0  0  1  0  0  0  4  0  0  5  8  0
         """
-        if "raw" in game_rec["linescore"]:
-            linescore_json = game_rec["linescore"]["raw"]
-        else:
+        linescore = game_rec.linescore
+        if not linescore.has_data:
             return {"header": "", "away": "", "home": ""}
         outd = dict()
         outd["header"] = "{title:<4}".format(title="")
-        outd["away"] = "{title:<4}".format(title=game_rec["away"]["abbrev"].upper())
-        outd["home"] = "{title:<4}".format(title=game_rec["home"]["abbrev"].upper())
-        if "currentInning" in linescore_json:
-            current_inning = int(linescore_json["currentInning"])
-        else:
-            current_inning = 0
+        outd["away"] = "{title:<4}".format(title=game_rec.away.abbrev.upper())
+        outd["home"] = "{title:<4}".format(title=game_rec.home.abbrev.upper())
+        current_inning = linescore.current_inning or 0
         inning_fmt = "{:>3}"
         # inning_fmt = '{:>2}'
         # if current_inning > 9:
         #     inning_fmt = '{:>3}'
-        for inning in linescore_json["innings"]:
-            outd["header"] += inning_fmt.format(inning["num"])
-            for team in ("away", "home"):
-                if "runs" in inning[team]:
-                    outd[team] += inning_fmt.format(inning[team]["runs"])
-                else:
-                    outd[team] += inning_fmt.format("")
+        for inning_num, away_runs, home_runs in linescore.innings:
+            outd["header"] += inning_fmt.format(inning_num)
+            for team, runs in (("away", away_runs), ("home", home_runs)):
+                outd[team] += inning_fmt.format("" if runs is None else runs)
         for inning_num in range(
             current_inning + 1, 10
         ):  # fill in remaining innings, if any
@@ -852,26 +1435,19 @@ class GameDatePresenter:
         outd["header"] += " "
         for inning_hdr in ("R", "H", "E"):
             outd["header"] += inning_fmt.format(inning_hdr)
-        for team in ("away", "home"):
-            if (
-                "teams" in linescore_json
-                and team in linescore_json["teams"]
-                and "runs" in linescore_json["teams"][team]
-            ):
+        for team, team_score in (("away", linescore.away), ("home", linescore.home)):
+            if team_score is not None:
                 outd[team] += " "
-                for inning_val in (
-                    linescore_json["teams"][team]["runs"],
-                    linescore_json["teams"][team]["hits"],
-                    linescore_json["teams"][team]["errors"],
-                ):
+                for inning_val in (team_score.runs, team_score.hits, team_score.errors):
                     outd[team] += inning_fmt.format(inning_val)
         return outd
 
-    def _get_formatted_boxscore(self, game_rec, color_on, color_off):
+    def _get_formatted_boxscore(self, game_rec, color_on, color_off, json_data=None):
         outl = list()
         outl.append("")
-        # fetch boxscore
-        json_data = GameDataRetriever.get_boxscore(game_rec["game_pk"])
+        if json_data is None:
+            # not prefetched (or the prefetch failed): fetch it now
+            json_data = GameDataRetriever.get_boxscore(game_rec.game_pk, game_rec)
         batfmt = (
             "{coloron}{num:<2} {name:<30} {pos:>3}  {ab:>3} {hit:>3} {bb:>3} "
             "{so:>3} {run:>3} {hr:>3} {rbi:>3} {lob:>3}   {avg:>5} {ops:>5}{coloroff}"
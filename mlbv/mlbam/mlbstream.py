@@ -6,7 +6,6 @@ import logging
 
 from datetime import datetime
 from datetime import timezone
-from dateutil import parser
 
 import mlbv.mlbam.common.config as config
 import mlbv.mlbam.common.request as request
@@ -189,7 +188,9 @@ def _lookup_inning_timestamp_via_airings(
                 for milestone_time in milestone["milestoneTime"]:
                     if str(milestone_time["type"]) == "absolute":
                         broadcast_start_str = str(milestone_time["startDatetime"])
-                        broadcast_start = parser.parse(broadcast_start_str).timestamp()
+                        broadcast_start = util.parse_datetime(
+                            broadcast_start_str
+                        ).timestamp()
             elif milestone["milestoneType"] == "INNING_START":
                 milestone_inning = "1"
                 milestone_inning_half = "top"
@@ -205,7 +206,7 @@ def _lookup_inning_timestamp_via_airings(
                         if str(milestone_time["type"]) == "absolute":
                             inning_start_timestamp_str = milestone_time["startDatetime"]
                             # inning_start_timestamp_str = str(play['about']['startTime'])
-                            inning_start_timestamp = parser.parse(
+                            inning_start_timestamp = util.parse_datetime(
                                 inning_start_timestamp_str
                             ).timestamp()
                             LOG.info(
@@ -21,6 +21,7 @@ from datetime import timedelta
 
 import mlbv.mlbam.common.config as config
 import mlbv.mlbam.common.gamedata as gamedata
+import mlbv.mlbam.common.request as request
 import mlbv.mlbam.common.util as util
 import mlbv.mlbam.mlbapidata as mlbapidata
 import mlbv.mlbam.mlbconfig as mlbconfig
@@ -274,16 +275,35 @@ def main():
         "--stats",
         nargs="?",
         const="league",
-        metavar="league:<category>:<qualifier> or <team>:<category>:<qualifier>",
+        metavar="league:<category>:<qualifier>:<stat> or <team>:<category>:<qualifier>",
         help=(
             "Display league or team statisics, then exit. "
             "<category> is one of: all, hitting, fielding, pitching [default: all]. "
             "League: <qualifier> is one of: qualified, rookies, all [default: qualified]. "
+            "<stat> optionally ranks any one season stat, e.g. league:hitting:qualified:babip. "
             "Team: <team> is team abbreviation, <qualifier> is one of: active, full, 40man [default: active]. "
             "Can be combined with -d/--date option to show stats for season (league) "
             "or any given date (team)."
         ),
     )
+    parser.add_argument(
+        "--sort",
+        metavar="<stat>[:asc|:desc]",
+        help=(
+            "Team stats (--stats <team>): sort each section by a stat rather than by name, "
+            "with a percentile column, e.g. ops, era, hr:asc. "
+            "Best first, unless :asc or :desc is given."
+        ),
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        metavar="N",
+        help=(
+            "Stats: show only the top N players, per team stats section "
+            "or per league leader category."
+        ),
+    )
     parser.add_argument(
         "--recaps",
         nargs="?",
@@ -302,7 +322,20 @@ def main():
     )  # help="Turn on debug output")
     parser.add_argument(
         "--cache", help=argparse.SUPPRESS
-    )  # normal, never, forever, ...
+    )  # normal, never, forever, swr, ..., or a cache_backend: files, sqlite
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="Display statistics for the local data cache, then exit.",
+    )
+    parser.add_argument(
+        "--cache-prune",
+        action="store_true",
+        help=(
+            "Prune the local data cache down to its configured size "
+            "(cache_max_bytes, cache_max_entries), then exit."
+        ),
+    )
     args = parser.parse_args()
 
     if args.usage:
@@ -340,7 +373,17 @@ def main():
     if args.verbose:
         config.CONFIG.parser["verbose"] = "true"
     if args.cache:
-        config.CONFIG.parser["cache"] = args.cache
+        if args.cache in request.CACHE_STORES:
+            config.CONFIG.parser["cache_backend"] = args.cache
+        else:
+            config.CONFIG.parser["cache"] = args.cache
+    # after --cache, so that these act on the cache it selects
+    if args.cache_stats:
+        request.display_cache_stats()
+        return 0
+    if args.cache_prune:
+        request.prune_cache()
+        return 0
     if args.username:
         config.CONFIG.parser["username"] = args.username
     if args.password:
@@ -398,25 +441,33 @@ def main():
         return 0
     if args.stats:
         # def get_team_stats(team_code, team_code_id_map, stats_option='all', date_str=None):
-        stats.get_stats(args.stats, args.date, args.filter)
+        stats.get_stats(args.stats, args.date, args.filter, args.sort, args.top)
         return 0
 
-    gamedata_retriever = mlbgamedata.GameDataRetriever()
-
-    # retrieve all games for the dates given
-    game_day_tuple_list = gamedata_retriever.process_game_data(args.date, args.days)
+    gamedata_retriever = mlbgamedata.GameDataRetriever(
+        mlbgamedata.get_hydrate_profile(
+            show_scores=config.CONFIG.parser.getboolean("scores"),
+            show_info=bool(args.info),
+            play_stream=bool(team_to_play or args.recaps),
+        )
+    )
 
     if not team_to_play and not args.recaps:
-        # nothing to play; display the games
+        # nothing to play; display the games, each day as soon as it is retrieved
         presenter = mlbgamedata.GameDatePresenter()
         displayed_count = 0
-        for game_date, game_records in game_day_tuple_list:
+        for game_date, game_records in gamedata_retriever.iter_game_data(
+            args.date, args.days
+        ):
+            if displayed_count > 0:
+                print("")
             presenter.display_game_data(game_date, game_records, args.filter, args.info)
             displayed_count += 1
-            if displayed_count < len(game_day_tuple_list):
-                print("")
         return 0
 
+    # retrieve all games for the dates given
+    game_day_tuple_list = gamedata_retriever.process_game_data(args.date, args.days)
+
     # from this point we only care about first day in list
     if len(game_day_tuple_list) > 0:
         game_date, game_data = game_day_tuple_list[0]
@@ -25,6 +25,30 @@ STANDINGS_URL = (
     "leagueId={league_ids}&season={season}{date}&hydrate=division,conference,sport,league,team"
 )
 
+# The fields read from the standings response, passed to statsapi to leave out the rest
+STANDINGS_FIELDS = (
+    "records",
+    "standingsType",
+    "league",
+    "division",
+    "name",
+    "abbreviation",
+    "teamRecords",
+    "team",
+    "clinchIndicator",
+    "divisionRank",
+    "wildCardRank",
+    "leagueRank",
+    "leagueRecord",
+    "wins",
+    "losses",
+    "pct",
+    "gamesBack",
+    "wildCardGamesBack",
+    "streak",
+    "streakCode",
+)
+
 # from https://statsapi.mlb.com/api/v1/standingsTypes
 STANDINGS_TYPES = (
     "regularSeason",
@@ -217,11 +241,14 @@ def _display_standings(
     else:
         season_str = datetime.strftime(datetime.strptime(date_str, "%Y-%m-%d"), "%Y")
         url_date_str = "&date=" + date_str
-    url = STANDINGS_URL.format(
-        standings_type=standings_type,
-        league_ids=mlbapidata.get_league_ids(args_filter),
-        season=season_str,
-        date=url_date_str,
+    url = request.get_projected_url(
+        STANDINGS_URL.format(
+            standings_type=standings_type,
+            league_ids=mlbapidata.get_league_ids(args_filter),
+            season=season_str,
+            date=url_date_str,
+        ),
+        STANDINGS_FIELDS,
     )
     json_data = request.request_json(
         url,
@@ -269,11 +296,14 @@ def display_division_standings(
     else:
         season_str = datetime.strftime(datetime.strptime(date_str, "%Y-%m-%d"), "%Y")
         url_date_str = "&date=" + date_str
-    url = STANDINGS_URL.format(
-        standings_type=standings_type,
-        league_ids=mlbapidata.get_league_ids(args_filter),
-        season=season_str,
-        date=url_date_str,
+    url = request.get_projected_url(
+        STANDINGS_URL.format(
+            standings_type=standings_type,
+            league_ids=mlbapidata.get_league_ids(args_filter),
+            season=season_str,
+            date=url_date_str,
+        ),
+        STANDINGS_FIELDS,
     )
     json_data = request.request_json(
         url,
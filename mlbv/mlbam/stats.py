@@ -2,7 +2,10 @@
 
 """
 
+import array
+import bisect
 import logging
+import math
 
 from datetime import datetime
 
@@ -34,6 +37,10 @@ MULTI_PERSON_STATS_URL = (
 # http://statsapi.mlb.com/api/v1/people?personIds=545361,592273,&hydrate=stats(group=[hitting,fielding,pitching],type=season,season=2019)
 # http://statsapi.mlb.com/api/v1/people?personIds=545361,592273,571704&hydrate=stats(group=[hitting,fielding,pitching],type=season,season=2018)
 
+# A roster's players are requested in chunks of this many, fetched concurrently
+# (see _get_person_stats)
+PERSON_STATS_CHUNK_SIZE = 20
+
 # see http://statsapi.mlb.com/api/v1/rosterTypes
 ROSTER_TYPES = {"active": "active", "full": "fullSeason", "40man": "40man"}
 ROSTER_URL = "http://statsapi.mlb.com/api/v1/teams/{teamId}/roster?rosterType={rosterType}&season={season}"
@@ -154,14 +161,53 @@ PITCHING_STATS_JSON = [x[0] for x in PITCHING_STATS]
 PITCHING_STATS_HEADINGS = [x[1] for x in PITCHING_STATS]
 PITCHING_STATS_FMTS = [x[2] for x in PITCHING_STATS]
 
+# Team stats: the stats shown per group, and the decimal places of the rate stats
+# (the others are counting stats)
+TEAM_STATS = {
+    "hitting": HITTING_STATS,
+    "fielding": FIELDING_STATS,
+    "pitching": PITCHING_STATS,
+}
+TEAM_STATS_JSON = {
+    "hitting": HITTING_STATS_JSON,
+    "fielding": FIELDING_STATS_JSON,
+    "pitching": PITCHING_STATS_JSON,
+}
+TEAM_STATS_HEADINGS = {
+    "hitting": HITTING_STATS_HEADINGS,
+    "fielding": FIELDING_STATS_HEADINGS,
+    "pitching": PITCHING_STATS_HEADINGS,
+}
+TEAM_STATS_FMTS = {
+    "hitting": HITTING_STATS_FMTS,
+    "fielding": FIELDING_STATS_FMTS,
+    "pitching": PITCHING_STATS_FMTS,
+}
+RATE_STATS = {
+    "avg": 3,
+    "obp": 3,
+    "ops": 3,
+    "slg": 3,
+    "babip": 3,
+    "fielding": 3,
+    "era": 2,
+    "whip": 2,
+}
+NAN = float("nan")
+
 
 LEAGUE_LEADER_TYPES_URL = "http://statsapi.mlb.com/api/v1/leagueLeaderTypes"
 LEAGUE_LEADER_TYPES_URL = (
     "http://statsapi.mlb.com/api/v1/stats/leaders?leaderCategories={leaderCategories}"
     "&season={season}&sportId=1{leagueIdOptional}&statGroup={statGroup}&playerPool={playerPool}"
-    "&limit={limit}&fields=leagueLeaders,leaders,rank,value,team,name,league,name,person,fullName"
+    "&limit={limit}&fields=leagueLeaders,leaderCategory,leaders,rank,value,team,name,league,name,person,fullName"
 )
 
+# The leader categories of a stat group are requested together, as a comma-separated
+# leaderCategories list, split over more than one request only if the url would be
+# longer than this.
+MAX_LEADERS_URL_LENGTH = 2000
+
 # statGroup=pitching, hitting, fielding, ...
 # Available playerPool values: ['all','qualified','rookies'] (default is qualified)
 LEAGUE_PLAYER_POOL_TYPES = ("all", "qualified", "rookies")
@@ -238,6 +284,93 @@ LEAGUE_STATS = {
 }
 
 
+# Local leaderboards (config: stats_leaders=local): the season stats for
+# the whole player pool of a stat group are downloaded in one request, and then ranked
+# locally for any stat. The stats are not projected with fields=, since any of them
+# can be ranked.
+SEASON_STATS_URL = (
+    "http://statsapi.mlb.com/api/v1/stats?stats=season&group={group}&season={season}"
+    "&sportId=1&gameType=R&playerPool={playerPool}&limit={limit}"
+)
+SEASON_STATS_LIMIT = 5000
+STATS_TABLES = (
+    dict()
+)  # (group, player pool, season) -> StatsTable, see _get_stats_table()
+DEFAULT_STATS_LEADERS = "api"  # the stats/leaders endpoint, or 'local'
+
+# The qualifying minimum per team game for the 'qualified' player pool:
+# plate appearances for hitting, innings pitched for pitching
+QUALIFYING_RATES = {
+    "hitting": ("plateAppearances", 3.1),
+    "pitching": ("inningsPitched", 1.0),
+}
+
+# The rate stats, which only qualified players are ranked on for the 'qualified'
+# player pool. Counting stats (e.g. saves, home runs) rank all players.
+QUALIFIED_STATS = frozenset(RATE_STATS).union(
+    (
+        "hitsPer9Inn",
+        "strikeoutsPer9Inn",
+        "walksPer9Inn",
+        "homeRunsPer9",
+        "runsScoredPer9",
+        "strikeoutWalkRatio",
+        "pitchesPerInning",
+        "winPercentage",
+        "groundOutsToAirouts",
+        "atBatsPerHomeRun",
+        "stolenBasePercentage",
+    )
+)
+
+# The season stat ranked for each of the LEAGUE_STATS leader categories, where the
+# name differs
+LEADER_CATEGORY_STATS = {
+    "battingAverage": "avg",
+    "runsBattedIn": "rbi",
+    "onBasePlusSlugging": "ops",
+    "onBasePercentage": "obp",
+    "sluggingPercentage": "slg",
+    "strikeouts": "strikeOuts",
+    "walks": "baseOnBalls",
+    "groundIntoDoublePlays": "groundIntoDoublePlay",
+    "earnedRunAverage": "era",
+    "walksAndHitsPerInningPitched": "whip",
+    "wildPitch": "wildPitches",
+    "hitBatsman": "hitBatsmen",
+    "totalBattersFaced": "battersFaced",
+}
+
+# Stats in innings, where the fraction is in outs
+INNINGS_STATS = frozenset(("inningsPitched", "innings"))
+
+# Stats which are not in the season stats, but derived from them
+DERIVED_STATS = {
+    "extraBaseHits": lambda stat: stat["doubles"] + stat["triples"] + stat["homeRuns"],
+}
+
+# Stats where lower is better, by stat group
+ASCENDING_STATS = {
+    "hitting": frozenset(),
+    "fielding": frozenset(),
+    "pitching": frozenset(
+        (
+            "era",
+            "whip",
+            "avg",
+            "obp",
+            "slg",
+            "ops",
+            "hitsPer9Inn",
+            "walksPer9Inn",
+            "homeRunsPer9",
+            "runsScoredPer9",
+            "pitchesPerInning",
+        )
+    ),
+}
+
+
 def _get_roster(team_id, roster_type, season):
     json_data = request.request_json(
         ROSTER_URL.format(teamId=team_id, rosterType=roster_type, season=season),
@@ -256,24 +389,86 @@ def _get_roster(team_id, roster_type, season):
     return roster
 
 
-def _get_person_stats(person_ids, category, roster_type, season):
+def _get_person_stats_job(person_id, groups, season):
+    """Returns the request job (url, output_filename, cache_stale) for a player's
+    stats. Players are cached individually, whatever the roster or team, and whichever
+    request their stats came in."""
+    return (
+        MULTI_PERSON_STATS_URL.format(
+            personIds=person_id, groups=groups, season=season
+        ),
+        "person-stats-{}-{}-{}".format(groups, season, person_id),
+        request.CACHE_SHORT,
+    )
+
+
+def _get_person_id_chunks(person_ids):
+    """Splits the person ids into chunks of at most PERSON_STATS_CHUNK_SIZE, in id
+    order, so that the same players always make the same requests."""
+    person_ids = sorted(person_ids, key=int)
+    return [
+        person_ids[index : index + PERSON_STATS_CHUNK_SIZE]
+        for index in range(0, len(person_ids), PERSON_STATS_CHUNK_SIZE)
+    ]
+
+
+def _get_person_stats(person_ids, category, season):
+    """Returns the stats of the players as a people response. Cached players are
+    served from the cache; the others are fetched concurrently in chunks, then cached
+    by player."""
     if category == "all":
         groups = "[hitting,fielding,pitching]"
     else:
         groups = category
-    json_data = request.request_json(
-        MULTI_PERSON_STATS_URL.format(
-            personIds=person_ids, groups=groups, season=season
-        ),
-        "person-stats-{}-{}-{}-{}".format(groups, roster_type, season, str(person_ids)),
-        request.CACHE_SHORT,
+    people = dict()
+    missing = list()
+    for person_id in person_ids:
+        json_data = request.get_cached_json(
+            *_get_person_stats_job(person_id, groups, season)
+        )
+        if json_data is not None:
+            people[person_id] = json_data["people"]
+        else:
+            missing.append(person_id)
+
+    chunks = _get_person_id_chunks(missing)
+    results = request.request_json_many(
+        [
+            (
+                MULTI_PERSON_STATS_URL.format(
+                    personIds=",".join(chunk), groups=groups, season=season
+                ),
+                None,
+                None,
+            )
+            for chunk in chunks
+        ]
     )
-    return json_data
+    for chunk, (json_data, error) in zip(chunks, results):
+        if error is not None:
+            raise error
+        chunk_people = {str(person["id"]): person for person in json_data["people"]}
+        for person_id in chunk:
+            person = chunk_people.get(person_id)
+            people[person_id] = [person] if person is not None else []
+            url, output_filename, cache_stale = _get_person_stats_job(
+                person_id, groups, season
+            )
+            request.save_json(
+                url,
+                output_filename,
+                dict(json_data, people=people[person_id]),
+                cache_stale,
+            )
+    return {
+        "people": [person for person_id in person_ids for person in people[person_id]]
+    }
 
 
 def _parse_stats_target(stats_target):
     category = "all"
     qualifier = None
+    stat = None
     split_target = stats_target.split(":")
     target = split_target[0]
     if len(split_target) > 1 and split_target[1]:
@@ -282,10 +477,12 @@ def _parse_stats_target(stats_target):
             category = "hitting"
     if len(split_target) > 2 and split_target[2]:
         qualifier = split_target[2]
-    return target, category, qualifier
+    if len(split_target) > 3 and split_target[3]:
+        stat = split_target[3]
+    return target, category, qualifier, stat
 
 
-def get_stats(target_input, date_str=None, args_filter=None):
+def get_stats(target_input, date_str=None, args_filter=None, sort=None, top=None):
     """Displays team stats
 
     stats=team, filter by -o
@@ -312,28 +509,33 @@ def get_stats(target_input, date_str=None, args_filter=None):
     if target_input.startswith("team:"):
         target_input = target_input[len("team:") :]
 
-    target, category, qualifier = _parse_stats_target(target_input)
+    target, category, qualifier, stat = _parse_stats_target(target_input)
 
     if target == "league":
-        limit = config.CONFIG.parser.get("stats_limit", DEFAULT_LEAGUE_STATS_LIMIT)
-        handle_league_stats(category, qualifier, season, limit, args_filter)
+        limit = top or config.CONFIG.parser.get(
+            "stats_limit", DEFAULT_LEAGUE_STATS_LIMIT
+        )
+        handle_league_stats(category, qualifier, season, limit, args_filter, stat)
     else:
         # fall-through: must be given a team abbrev:
         team_abbrev = target
-        handle_team_stats(team_abbrev, category, qualifier, season)
+        handle_team_stats(team_abbrev, category, qualifier, season, sort, top)
 
 
-def handle_league_stats(category, qualifier, season, limit, args_filter):
+def handle_league_stats(category, qualifier, season, limit, args_filter, stat=None):
     """Handler for gather/display overal league stats.
 
-    League Format:  league:[category]:[qualifier]
+    League Format:  league:[category]:[qualifier]:[stat]
         [category]: one of: hitting, fielding, pitching, all [default: all]
         [qualifier]: all, qualified, rookies [default: qualified]
+        [stat]: rank this stat only, any of the season stats (e.g. babip),
+                which needs local leaderboards [default: the LEAGUE_STATS categories]
 
     Examples: league:hitting:qualified
               league:hitting:rookies
               league:hitting:all
               league:pitching
+              league:hitting:qualified:babip
     """
     if util.substring_match(category, "all"):
         categories = ["hitting", "fielding", "pitching"]
@@ -368,42 +570,86 @@ def handle_league_stats(category, qualifier, season, limit, args_filter):
     if args_filter and args_filter in mlbapidata.LEAGUE_FILTERS:
         league_id = mlbapidata.LEAGUE_ID_MAP[args_filter]
 
+    use_local = stat or (
+        config.CONFIG.parser.get("stats_leaders", DEFAULT_STATS_LEADERS) == "local"
+    )
     for catg in categories:
-        stats = _get_league_stats(catg, qualifier, season, league_id, limit)
-        _display_league_stats(stats, catg, season, limit)
+        if not use_local:
+            stats = _get_league_stats(catg, qualifier, season, league_id, limit)
+            _display_league_stats(stats, catg, season, limit)
+            continue
+        leader_categories = LEAGUE_STATS[catg]
+        if stat:
+            leader_categories = ((stat, stat, stat[:6].upper()),)
+        table = _get_stats_table(catg, qualifier, season)
+        stats = _get_local_league_stats(
+            table, leader_categories, qualifier, league_id, limit
+        )
+        if stat and not stats[stat]:
+            LOG.warning("No %s stats for %s", catg, stat)
+            continue
+        _display_league_stats(stats, catg, season, limit, leader_categories)
+
+
+def _get_leader_category_chunks(leader_categories, get_url):
+    """Splits the leader categories into lists which each fit in one leaders request
+    url (see MAX_LEADERS_URL_LENGTH). get_url returns the url for a list of categories.
+    """
+    chunks = list()
+    for leader_category in leader_categories:
+        if chunks and (
+            len(get_url(chunks[-1] + [leader_category])) <= MAX_LEADERS_URL_LENGTH
+        ):
+            chunks[-1].append(leader_category)
+        else:
+            chunks.append([leader_category])
+    return chunks
 
 
 def _get_league_stats(category, qualifier, season, league_id, limit):
     stats = dict()
     player_pool = qualifier
-    for leader_category, title, heading in LEAGUE_STATS[category]:
-        stats[leader_category] = list()
-        if league_id:
-            league_id_optional = "&leagueId={}".format(league_id)
-            league_stats = "leaguestats-{}-{}-{}-{}-{}".format(
-                category, leader_category, qualifier, season, league_id
-            )
-        else:
-            league_id_optional = ""
-            league_stats = "leaguestats-{}-{}-{}-{}".format(
-                category, leader_category, qualifier, season
-            )
-        json_data = request.request_json(
-            LEAGUE_LEADER_TYPES_URL.format(
-                leaderCategories=leader_category,
-                season=season,
-                leagueIdOptional=league_id_optional,
-                statGroup=category,
-                playerPool=player_pool,
-                limit=limit,
-            ),
-            league_stats,
-            request.CACHE_SHORT,
+    if league_id:
+        league_id_optional = "&leagueId={}".format(league_id)
+        league_stats = "leaguestats-{}-{}-{}-{}".format(
+            category, qualifier, season, league_id
+        )
+    else:
+        league_id_optional = ""
+        league_stats = "leaguestats-{}-{}-{}".format(category, qualifier, season)
+
+    def get_url(leader_categories):
+        return LEAGUE_LEADER_TYPES_URL.format(
+            leaderCategories=",".join(leader_categories),
+            season=season,
+            leagueIdOptional=league_id_optional,
+            statGroup=category,
+            playerPool=player_pool,
+            limit=limit,
         )
-        # Fill out/normalize the stats for each leader. This format is common across all the leader stats
+
+    # all the leader categories in as few requests as possible, fetched concurrently
+    chunks = _get_leader_category_chunks(
+        [leader_category for leader_category, _, _ in LEAGUE_STATS[category]], get_url
+    )
+    results = request.request_json_many(
+        [(get_url(chunk), league_stats, request.CACHE_SHORT) for chunk in chunks]
+    )
+    for chunk, (json_data, error) in zip(chunks, results):
+        for leader_category in chunk:
+            stats[leader_category] = list()
+        if error is not None:
+            LOG.error("Could not retrieve %s leaders: %s", ",".join(chunk), error)
+            continue
+        # the response has the leaders grouped by category
         for league_leaders in json_data["leagueLeaders"]:
             if "leaders" not in league_leaders:
                 continue
+            leader_category = league_leaders.get("leaderCategory")
+            if leader_category not in chunk:
+                LOG.debug("Ignoring leaders for category: %s", leader_category)
+                continue
+            # Fill out/normalize the stats for each leader. This format is common across all the leader stats
             for leader_info in league_leaders["leaders"]:
                 entry = {"rank": "", "value": "", "team": "", "league": "", "name": ""}
                 if "rank" in leader_info:
@@ -420,7 +666,195 @@ def _get_league_stats(category, qualifier, season, league_id, limit):
     return stats
 
 
-def _display_league_stats(stats, category, season, limit):
+def _get_stat_value(stat, stat_name):
+    """Returns the numeric value of a season stat, or None if there is none
+    (e.g. an ERA of '-.--')."""
+    if stat_name in DERIVED_STATS:
+        try:
+            return DERIVED_STATS[stat_name](stat)
+        except KeyError:
+            return None
+    value = stat.get(stat_name)
+    if stat_name in INNINGS_STATS and value is not None:
+        # the fraction is in outs: 12.2 is 12 2/3 innings
+        whole, _, outs = str(value).partition(".")
+        return int(whole) + int(outs or 0) / 3
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class StatsTable:
+    """The season stats of a stat group's player pool, held in memory for ranking
+    locally (see rank()). splits is the splits list of the season stats response."""
+
+    def __init__(self, group, splits):
+        self.group = group
+        self.rows = list()
+        if group == "fielding":
+            splits = _combine_fielding_splits(splits)
+        for split in splits:
+            self.rows.append(
+                {
+                    "name": split["player"]["fullName"],
+                    "team_id": split["team"]["id"] if "team" in split else None,
+                    "team": split["team"]["name"] if "team" in split else "",
+                    "league_id": split["league"]["id"] if "league" in split else None,
+                    "league": split["league"]["name"] if "league" in split else "",
+                    "stat": split["stat"],
+                }
+            )
+        self.team_games = self._get_team_games()
+
+    def _get_team_games(self):
+        """Returns the number of games played by each team, indexed by team id.
+        For pitching this is each team's decisions (every game has a win and a loss),
+        otherwise the most games played by any of the team's players. The combined
+        rows of players traded in season have no team, and are left out."""
+        team_games = dict()
+        for row in self.rows:
+            if row["team_id"] is None:
+                continue
+            if self.group == "pitching":
+                games = row["stat"].get("wins", 0) + row["stat"].get("losses", 0)
+                team_games[row["team_id"]] = team_games.get(row["team_id"], 0) + games
+            else:
+                team_games[row["team_id"]] = max(
+                    team_games.get(row["team_id"], 0), row["stat"].get("gamesPlayed", 0)
+                )
+        return team_games
+
+    def is_qualified(self, row):
+        """Returns True if the player has enough plate appearances (hitting) or innings
+        pitched (pitching) for their team's games. All players qualify for fielding."""
+        if self.group not in QUALIFYING_RATES:
+            return True
+        stat_name, per_game = QUALIFYING_RATES[self.group]
+        # players traded in season have no team: use the most team games
+        team_games = self.team_games.get(
+            row["team_id"], max(self.team_games.values(), default=0)
+        )
+        value = _get_stat_value(row["stat"], stat_name)
+        return value is not None and value >= per_game * team_games
+
+    def rank(self, stat_name, limit, qualified=False, league_id=None):
+        """Returns the leaders for the stat: the top limit players, plus any tied with
+        the last of those. Tied players share a rank. Each leader is a dictionary of
+        rank, value, team, league and name, as per _get_league_stats.
+        qualified only applies to the rate stats (QUALIFIED_STATS).
+        """
+        ascending = stat_name in ASCENDING_STATS.get(self.group, ())
+        qualified = qualified and stat_name in QUALIFIED_STATS
+        ranked = list()
+        for row in self.rows:
+            if league_id and row["league_id"] != int(league_id):
+                continue
+            value = _get_stat_value(row["stat"], stat_name)
+            if value is None or (qualified and not self.is_qualified(row)):
+                continue
+            ranked.append((value, row))
+        ranked.sort(key=lambda item: item[0], reverse=not ascending)
+        leaders = list()
+        for index, (value, row) in enumerate(ranked):
+            if index == 0 or value != ranked[index - 1][0]:
+                rank = index + 1
+                if rank > limit:
+                    break
+            leaders.append(
+                {
+                    "rank": rank,
+                    "value": row["stat"].get(stat_name, value),
+                    "team": row["team"],
+                    "league": row["league"],
+                    "name": row["name"],
+                }
+            )
+        return leaders
+
+
+def _combine_fielding_splits(splits):
+    """Returns the fielding splits combined into one per player. Fielding splits are per
+    position, so a player could otherwise be ranked once per position. The counting
+    stats are summed, and the fielding percentage and range factors worked out from the
+    sums. For players traded in season only their combined splits, which have no team,
+    are used."""
+    player_splits = dict()
+    for split in splits:
+        player_splits.setdefault(split["player"]["id"], list()).append(split)
+    combined = list()
+    for own_splits in player_splits.values():
+        if any("team" not in split for split in own_splits):
+            own_splits = [split for split in own_splits if "team" not in split]
+        if len(own_splits) == 1:
+            combined.append(own_splits[0])
+            continue
+        stat = dict()
+        for split in own_splits:
+            for stat_name, value in split["stat"].items():
+                if isinstance(value, int) and not isinstance(value, bool):
+                    stat[stat_name] = stat.get(stat_name, 0) + value
+        outs = sum(
+            round((_get_stat_value(split["stat"], "innings") or 0) * 3)
+            for split in own_splits
+        )
+        stat["innings"] = "{}.{}".format(outs // 3, outs % 3)
+        plays = stat.get("putOuts", 0) + stat.get("assists", 0)
+        if stat.get("chances"):
+            text = "{:.3f}".format(plays / stat["chances"])
+            stat["fielding"] = text[1:] if text.startswith("0.") else text
+        if stat.get("gamesPlayed"):
+            stat["rangeFactorPerGame"] = "{:.2f}".format(plays / stat["gamesPlayed"])
+        if outs:
+            stat["rangeFactorPer9Inn"] = "{:.2f}".format(plays * 27 / outs)
+        combined.append(dict(own_splits[0], stat=stat))
+    return combined
+
+
+def _get_stats_table(category, qualifier, season):
+    """Downloads the season stats for the stat group's player pool, in one request.
+    The qualified pool is worked out locally, from all the players. The tables are kept
+    for reuse, e.g. to rank other stats."""
+    player_pool = qualifier
+    if qualifier == "qualified" and category in QUALIFYING_RATES:
+        player_pool = "all"
+    table_key = (category, player_pool, season)
+    if table_key in STATS_TABLES:
+        return STATS_TABLES[table_key]
+    json_data = request.request_json(
+        SEASON_STATS_URL.format(
+            group=category,
+            season=season,
+            playerPool=player_pool,
+            limit=SEASON_STATS_LIMIT,
+        ),
+        "seasonstats-{}-{}-{}".format(category, player_pool, season),
+        request.CACHE_SHORT,
+    )
+    splits = list()
+    for stats_json in json_data["stats"]:
+        splits.extend(stats_json["splits"])
+    STATS_TABLES[table_key] = StatsTable(category, splits)
+    return STATS_TABLES[table_key]
+
+
+def _get_local_league_stats(table, leader_categories, qualifier, league_id, limit):
+    """Ranks the leader categories from the stats table, returning the leaders indexed
+    by leader category as per _get_league_stats."""
+    stats = dict()
+    for leader_category, _, _ in leader_categories:
+        stats[leader_category] = table.rank(
+            LEADER_CATEGORY_STATS.get(leader_category, leader_category),
+            int(limit),
+            qualified=qualifier == "qualified",
+            league_id=league_id,
+        )
+    return stats
+
+
+def _display_league_stats(stats, category, season, limit, leader_categories=None):
+    if leader_categories is None:
+        leader_categories = LEAGUE_STATS[category]
     outl = list()
     # color_on = '' # color_off = ''
     top_header = "{} - {}".format(season, category.upper())
@@ -431,7 +865,7 @@ def _display_league_stats(stats, category, season, limit):
         stats_fmt = "{rank:>2} {name:<30} {value:>6} {team:>26} {league:>4}"
     else:
         stats_fmt = "{rank:>3} {name:<30} {value:>6} {team:>26} {league:>4}"
-    for leader_category, title, heading in LEAGUE_STATS[category]:
+    for leader_category, title, heading in leader_categories:
         if stats[leader_category]:
             # header:
             outl.append(
@@ -454,7 +888,7 @@ def _display_league_stats(stats, category, season, limit):
     print("\n".join(outl))
 
 
-def handle_team_stats(team_abbrev, category, roster_type, season):
+def handle_team_stats(team_abbrev, category, roster_type, season, sort=None, top=None):
     """Fetches and displays team stats.
 
     Team Format:  <team>:[category]:[qualifier]
@@ -467,6 +901,10 @@ def handle_team_stats(team_abbrev, category, roster_type, season):
               tor:hitting:40man   # 40-man roster
               tor:pitching
               tor:fielding
+
+    sort: <stat>[:asc|:desc] sorts each section by a stat, e.g. ops or era:asc,
+          with a percentile column [default: by name]
+    top: show only the top players of each section
     """
 
     if not roster_type:
@@ -490,344 +928,287 @@ def handle_team_stats(team_abbrev, category, roster_type, season):
     team_id = mlbapidata.get_team_id(team_abbrev, season)
 
     roster = _get_roster(team_id, roster_type, season)
-    person_ids = ",".join(list(roster))
 
     # Data
-    person_stats_json = _get_person_stats(person_ids, category, roster_type, season)
+    person_stats_json = _get_person_stats(list(roster), category, season)
     stats = _get_team_person_stats(person_stats_json, team_id, category)
-    _display_team_stats(stats, category)
+    _display_team_stats(stats, category, sort, top)
+
+
+def _format_team_stat(stat_name, value):
+    """Formats a team stats table value as statsapi does, e.g. .275 or 12.2 innings."""
+    if math.isnan(value):
+        # statsapi has .--- or -.-- for an undefined rate stat, e.g. an average with
+        # no at bats, or an ERA with no innings pitched
+        if stat_name in RATE_STATS:
+            return ".---" if RATE_STATS[stat_name] == 3 else "-.--"
+        return "-"
+    if stat_name == "inningsPitched":
+        whole = int(value)
+        return "{}.{}".format(whole, round((value - whole) * 3))
+    if stat_name in RATE_STATS:
+        text = "{:.{}f}".format(value, RATE_STATS[stat_name])
+        # statsapi drops the leading zero of three-decimal stats (.297), not era/whip
+        if RATE_STATS[stat_name] == 3 and text.startswith("0."):
+            return text[1:]
+        return text
+    return "{:.0f}".format(value)
+
+
+def _format_percentile(value):
+    if math.isnan(value):
+        return "-"
+    return "{:.0f}".format(value)
+
+
+class TeamStatsTable:
+    """A team's player stats for one stat group, held in columns: a float array per
+    stat, with NaN for missing values. There is a row per player, or per player and
+    position for fielding. Players are keyed by player_id (names can collide).
+    Iterating gives the row indexes."""
+
+    def __init__(self, group):
+        self.group = group
+        self.stat_names = TEAM_STATS_JSON[group]
+        self.player_ids = list()
+        self.names = list()
+        self.positions = list()  # primary position
+        self.split_positions = list()  # fielding: the position of the row's split
+        self.columns = {stat_name: array.array("d") for stat_name in self.stat_names}
+
+    def __len__(self):
+        return len(self.player_ids)
+
+    def __iter__(self):
+        return iter(range(len(self.player_ids)))
+
+    def append(self, player_id, name, position, stat, split_position=None):
+        """Adds a row from a statsapi stat dictionary."""
+        self.player_ids.append(player_id)
+        self.names.append(name)
+        self.positions.append(position)
+        self.split_positions.append(split_position)
+        for stat_name, column in self.columns.items():
+            value = _get_stat_value(stat, stat_name)
+            column.append(NAN if value is None else value)
+
+    def get_stat_name(self, stat):
+        """Returns the table's stat for a stat name or display heading (e.g. 'ops'
+        or 'so'), or None."""
+        if stat in self.columns:
+            return stat
+        for stat_name, heading, _ in TEAM_STATS[self.group]:
+            if stat.lower() in (stat_name.lower(), heading.lower()):
+                return stat_name
+        return None
+
+    def _is_ascending(self, stat_name, ascending):
+        if ascending is None:
+            return stat_name in ASCENDING_STATS[self.group]
+        return ascending
+
+    def sort(self, rows, stat_name, ascending=None):
+        """Returns the rows sorted by the stat, best first unless ascending is given
+        (see ASCENDING_STATS). Rows without the stat come last, and ties keep their
+        order."""
+        column = self.columns[stat_name]
+        present = [row for row in rows if not math.isnan(column[row])]
+        missing = [row for row in rows if math.isnan(column[row])]
+        present.sort(
+            key=column.__getitem__,
+            reverse=not self._is_ascending(stat_name, ascending),
+        )
+        return present + missing
+
+    def percentiles(self, rows, stat_name, ascending=None):
+        """Returns the percentile rank of the stat for each of the rows, among the
+        rows: the percentage of them with a worse value, counting ties as half.
+        100 is best. NaN where there is no stat."""
+        column = self.columns[stat_name]
+        values = sorted(column[row] for row in rows if not math.isnan(column[row]))
+        ascending = self._is_ascending(stat_name, ascending)
+        percentiles = list()
+        for row in rows:
+            value = column[row]
+            if math.isnan(value):
+                percentiles.append(NAN)
+                continue
+            below = bisect.bisect_left(values, value)
+            ties = bisect.bisect_right(values, value, below) - below
+            percentile = 100 * (below + ties / 2) / len(values)
+            percentiles.append(100 - percentile if ascending else percentile)
+        return percentiles
 
 
 def _get_team_person_stats(person_stats_json, team_id, category):
-    """Fetches team stats into a dictionary."""
-    stats = dict()
-    for person_stats in person_stats_json["people"]:
-        # key: personId
-        player_name = person_stats["lastInitName"]
-        stats[player_name] = dict()
-        stats[player_name]["name"] = player_name
-        stats[player_name]["player_id"] = person_stats["id"]
-        stats[player_name]["position"] = person_stats["primaryPosition"]["abbreviation"]
+    """Fetches team stats into a TeamStatsTable per stat group, indexed by group.
+    The rows are in player name order."""
+    tables = dict()
+    for group in TEAM_STATS:
+        if util.substring_match(category, "all") or util.substring_match(
+            category, group
+        ):
+            tables[group] = TeamStatsTable(group)
+    people = sorted(
+        person_stats_json["people"],
+        key=lambda person_stats: (person_stats["lastInitName"], person_stats["id"]),
+    )
+    for person_stats in people:
         if "stats" not in person_stats:
             continue
-
-        # Pull out stats based on hitting, fielding, pitching
-        # They are put into the stats dictionary.
+        player_id = person_stats["id"]
+        player_name = person_stats["lastInitName"]
+        position = person_stats["primaryPosition"]["abbreviation"]
         for person_stat in person_stats["stats"]:
-
             stats_type = person_stat["group"]["displayName"]
-
-            if stats_type == "hitting" and (
-                util.substring_match(category, "all")
-                or util.substring_match(category, "hitting")
-            ):
-                for splits in person_stat["splits"]:
-                    if "team" in splits and splits["team"]["id"] == team_id:
-                        split_stats = splits["stat"]
-                        if split_stats["atBats"] > 0:
-                            stats[player_name]["hitting"] = dict()
-                            for stat_name in HITTING_STATS_JSON:
-                                if stat_name in split_stats:
-                                    stats[player_name]["hitting"][stat_name] = str(
-                                        split_stats[stat_name]
-                                    )
-                                else:
-                                    stats[player_name]["hitting"][stat_name] = "-"
-
-            elif stats_type == "fielding" and (
-                util.substring_match(category, "all")
-                or util.substring_match(category, "fielding")
-            ):
-                # note: the splits are per-position
-                stats[player_name]["fielding"] = dict()
-                for splits in person_stat["splits"]:
-                    if "team" in splits and splits["team"]["id"] == team_id:
-                        position = splits["stat"]["position"]["abbreviation"]
-                        stats[player_name]["fielding"][position] = dict()
-                        for stat_name in FIELDING_STATS_JSON:
-                            if stat_name in splits["stat"]:
-                                stats[player_name]["fielding"][position][
-                                    stat_name
-                                ] = str(splits["stat"][stat_name])
-                            else:
-                                stats[player_name]["fielding"][position][
-                                    stat_name
-                                ] = "-"
-
-            elif stats_type == "pitching" and (
-                util.substring_match(category, "all")
-                or util.substring_match(category, "pitching")
-            ):
-                stats[player_name]["pitching"] = dict()
-                for splits in person_stat["splits"]:
-                    if "team" in splits and splits["team"]["id"] == team_id:
-                        for stat_name in PITCHING_STATS_JSON:
-                            if stat_name in splits["stat"]:
-                                stats[player_name]["pitching"][stat_name] = str(
-                                    splits["stat"][stat_name]
-                                )
-                            else:
-                                stats[player_name]["pitching"][stat_name] = "-"
-    return stats
-
-
-def _display_team_stats(stats, category):
-    """Presentation of team stats."""
-    color_on = ""
-    color_off = ""
-
-    outl = list()
-
-    if util.substring_match(category, "all") or util.substring_match(
-        category, "hitting"
-    ):
-        outl.append("HITTING")
-        hitting_stats_fmt = " ".join(HITTING_STATS_FMTS)
-        hitting_stats_hdr = hitting_stats_fmt.format(
-            *[hdr for hdr in HITTING_STATS_HEADINGS]
-        )
-        hitting_fmt = "{coloron}{name:<26}{hitting_stats}{coloroff}"
+            if stats_type not in tables:
+                continue
+            for splits in person_stat["splits"]:
+                if "team" not in splits or splits["team"]["id"] != team_id:
+                    continue
+                split_stats = splits["stat"]
+                split_position = None
+                if stats_type == "hitting" and not split_stats["atBats"] > 0:
+                    continue
+                if stats_type == "fielding":
+                    # note: the splits are per-position
+                    split_position = split_stats["position"]["abbreviation"]
+                tables[stats_type].append(
+                    player_id, player_name, position, split_stats, split_position
+                )
+    return tables
+
+
+def _parse_sort(sort):
+    """Parses a sort option, <stat>[:asc|:desc], into (stat, ascending).
+    ascending is None for the stat's natural order (see ASCENDING_STATS)."""
+    if not sort:
+        return None, None
+    stat, _, order = sort.partition(":")
+    if not order:
+        return stat, None
+    if util.substring_match(order, "ascending"):
+        return stat, True
+    if util.substring_match(order, "descending"):
+        return stat, False
+    LOG.error("Invalid sort order: %s", order)
+    return stat, None
+
+
+def _get_team_stats_rows(table, rows, sort_stat, ascending, top):
+    """Returns the rows for display: in name order, or by the sort stat, limited to
+    the top rows."""
+    if sort_stat is not None:
+        rows = table.sort(rows, sort_stat, ascending)
+    if top:
+        rows = rows[:top]
+    return rows
+
+
+def _add_team_stats_section(outl, table, rows, header, sort_stat, ascending, top):
+    """Adds the header (if any) and the rows of a team stats section to outl. Sorted
+    sections have a percentile column for the sort stat. A player's further fielding
+    positions are shown without their name."""
+    stats_fmt = " ".join(TEAM_STATS_FMTS[table.group])
+    headings = list(TEAM_STATS_HEADINGS[table.group])
+    if sort_stat is not None:
+        stats_fmt += " {:>5}"
+        headings.append("PCT")
+        percentiles = dict(zip(rows, table.percentiles(rows, sort_stat, ascending)))
+    if table.group == "fielding":
+        line_fmt = "{name:<26}{pos:>3}{stats}"
+    else:
+        line_fmt = "{name:<26}{stats}"
+    if header is not None:
         outl.append(
-            hitting_fmt.format(
-                coloron=color_on,
-                coloroff=color_off,
-                name="-------",
-                hitting_stats=hitting_stats_hdr,
-            )
+            line_fmt.format(name=header, pos="POS", stats=stats_fmt.format(*headings))
         )
-        for player_name in sorted(list(stats)):
-            if (
-                "hitting" in stats[player_name]
-                and stats[player_name]["position"] != "P"
-            ):
-                hitting_stats = hitting_stats_fmt.format(
-                    *[
-                        stats[player_name]["hitting"][statval]
-                        for statval in HITTING_STATS_JSON
-                    ]
-                )
-                outl.append(
-                    hitting_fmt.format(
-                        coloron=color_on,
-                        coloroff=color_off,
-                        name=player_name,
-                        hitting_stats=hitting_stats,
-                    )
-                )
-        outl.append("")
+    last_player_id = None
+    for row in _get_team_stats_rows(table, rows, sort_stat, ascending, top):
+        values = [
+            _format_team_stat(stat_name, table.columns[stat_name][row])
+            for stat_name in table.stat_names
+        ]
+        if sort_stat is not None:
+            values.append(_format_percentile(percentiles[row]))
+        name = table.names[row]
+        if table.player_ids[row] == last_player_id:
+            name = " -" if table.positions[row] != "P" else ""
+        last_player_id = table.player_ids[row]
         outl.append(
-            hitting_fmt.format(
-                coloron=color_on,
-                coloroff=color_off,
-                name="Pitchers:",
-                hitting_stats=hitting_stats_hdr,
+            line_fmt.format(
+                name=name,
+                pos=table.split_positions[row],
+                stats=stats_fmt.format(*values),
             )
         )
-        for player_name in sorted(list(stats)):
-            if (
-                "hitting" in stats[player_name]
-                and stats[player_name]["position"] == "P"
-            ):
-                hitting_stats = hitting_stats_fmt.format(
-                    *[
-                        stats[player_name]["hitting"][statval]
-                        for statval in HITTING_STATS_JSON
-                    ]
-                )
-                outl.append(
-                    hitting_fmt.format(
-                        coloron=color_on,
-                        coloroff=color_off,
-                        name=player_name,
-                        hitting_stats=hitting_stats,
-                    )
-                )
+
+
+def _display_team_stats(tables, category, sort=None, top=None):
+    """Presentation of team stats. sort is <stat>[:asc|:desc], to sort each section
+    by a stat rather than by name, top the number of players shown per section."""
+    outl = list()
+    sort, ascending = _parse_sort(sort)
+
+    def get_sort_stat(table):
+        if sort is None:
+            return None
+        sort_stat = table.get_stat_name(sort)
+        if sort_stat is None:
+            LOG.debug("No %s stat: %s, sorting by name", table.group, sort)
+        return sort_stat
+
+    if "hitting" in tables:
+        table = tables["hitting"]
+        sort_stat = get_sort_stat(table)
+        outl.append("HITTING")
+        for header, pitchers in (("-------", False), ("Pitchers:", True)):
+            if pitchers:
+                outl.append("")
+            rows = [row for row in table if (table.positions[row] == "P") == pitchers]
+            _add_team_stats_section(
+                outl, table, rows, header, sort_stat, ascending, top
+            )
         if category == "all":
             outl.append("")
 
-    if util.substring_match(category, "all") or util.substring_match(
-        category, "fielding"
-    ):
+    if "fielding" in tables:
+        table = tables["fielding"]
+        sort_stat = get_sort_stat(table)
         outl.append("FIELDING")
-        fielding_stats_fmt = " ".join(FIELDING_STATS_FMTS)
-        fielding_stats_hdr = fielding_stats_fmt.format(
-            *[hdr for hdr in FIELDING_STATS_HEADINGS]
-        )
-        fielding_fmt = "{coloron}{name:<26}{pos:>3}{fielding_stats}{coloroff}"
-        outl.append(
-            fielding_fmt.format(
-                coloron=color_on,
-                coloroff=color_off,
-                name="--------",
-                pos="POS",
-                fielding_stats=fielding_stats_hdr,
+        for header, pitchers in (("--------", False), ("PITCHERS:", True)):
+            if pitchers:
+                outl.append("")
+            rows = [row for row in table if (table.positions[row] == "P") == pitchers]
+            _add_team_stats_section(
+                outl, table, rows, header, sort_stat, ascending, top
             )
-        )
-        for player_name in sorted(list(stats)):
-            player_name_disp = player_name
-            if (
-                "fielding" in stats[player_name]
-                and stats[player_name]["position"] != "P"
-            ):
-                iter_count = 0
-                for position in stats[player_name]["fielding"]:
-                    iter_count += 1
-                    fielding_stats = fielding_stats_fmt.format(
-                        *[
-                            stats[player_name]["fielding"][position][statval]
-                            for statval in FIELDING_STATS_JSON
-                        ]
-                    )
-                    if len(stats[player_name]["fielding"]) > 1 and iter_count > 1:
-                        player_name_disp = " -"
-                    outl.append(
-                        fielding_fmt.format(
-                            coloron=color_on,
-                            coloroff=color_off,
-                            name=player_name_disp,
-                            pos=position,
-                            fielding_stats=fielding_stats,
-                        )
-                    )
-        outl.append("")
-        outl.append(
-            fielding_fmt.format(
-                coloron=color_on,
-                coloroff=color_off,
-                name="PITCHERS:",
-                pos="POS",
-                fielding_stats=fielding_stats_hdr,
-            )
-        )
-        for player_name in sorted(list(stats)):
-            player_name_disp = player_name
-            if (
-                "fielding" in stats[player_name]
-                and stats[player_name]["position"] == "P"
-            ):
-                iter_count = 0
-                for position in stats[player_name]["fielding"]:
-                    iter_count += 1
-                    fielding_stats = fielding_stats_fmt.format(
-                        *[
-                            stats[player_name]["fielding"][position][statval]
-                            for statval in FIELDING_STATS_JSON
-                        ]
-                    )
-                    if len(stats[player_name]["fielding"]) > 1 and iter_count > 1:
-                        player_name_disp = ""
-                    outl.append(
-                        fielding_fmt.format(
-                            coloron=color_on,
-                            coloroff=color_off,
-                            name=player_name_disp,
-                            pos=position,
-                            fielding_stats=fielding_stats,
-                        )
-                    )
         if category == "all":
             outl.append("")
 
-    if util.substring_match(category, "all") or util.substring_match(
-        category, "pitching"
-    ):
+    if "pitching" in tables:
+        table = tables["pitching"]
+        sort_stat = get_sort_stat(table)
+        games_started = table.columns["gamesStarted"]
         outl.append("PITCHING")
         outl.append("--------")
-        pitching_stats_fmt = " ".join(PITCHING_STATS_FMTS)
-        pitching_stats_hdr = pitching_stats_fmt.format(
-            *[hdr for hdr in PITCHING_STATS_HEADINGS]
+        starting = list()
+        bullpen = list()
+        others = list()  # position players who have pitched
+        for row in table:
+            if table.positions[row] != "P":
+                others.append(row)
+            elif games_started[row] > 0:
+                starting.append(row)
+            else:
+                bullpen.append(row)
+        _add_team_stats_section(
+            outl, table, starting, "STARTING:", sort_stat, ascending, top
         )
-        pitching_fmt = "{coloron}{name:<26}{pitching_stats}{coloroff}"
-        # outl.append(pitching_fmt.format(coloron=color_on, coloroff=color_off, name='--------', pitching_stats=pitching_stats_hdr))
-        # outl.append('----- Starting -----')
-        # outl.append('STARTING')
-        outl.append(
-            pitching_fmt.format(
-                coloron=color_on,
-                coloroff=color_off,
-                name="STARTING:",
-                pitching_stats=pitching_stats_hdr,
-            )
-        )
-        for player_name in sorted(list(stats)):
-            if (
-                "pitching" in stats[player_name]
-                and stats[player_name]["position"] == "P"
-                and int(stats[player_name]["pitching"]["gamesStarted"]) > 0
-            ):
-                pitching_stats = pitching_stats_fmt.format(
-                    *[
-                        stats[player_name]["pitching"][statval]
-                        for statval in PITCHING_STATS_JSON
-                    ]
-                )
-                outl.append(
-                    pitching_fmt.format(
-                        coloron=color_on,
-                        coloroff=color_off,
-                        name=player_name,
-                        pitching_stats=pitching_stats,
-                    )
-                )
-        # outl.append('----- Relief -----')
-        # outl.append('BULLPEN')
         outl.append("")
-        outl.append(
-            pitching_fmt.format(
-                coloron=color_on,
-                coloroff=color_off,
-                name="BULLPEN:",
-                pitching_stats=pitching_stats_hdr,
-            )
+        _add_team_stats_section(
+            outl, table, bullpen, "BULLPEN:", sort_stat, ascending, top
         )
-        for player_name in sorted(list(stats)):
-            if (
-                "pitching" in stats[player_name]
-                and stats[player_name]["position"] == "P"
-                and int(stats[player_name]["pitching"]["gamesStarted"]) < 1
-            ):
-                pitching_stats = pitching_stats_fmt.format(
-                    *[
-                        stats[player_name]["pitching"][statval]
-                        for statval in PITCHING_STATS_JSON
-                    ]
-                )
-                outl.append(
-                    pitching_fmt.format(
-                        coloron=color_on,
-                        coloroff=color_off,
-                        name=player_name,
-                        pitching_stats=pitching_stats,
-                    )
-                )
-        for player_name in sorted(list(stats)):
-            if (
-                "pitching" in stats[player_name]
-                and stats[player_name]["position"] != "P"
-                and stats[player_name]["pitching"]
-            ):
-                pitching_stats = pitching_stats_fmt.format(
-                    *[
-                        stats[player_name]["pitching"][statval]
-                        for statval in PITCHING_STATS_JSON
-                    ]
-                )
-                # pitching_stats = list()
-                # # pitching_stats = pitching_stats_fmt.format(*[stats[player_name]['pitching'][statval]
-                # for statval in PITCHING_STATS_JSON:
-                #     if statval in stats[player_name]['pitching']:
-                #         pitching_stats.append(stats[player_name]['pitching'][statval])
-                #     else:
-                #         print('player: {}, stats: {}'.format(player_name, stats[player_name]))
-                #         pitching_stats.append('-')
-                # pitching_stats = pitching_stats_fmt.format(pitching_stats)
-                outl.append(
-                    pitching_fmt.format(
-                        coloron=color_on,
-                        coloroff=color_off,
-                        name=player_name,
-                        pitching_stats=pitching_stats,
-                    )
-                )
+        _add_team_stats_section(outl, table, others, None, sort_stat, ascending, top)
 
     print("\n".join(outl))
@@ -0,0 +1,226 @@
+"""Micro-benchmarks for mlbv internals, using synthetic data.
+
+Run with: python -m mlbv.test.benchmark [name ...]
+"""
+
+import configparser
+import datetime
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+import types
+
+from mlbv.mlbam import mlbconfig
+from mlbv.mlbam import mlbgamedata
+from mlbv.mlbam import stats
+from mlbv.mlbam.common import config
+from mlbv.mlbam.common import request
+from mlbv.mlbam.common import util
+from mlbv.test import sampledata
+
+
+def _init_config(tempdir):
+    parser = configparser.ConfigParser()
+    parser.read_dict(mlbconfig.DEFAULTS)
+    parser["mlbv"]["tempdir"] = tempdir
+    config.CONFIG = types.SimpleNamespace(
+        parser=parser["mlbv"], ua_iphone=config.Config.ua_iphone
+    )
+    util.LOG = logging.getLogger(util.__name__)
+
+
+def _report(name, number, secs):
+    print("{:<40} {:>10.3f} ms".format(name, secs / number * 1000))
+
+
+def bench_cache_load(number=50):
+    """Loading a cached multi-day schedule (with articles): json vs binary vs sqlite."""
+    schedule = sampledata.make_schedule(datetime.date(2023, 7, 1), num_days=3)
+    content = json.dumps(schedule).encode("utf-8")
+    cache_key = request._get_cache_key("https://statsapi.mlb.com/schedule", "bench")
+    file_store = request.FileCacheStore(request._get_cachedir())
+    file_store.write(cache_key, content, schedule, {"url": "bench"})
+    sqlite_store = request.SqliteCacheStore(request._get_cachedir())
+    sqlite_store.write(cache_key, content, schedule, {"url": "bench"})
+    json_file = request._get_cache_file(cache_key)
+    print(
+        "schedule: {} games, json size: {} bytes".format(
+            schedule["totalGames"], len(content)
+        )
+    )
+
+    def load_json():
+        with open(json_file) as jfh:
+            return json.load(jfh)
+
+    _report("json.load", number, timeit.timeit(load_json, number=number))
+    _report(
+        "binary cache load",
+        number,
+        timeit.timeit(
+            lambda: file_store._read_binary(cache_key, json_file), number=number
+        ),
+    )
+    _report(
+        "sqlite cache load",
+        number,
+        timeit.timeit(lambda: sqlite_store.read(cache_key), number=number),
+    )
+
+
+def bench_cache_compression(number=20):
+    """Stored size and load time of a cached schedule, by cache_compression."""
+    schedule = sampledata.make_schedule(datetime.date(2023, 7, 1), num_days=3)
+    content = json.dumps(schedule).encode("utf-8")
+    cache_key = request._get_cache_key("https://statsapi.mlb.com/schedule", "bench")
+    store = request.FileCacheStore(request._get_cachedir())
+    for compression in ("none", "gzip", "lzma"):
+        config.CONFIG.parser["cache_compression"] = compression
+        store.write(cache_key, content, schedule, {"url": "bench"})
+        print(
+            "{}: {} bytes on disk".format(
+                compression, os.path.getsize(request._get_cache_file(cache_key))
+            )
+        )
+        _report(
+            "{} load".format(compression),
+            number,
+            timeit.timeit(lambda: store.read(cache_key), number=number),
+        )
+    config.CONFIG.parser["cache_compression"] = "none"
+
+
+def bench_parse_season(number=3):
+    """Parsing a full season of schedules (2,430 games) into game records."""
+    schedule = sampledata.make_schedule(
+        datetime.date(2023, 3, 30), num_days=162, games_per_day=15
+    )
+    retriever = mlbgamedata.GameDataRetriever()
+    days = [dict(schedule, dates=[date_rec]) for date_rec in schedule["dates"]]
+
+    def parse():
+        return [retriever._parse_games(day, day["dates"][0]["date"]) for day in days]
+
+    _report("parse season", number, timeit.timeit(parse, number=number))
+    tracemalloc.start()
+    snapshot = tracemalloc.take_snapshot()
+    records = parse()
+    size = sum(
+        stat.size_diff
+        for stat in tracemalloc.take_snapshot().compare_to(snapshot, "filename")
+    )
+    tracemalloc.stop()
+    print(
+        "game records: {} games, {:.1f} MB".format(
+            sum(len(day) for day in records), size / (1024 * 1024)
+        )
+    )
+
+
+def bench_parse_datetime(number=5):
+    """Parsing statsapi date times: a season of game dates, and airing milestones."""
+    start = datetime.datetime(2023, 3, 30, 17, 5)
+    game_dates = [
+        (start + datetime.timedelta(minutes=97 * num)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        for num in range(2430)
+    ]
+    # milestone times carry milliseconds
+    milestone_times = [
+        (start + datetime.timedelta(seconds=37 * num)).strftime("%Y-%m-%dT%H:%M:%S.%f")[
+            :-3
+        ]
+        + "Z"
+        for num in range(400)
+    ]
+    import_secs = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import time; start = time.perf_counter(); import dateutil.parser; "
+            "print(time.perf_counter() - start)",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    _report("import dateutil.parser", 1, float(import_secs))
+    from dateutil import parser
+
+    for name, datetime_strs in (
+        ("season game dates", game_dates),
+        ("airing milestones", milestone_times),
+    ):
+        assert [util.parse_datetime(value) for value in datetime_strs] == [
+            parser.parse(value) for value in datetime_strs
+        ]
+        _report(
+            name + ": dateutil",
+            number,
+            timeit.timeit(
+                lambda: [parser.parse(value) for value in datetime_strs],
+                number=number,
+            ),
+        )
+        _report(
+            name + ": parse_datetime",
+            number,
+            timeit.timeit(
+                lambda: [util.parse_datetime(value) for value in datetime_strs],
+                number=number,
+            ),
+        )
+
+
+def bench_team_stats(number=100):
+    """A full season roster's team stats: building the tables, then sorting every
+    section of every group by every stat, with percentiles."""
+    person_stats = sampledata.make_person_stats(num_players=70)
+    team_id = sampledata.TEAMS[0][0]
+    _report(
+        "build tables",
+        number,
+        timeit.timeit(
+            lambda: stats._get_team_person_stats(person_stats, team_id, "all"),
+            number=number,
+        ),
+    )
+    tables = stats._get_team_person_stats(person_stats, team_id, "all")
+
+    def sort_all():
+        for table in tables.values():
+            for pitchers in (False, True):
+                rows = [
+                    row for row in table if (table.positions[row] == "P") == pitchers
+                ]
+                for stat_name in table.stat_names:
+                    table.sort(rows, stat_name)
+                    table.percentiles(rows, stat_name)
+
+    _report("sort all stats", number, timeit.timeit(sort_all, number=number))
+
+
+BENCHMARKS = {
+    "cache_load": bench_cache_load,
+    "cache_compression": bench_cache_compression,
+    "parse_season": bench_parse_season,
+    "parse_datetime": bench_parse_datetime,
+    "team_stats": bench_team_stats,
+}
+
+
+def main(names):
+    with tempfile.TemporaryDirectory() as tempdir:
+        _init_config(tempdir)
+        for name in names or BENCHMARKS:
+            print("== {}: {}".format(name, BENCHMARKS[name].__doc__))
+            BENCHMARKS[name]()
+            print("")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
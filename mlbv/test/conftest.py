@@ -0,0 +1,28 @@
+"""pytest fixtures shared by the test cases
+"""
+
+import configparser
+import logging
+import types
+
+import pytest
+
+from mlbv.mlbam import mlbconfig
+from mlbv.mlbam.common import config
+from mlbv.mlbam.common import util
+
+
+@pytest.fixture
+def mlbv_config(tmp_path, monkeypatch):
+    """Installs a default mlbv config, with the tempdir pointed at a pytest tmp_path."""
+    monkeypatch.setattr(util, "LOG", logging.getLogger(util.__name__))
+    monkeypatch.setattr(util, "TEMPDIR", None)
+    parser = configparser.ConfigParser()
+    parser.read_dict(mlbconfig.DEFAULTS)
+    parser["mlbv"]["tempdir"] = str(tmp_path)
+    saved_config = config.CONFIG
+    config.CONFIG = types.SimpleNamespace(
+        parser=parser["mlbv"], ua_iphone=config.Config.ua_iphone
+    )
+    yield config.CONFIG
+    config.CONFIG = saved_config
@@ -0,0 +1,592 @@
+"""Synthetic statsapi responses, for tests and benchmarks.
+
+These follow the structure of the hydrated statsapi schedule/boxscore documents,
+covering the fields mlbv reads (plus some it does not, as the real responses do).
+"""
+
+import datetime
+
+TEAMS = (
+    (141, "tor", "Toronto", "Blue Jays"),
+    (147, "nyy", "NY Yankees", "Yankees"),
+    (111, "bos", "Boston", "Red Sox"),
+    (110, "bal", "Baltimore", "Orioles"),
+    (139, "tb", "Tampa Bay", "Rays"),
+    (119, "lad", "LA Dodgers", "Dodgers"),
+    (137, "sf", "San Francisco", "Giants"),
+    (135, "sd", "San Diego", "Padres"),
+    (109, "ari", "Arizona", "D-backs"),
+    (115, "col", "Colorado", "Rockies"),
+)
+
+ARTICLE_PARAGRAPH = (
+    "<p>The starter worked into the seventh inning, allowing two runs on five hits "
+    "while striking out eight, and the bullpen closed it out from there.</p>"
+)
+
+
+def _team(team_index, probable_pitcher=True):
+    team_id, abbrev, short_name, team_name = TEAMS[team_index % len(TEAMS)]
+    team = {
+        "leagueRecord": {"wins": 50, "losses": 40, "pct": ".556"},
+        "score": 3,
+        "team": {
+            "id": team_id,
+            "name": "{} {}".format(short_name, team_name),
+            "link": "/api/v1/teams/{}".format(team_id),
+            "abbreviation": abbrev.upper(),
+            "teamName": team_name,
+            "shortName": short_name,
+            "locationName": short_name,
+            "venue": {"id": 14, "name": "Ballpark"},
+        },
+        "isWinner": False,
+        "splitSquad": False,
+        "seriesNumber": 30,
+    }
+    if probable_pitcher:
+        team["probablePitcher"] = {
+            "id": 600000 + team_index,
+            "fullName": "Pitcher, Sample",
+            "note": "Has a 3.21 ERA over his last five starts.",
+        }
+    return team
+
+
+def _linescore(innings):
+    return {
+        "currentInning": innings,
+        "currentInningOrdinal": "{}th".format(innings),
+        "inningState": "Bottom",
+        "inningHalf": "Bottom",
+        "isTopInning": False,
+        "scheduledInnings": 9,
+        "innings": [
+            {
+                "num": num,
+                "ordinalNum": "{}th".format(num),
+                "away": {"runs": num % 2, "hits": 1, "errors": 0, "leftOnBase": 1},
+                "home": {"runs": (num + 1) % 2, "hits": 1, "errors": 0},
+            }
+            for num in range(1, innings + 1)
+        ],
+        "teams": {
+            "away": {"runs": 5, "hits": 9, "errors": 0, "leftOnBase": 6},
+            "home": {"runs": 4, "hits": 8, "errors": 1, "leftOnBase": 7},
+        },
+        "defense": {"pitcher": {"id": 1, "fullName": "Sample Pitcher"}},
+        "offense": {"batter": {"id": 2, "fullName": "Sample Batter"}},
+        "balls": 1,
+        "strikes": 2,
+        "outs": 3,
+    }
+
+
+def _epg(game_pk, state):
+    media_state = "MEDIA_ARCHIVE" if state == "Final" else "MEDIA_ON"
+    return [
+        {
+            "title": "MLBTV",
+            "items": [
+                {
+                    "id": game_pk * 10 + num,
+                    "contentId": "{}-content".format(game_pk * 10 + num),
+                    "mediaId": "{}-media-{}".format(game_pk, num),
+                    "mediaState": media_state,
+                    "mediaFeedType": feed_type,
+                    "callLetters": "CALL{}".format(num),
+                    "espnAuthRequired": False,
+                    "tbsAuthRequired": False,
+                    "freeGame": False,
+                }
+                for num, feed_type in enumerate(("HOME", "AWAY", "NATIONAL"))
+            ],
+        },
+        {"title": "Audio", "items": [{"id": 1, "mediaFeedType": "HOME"}]},
+    ]
+
+
+def _epg_alternate(game_pk):
+    playbacks = [
+        {"name": name, "url": "https://example.com/{}/{}.m3u8".format(game_pk, name)}
+        for name in ("mp4Avc", "hlsCloud", "HTTP_CLOUD_WIRED_60", "highBit")
+    ]
+    return [
+        {
+            "title": "Extended Highlights",
+            "items": [
+                {"mediaPlaybackId": "{}-cnd".format(game_pk), "playbacks": playbacks}
+            ],
+        },
+        {
+            "title": "Daily Recap",
+            "items": [
+                {"mediaPlaybackId": "{}-rcp".format(game_pk), "playbacks": playbacks}
+            ],
+        },
+    ]
+
+
+def make_game(
+    game_pk, game_datetime, state="Final", team_index=0, article_paragraphs=20
+):
+    """Returns one hydrated schedule game record."""
+    detailed_state = {"Final": "Final", "Live": "In Progress", "Preview": "Scheduled"}
+    game = {
+        "gamePk": game_pk,
+        "link": "/api/v1.1/game/{}/feed/live".format(game_pk),
+        "gameType": "R",
+        "season": str(game_datetime.year),
+        "gameDate": game_datetime.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "officialDate": game_datetime.strftime("%Y-%m-%d"),
+        "status": {
+            "abstractGameState": state,
+            "codedGameState": state[0],
+            "detailedState": detailed_state[state],
+            "statusCode": state[0],
+            "abstractGameCode": state[0],
+        },
+        "teams": {
+            "away": _team(team_index),
+            "home": _team(team_index + 1),
+        },
+        "broadcasts": [
+            {
+                "id": num,
+                "name": "Network {}".format(num),
+                "type": "TV",
+                "language": "en",
+            }
+            for num in range(4)
+        ],
+        "venue": {"id": 14, "name": "Ballpark"},
+        "content": {
+            "link": "/api/v1/game/{}/content".format(game_pk),
+            "editorial": {
+                "recap": {
+                    "mlb": {
+                        "headline": "Sample team wins again",
+                        "subhead": "Walk-off single in the ninth",
+                        "seoTitle": "Sample team wins on walk-off",
+                        "body": ARTICLE_PARAGRAPH * article_paragraphs,
+                        "slug": "sample-recap",
+                        "keywordsAll": [{"type": "team", "value": "tor"}] * 10,
+                    }
+                }
+            },
+            "media": {
+                "epg": _epg(game_pk, state),
+                "epgAlternate": _epg_alternate(game_pk),
+                "freeGame": False,
+                "enhancedGame": True,
+            },
+        },
+        "isTie": False,
+        "gameNumber": 1,
+        "publicFacing": True,
+        "doubleHeader": "N",
+        "gamedayType": "P",
+        "tiebreaker": "N",
+        "calendarEventID": "14-{}-2023-07-01".format(game_pk),
+        "seasonDisplay": str(game_datetime.year),
+        "dayNight": "night",
+        "scheduledInnings": 9,
+        "reverseHomeAwayStatus": False,
+        "inningBreakLength": 120,
+        "gamesInSeries": 3,
+        "seriesGameNumber": 2,
+        "seriesDescription": "Regular Season",
+        "recordSource": "S",
+        "ifNecessary": "N",
+        "ifNecessaryDescription": "Normal Game",
+    }
+    if state != "Preview":
+        game["linescore"] = _linescore(9)
+    return game
+
+
+def make_schedule(start_date, num_days=1, games_per_day=15, state="Final", **kwargs):
+    """Returns a hydrated schedule response covering num_days starting at start_date (a date)."""
+    dates = list()
+    game_pk = 700000
+    for day in range(num_days):
+        date = start_date + datetime.timedelta(days=day)
+        games = list()
+        for num in range(games_per_day):
+            game_pk += 1
+            game_datetime = datetime.datetime(
+                date.year, date.month, date.day, 17 + num % 6, 5
+            )
+            games.append(make_game(game_pk, game_datetime, state, num * 2, **kwargs))
+        dates.append(
+            {
+                "date": date.strftime("%Y-%m-%d"),
+                "totalItems": len(games),
+                "totalEvents": 0,
+                "totalGames": len(games),
+                "games": games,
+                "events": [],
+            }
+        )
+    return {
+        "copyright": "Copyright notice",
+        "totalItems": sum(len(date["games"]) for date in dates),
+        "totalGames": sum(len(date["games"]) for date in dates),
+        "dates": dates,
+    }
+
+
+def _boxscore_player(player_id, position, batting, pitching):
+    return {
+        "person": {
+            "id": player_id,
+            "fullName": "Player {}".format(player_id),
+            "link": "/api/v1/people/{}".format(player_id),
+        },
+        "jerseyNumber": str(player_id % 100),
+        "position": {"code": "1", "name": position, "abbreviation": position},
+        "status": {"code": "A", "description": "Active"},
+        "stats": {"batting": batting, "pitching": pitching, "fielding": {"errors": 0}},
+        "seasonStats": {
+            "batting": {"avg": ".275", "ops": ".801", "homeRuns": 12, "hits": 80},
+            "pitching": {"era": "3.45", "whip": "1.18", "wins": 7, "losses": 4},
+            "fielding": {"fielding": ".985", "assists": 40},
+        },
+        "gameStatus": {"isCurrentBatter": False, "isOnBench": False},
+        "allPositions": [{"code": "1", "abbreviation": position}],
+    }
+
+
+def _boxscore_team(team_index, first_id):
+    team_id, abbrev, short_name, team_name = TEAMS[team_index % len(TEAMS)]
+    batting = {
+        "atBats": 4,
+        "runs": 1,
+        "hits": 2,
+        "homeRuns": 0,
+        "rbi": 1,
+        "baseOnBalls": 0,
+        "strikeOuts": 1,
+        "leftOnBase": 2,
+        "avg": ".275",
+        "ops": ".801",
+        "doubles": 1,
+        "triples": 0,
+    }
+    pitching = {
+        "inningsPitched": "3.0",
+        "hits": 3,
+        "runs": 1,
+        "earnedRuns": 1,
+        "baseOnBalls": 1,
+        "strikeOuts": 4,
+        "homeRuns": 0,
+        "era": "3.00",
+        "whip": "1.33",
+        "numberOfPitches": 45,
+    }
+    batters = list(range(first_id, first_id + 9))
+    pitchers = list(range(first_id + 9, first_id + 12))
+    # the full roster is listed, including players who did not appear
+    players = dict()
+    for player_id in range(first_id, first_id + 26):
+        players["ID{}".format(player_id)] = _boxscore_player(
+            player_id,
+            "P" if player_id in pitchers else "SS",
+            batting if player_id in batters else {},
+            pitching if player_id in pitchers else {},
+        )
+    return {
+        "team": {
+            "id": team_id,
+            "name": "{} {}".format(short_name, team_name),
+            "abbreviation": abbrev.upper(),
+        },
+        "teamStats": {"batting": batting, "pitching": pitching, "fielding": {}},
+        "players": players,
+        "batters": batters,
+        "pitchers": pitchers,
+        "bench": list(range(first_id + 12, first_id + 16)),
+        "bullpen": list(range(first_id + 16, first_id + 26)),
+        "battingOrder": batters,
+        "info": [
+            {
+                "title": "BATTING",
+                "fieldList": [{"label": "2B", "value": "Player {}.".format(first_id)}],
+            }
+        ],
+        "note": [],
+    }
+
+
+def make_boxscore(team_index=0):
+    """Returns a boxscore response."""
+    return {
+        "copyright": "Copyright notice",
+        "teams": {
+            "away": _boxscore_team(team_index, 500000),
+            "home": _boxscore_team(team_index + 1, 600000),
+        },
+        "officials": [
+            {"official": {"id": num, "fullName": "Umpire {}".format(num)}}
+            for num in range(4)
+        ],
+        "info": [
+            {"label": "Weather", "value": "75 degrees, Sunny."},
+            {"label": "Wind", "value": "5 mph, Out To CF."},
+            {"label": "First pitch", "value": "7:07 PM."},
+            {"label": "T", "value": "2:45."},
+            {"label": "Att", "value": "31,000."},
+            {"label": "Venue", "value": "Ballpark."},
+            {"label": "HBP", "value": "Player 500001."},
+        ],
+        "pitchingNotes": [],
+    }
+
+
+def make_standings(standings_type="byDivision", num_records=2):
+    """Returns a hydrated standings response."""
+    records = list()
+    for num in range(num_records):
+        records.append(
+            {
+                "standingsType": standings_type,
+                "league": {"id": 103 + num % 2, "name": "Sample League"},
+                "division": {
+                    "id": 200 + num,
+                    "name": "Sample Division {}".format(num),
+                    "abbreviation": "ALE",
+                },
+                "sport": {"id": 1, "name": "Major League Baseball"},
+                "lastUpdated": "2023-07-01T12:00:00Z",
+                "teamRecords": [
+                    {
+                        "team": {
+                            "id": TEAMS[index][0],
+                            "name": "{} {}".format(TEAMS[index][2], TEAMS[index][3]),
+                            "abbreviation": TEAMS[index][1].upper(),
+                        },
+                        "season": "2023",
+                        "streak": {"streakCode": "W2", "streakNumber": 2},
+                        "clinchIndicator": "y",
+                        "divisionRank": str(index + 1),
+                        "leagueRank": str(index + 1),
+                        "wildCardRank": str(index + 1),
+                        "gamesBack": "-",
+                        "wildCardGamesBack": "-",
+                        "leagueRecord": {"wins": 50, "losses": 40, "pct": ".556"},
+                        "records": {"splitRecords": [{"wins": 10, "losses": 5}] * 10},
+                        "runsAllowed": 400,
+                        "runsScored": 450,
+                    }
+                    for index in range(5)
+                ],
+            }
+        )
+    return {"copyright": "Copyright notice", "records": records}
+
+
+def make_league_leaders(leader_categories, stat_group="hitting", limit=10):
+    """Returns a stats/leaders response for the given leader categories."""
+    return {
+        "copyright": "Copyright notice",
+        "leagueLeaders": [
+            {
+                "leaderCategory": leader_category,
+                "season": "2023",
+                "gameType": "R",
+                "statGroup": stat_group,
+                "totalSplits": 200,
+                "leaders": [
+                    {
+                        "rank": rank,
+                        "value": str(100 - rank),
+                        "team": {"id": TEAMS[rank % len(TEAMS)][0], "name": "Team"},
+                        "league": {"id": 103, "name": "American League"},
+                        "person": {
+                            "id": 500000 + rank,
+                            "fullName": "{} Leader {}".format(leader_category, rank),
+                        },
+                        "sport": {"id": 1},
+                        "numTeams": 1,
+                    }
+                    for rank in range(1, limit + 1)
+                ],
+            }
+            for leader_category in leader_categories
+        ],
+    }
+
+
+def make_season_stats(group="hitting", num_players=40, team_games=100):
+    """Returns a bulk season stats (stats?stats=season) response. Player n plays for
+    TEAMS[n % len(TEAMS)], in league 103 for even team indexes, 104 for odd."""
+    splits = list()
+    for num in range(num_players):
+        team_index = num % len(TEAMS)
+        if group == "pitching":
+            innings = team_games * 2 - num * 5
+            stat = {
+                "gamesPlayed": 20,
+                "wins": 5 + num % 3,
+                "losses": 4,
+                "era": "{:.2f}".format(2 + num * 0.1) if innings > 0 else "-.--",
+                "whip": "{:.2f}".format(1 + num * 0.02),
+                "strikeOuts": 100 - num,
+                "inningsPitched": "{}.{}".format(max(innings, 0), num % 3),
+                "saves": num % 4,
+            }
+        else:
+            stat = {
+                "gamesPlayed": team_games - num,
+                "plateAppearances": (team_games - num) * 4,
+                "atBats": (team_games - num) * 3,
+                "hits": 100 - num,
+                "doubles": 20,
+                "triples": num % 3,
+                "homeRuns": 30 - num // 2,
+                "avg": ".{:03d}".format(330 - num),
+                "babip": ".{:03d}".format(280 + num),
+                "strikeOuts": 50 + num,
+            }
+        splits.append(
+            {
+                "season": "2023",
+                "stat": stat,
+                "team": {"id": TEAMS[team_index][0], "name": TEAMS[team_index][3]},
+                "player": {"id": 500000 + num, "fullName": "Player {}".format(num)},
+                "league": {
+                    "id": 103 + team_index % 2,
+                    "name": ("American League", "National League")[team_index % 2],
+                },
+                "sport": {"id": 1},
+                "gameType": "R",
+                "numTeams": 1,
+            }
+        )
+    return {
+        "copyright": "Copyright notice",
+        "stats": [
+            {
+                "type": {"displayName": "season"},
+                "group": {"displayName": group},
+                "totalSplits": len(splits),
+                "splits": splits,
+            }
+        ],
+    }
+
+
+def make_person_stats(team_id=141, num_players=26):
+    """Returns a multi-person stats (people?personIds=...) response for a roster of
+    team_id: even numbered players are pitchers, the first half of them starters.
+    Players 2 and 3 share a name, position players play a second position every
+    third player, and player 1 has also pitched."""
+    people = list()
+    for num in range(num_players):
+        pitcher = num % 2 == 0
+        position = "P" if pitcher else ("C", "1B", "2B", "SS", "CF")[num % 5]
+        team = {"id": team_id, "name": "Team"}
+        other_team = {"id": team_id + 1, "name": "Other Team"}
+        hitting = {
+            "gamesPlayed": 100 - num,
+            "atBats": 0 if pitcher and num % 4 == 0 else 300 - num,
+            "hits": 80 - num,
+            "rbi": 40 + num % 7,
+            "runs": 50,
+            "doubles": 15,
+            "triples": num % 3,
+            "homeRuns": 10 + num % 5,
+            "strikeOuts": 60 + num,
+            "baseOnBalls": 30,
+            "stolenBases": num % 4,
+            "avg": ".{:03d}".format(300 - num * 3),
+            "obp": ".{:03d}".format(350 - num),
+            "ops": "{:.3f}".format(0.9 - num * 0.01).lstrip("0"),
+            "slg": ".{:03d}".format(450 - num * 2),
+            "babip": ".{:03d}".format(290 + num),
+        }
+        fielding_splits = [
+            {
+                "team": team,
+                "stat": {
+                    "position": {"abbreviation": position},
+                    "games": 90 - num,
+                    "gamesStarted": 80 - num,
+                    "assists": 100 + num,
+                    "putOuts": 150,
+                    "errors": num % 6,
+                    "chances": 250 + num,
+                    "fielding": ".{:03d}".format(990 - num),
+                },
+            }
+        ]
+        if not pitcher and num % 3 == 0:
+            fielding_splits.append(
+                {
+                    "team": team,
+                    "stat": {
+                        "position": {"abbreviation": "LF"},
+                        "games": 5,
+                        "gamesStarted": 2,
+                        "assists": 1,
+                        "putOuts": 8,
+                        "errors": 0,
+                        "chances": 9,
+                        "fielding": "1.000",
+                    },
+                }
+            )
+        stats = [
+            {
+                "group": {"displayName": "hitting"},
+                "splits": [
+                    {"team": other_team, "stat": dict(hitting, atBats=10)},
+                    {"team": team, "stat": hitting},
+                ],
+            },
+            {"group": {"displayName": "fielding"}, "splits": fielding_splits},
+        ]
+        if pitcher or num == 1:
+            innings = 0 if num == 24 else 150 - num * 5
+            stats.append(
+                {
+                    "group": {"displayName": "pitching"},
+                    "splits": [
+                        {
+                            "team": team,
+                            "stat": {
+                                "gamesPlayed": 30,
+                                "gamesStarted": 25 if pitcher and num < 12 else 0,
+                                "inningsPitched": "{}.{}".format(innings, num % 3),
+                                "wins": 10 - num % 7,
+                                "losses": 5,
+                                "saves": 0 if num < 12 else num % 5,
+                                "runs": 50,
+                                "hits": 120,
+                                "homeRuns": 15,
+                                "strikeOuts": 200 - num * 4,
+                                "baseOnBalls": 40,
+                                "earnedRuns": 45,
+                                "era": "{:.2f}".format(2.5 + num * 0.25)
+                                if innings
+                                else "-.--",
+                                "avg": ".{:03d}".format(220 + num),
+                                "whip": "{:.2f}".format(1.0 + num * 0.03),
+                            },
+                        }
+                    ],
+                }
+            )
+        people.append(
+            {
+                "id": 600000 + num,
+                "fullName": "Player {}".format(num),
+                "lastInitName": "Smith, J"
+                if num in (2, 3)
+                else "Player{:02d}, P".format(num),
+                "primaryPosition": {"abbreviation": position},
+                "stats": stats,
+            }
+        )
+    return {"copyright": "Copyright notice", "people": people}
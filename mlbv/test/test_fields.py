@@ -0,0 +1,149 @@
+"""pytest test cases for the statsapi field projections (fields= parameter)
+"""
+
+import datetime
+import re
+
+import pytest
+
+from mlbv.mlbam import mlbapidata
+from mlbv.mlbam import mlbgamedata
+from mlbv.mlbam import standings
+from mlbv.mlbam.common import displayutil
+from mlbv.mlbam.common import request
+from mlbv.test import sampledata
+
+# map keys, as opposed to field names (e.g. the boxscore players: 'ID123456')
+MAP_KEY_RE = re.compile(r"^ID\d+$")
+
+
+class TrackingDict(dict):
+    """A dict which records the names of all the keys looked up, at any depth."""
+
+    def __init__(self, data, accessed):
+        super().__init__((key, _track(value, accessed)) for key, value in data.items())
+        self.accessed = accessed
+
+    def _record(self, key):
+        if not MAP_KEY_RE.match(str(key)):
+            self.accessed.add(key)
+
+    def __getitem__(self, key):
+        self._record(key)
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self._record(key)
+        return super().__contains__(key)
+
+    def get(self, key, default=None):
+        self._record(key)
+        return super().get(key, default)
+
+
+def _track(value, accessed):
+    if isinstance(value, dict):
+        return TrackingDict(value, accessed)
+    if isinstance(value, list):
+        return [_track(item, accessed) for item in value]
+    return value
+
+
+def _project(value, fields):
+    """Applies a fields projection as statsapi does."""
+    if isinstance(value, dict):
+        return {
+            key: _project(item, fields)
+            for key, item in value.items()
+            if key in fields or MAP_KEY_RE.match(key)
+        }
+    if isinstance(value, list):
+        return [_project(item, fields) for item in value]
+    return value
+
+
+def _parse_and_display(json_data):
+    retriever = mlbgamedata.GameDataRetriever()
+    presenter = mlbgamedata.GameDatePresenter()
+    request.get_schedule_ttl_class(json_data)
+    game_records = retriever._parse_games(json_data, "2023-07-01")
+    outl = list()
+    for count, (game_pk, game_rec) in enumerate(game_records.items(), 1):
+        outl.extend(
+            presenter._display_game_details(
+                [], game_pk, game_rec, True, False, True, count
+            )
+        )
+    return outl
+
+
+@pytest.mark.parametrize("state", ["Final", "Live", "Preview"])
+def test_schedule_fields(mlbv_config, state):
+    mlbv_config.parser["scores"] = "true"
+    schedule = sampledata.make_schedule(datetime.date(2023, 7, 1), state=state)
+    accessed = set()
+    _parse_and_display(_track(schedule, accessed))
+    assert accessed <= set(mlbgamedata.SCHEDULE_FIELDS)
+    assert _parse_and_display(
+        _project(schedule, mlbgamedata.SCHEDULE_FIELDS)
+    ) == _parse_and_display(schedule)
+
+
+def test_boxscore_fields(mlbv_config, monkeypatch):
+    boxscore = sampledata.make_boxscore()
+    accessed = set()
+    presenter = mlbgamedata.GameDatePresenter()
+    game_rec = mlbgamedata.GameRecord(game_pk=1)
+    monkeypatch.setattr(
+        mlbgamedata.GameDataRetriever,
+        "get_boxscore",
+        staticmethod(lambda game_pk, game_rec=None: _track(boxscore, accessed)),
+    )
+    outl = presenter._get_formatted_boxscore(game_rec, "", "")
+    assert accessed <= set(mlbgamedata.BOXSCORE_FIELDS)
+
+    projected = _project(boxscore, mlbgamedata.BOXSCORE_FIELDS)
+    monkeypatch.setattr(
+        mlbgamedata.GameDataRetriever,
+        "get_boxscore",
+        staticmethod(lambda game_pk, game_rec=None: projected),
+    )
+    assert presenter._get_formatted_boxscore(game_rec, "", "") == outl
+    assert len(repr(projected)) * 2 < len(repr(boxscore))
+
+
+def test_standings_fields(mlbv_config, monkeypatch):
+    monkeypatch.setattr(mlbapidata, "is_fav", lambda name: False)
+    json_data = sampledata.make_standings()
+
+    border = displayutil.Border(use_unicode=False)
+
+    def display(json_data):
+        outl = list()
+        for rank_tag, header_tags in (
+            ("divisionRank", ("league", "division")),
+            ("wildCardRank", ("league",)),
+            ("leagueRank", ("league",)),
+        ):
+            record = standings._get_division_record(json_data["records"], "ale")
+            standings._get_standings_display_for_record(
+                outl, "byDivision", record, header_tags, rank_tag, border, False
+            )
+        return outl
+
+    accessed = set()
+    display(_track(json_data, accessed))
+    assert accessed <= set(standings.STANDINGS_FIELDS)
+    assert display(_project(json_data, standings.STANDINGS_FIELDS)) == display(
+        json_data
+    )
+
+
+def test_projected_url(mlbv_config):
+    url = request.get_projected_url("https://x/api?a=1", ("b", "a", "b"))
+    assert url == "https://x/api?a=1&fields=a,b"
+    assert request._get_cache_key(url, "x") != request._get_cache_key(
+        "https://x/api?a=1", "x"
+    )
+    mlbv_config.parser["api_fields"] = "false"
+    assert request.get_projected_url("https://x/api", ("a",)) == "https://x/api"
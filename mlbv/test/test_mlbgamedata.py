@@ -0,0 +1,319 @@
+"""pytest test cases for the mlbgamedata module
+"""
+
+import datetime
+import http.server
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+import pytest
+
+from mlbv.mlbam import mlbgamedata
+from mlbv.mlbam.common import gamedata
+from mlbv.mlbam.common import request
+from mlbv.test import sampledata
+
+
+class ScheduleHandler(http.server.BaseHTTPRequestHandler):
+    """Serves synthetic schedules for the requested date range."""
+
+    protocol_version = "HTTP/1.1"
+    requests = list()  # (startDate, endDate) of each request
+    revalidations = list()  # startDate of each conditional request
+
+    def do_GET(self):
+        query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+        ScheduleHandler.requests.append((query["startDate"], query["endDate"]))
+        if self.headers.get("If-None-Match") == '"v1"':
+            ScheduleHandler.revalidations.append(query["startDate"])
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start_date = datetime.date.fromisoformat(query["startDate"])
+        num_days = (datetime.date.fromisoformat(query["endDate"]) - start_date).days
+        schedule = sampledata.make_schedule(start_date, num_days + 1, games_per_day=2)
+        # no games on the 4th
+        schedule["dates"] = [
+            date_rec for date_rec in schedule["dates"] if date_rec["date"][-2:] != "04"
+        ]
+        body = json.dumps(schedule).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BoxscoreHandler(http.server.BaseHTTPRequestHandler):
+    """Serves a synthetic boxscore for any game, slowly."""
+
+    protocol_version = "HTTP/1.1"
+    requests = list()  # game_pk of each request
+
+    def do_GET(self):
+        BoxscoreHandler.requests.append(self.path.split("/")[4])
+        time.sleep(0.2)
+        body = json.dumps(sampledata.make_boxscore()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def retriever_config(mlbv_config, monkeypatch):
+    # nothing listens here, so any request fails
+    mlbv_config.parser["api_url"] = "http://127.0.0.1:9"
+    mlbv_config.parser["http_retries"] = "0"
+    monkeypatch.setattr(request, "CACHE", request.MemoryCache())
+    monkeypatch.setattr(request, "CACHE_STORE", None)
+    monkeypatch.setattr(request, "CACHEDIR", None)
+    monkeypatch.setattr(request, "CACHE_SHARDS", set())
+    return mlbv_config
+
+
+def test_hydrate_profile():
+    listing = mlbgamedata.get_hydrate_profile()
+    assert mlbgamedata._get_hydrate(listing) == (
+        "hydrate=game(content(media(epg))),linescore,team"
+    )
+    assert mlbgamedata._get_hydrate(mlbgamedata.HYDRATE_ALL) == (
+        "hydrate=game(content(media(epg)),editorial(preview,recap)),"
+        "linescore,team,probablePitcher(note)"
+    )
+    assert mlbgamedata.get_hydrate_profile(show_info=True) == mlbgamedata.HYDRATE_ALL
+    assert mlbgamedata.HYDRATE_LINESCORE not in mlbgamedata.get_hydrate_profile(
+        show_scores=False
+    )
+    assert mlbgamedata.get_hydrate_profile(show_info=True, play_stream=True) == {
+        mlbgamedata.HYDRATE_TEAM,
+        mlbgamedata.HYDRATE_MEDIA,
+    }
+
+
+def test_richer_profile_reused(retriever_config):
+    schedule = sampledata.make_schedule(datetime.date(2023, 7, 1))
+    # cached by an earlier 'mlbv --info' run
+    full = mlbgamedata.GameDataRetriever()
+    url, output_filename, _, _ = full._get_schedule_job("2023-07-01")
+    request.CACHE.put(request._get_cache_key(url, output_filename), schedule)
+
+    lean = mlbgamedata.GameDataRetriever(mlbgamedata.get_hydrate_profile())
+    assert lean._get_schedule_job("2023-07-01")[0] != url
+    game_days = lean.process_game_data("2023-07-01")
+    assert len(game_days[0][1]) == 15
+
+    # but a leaner cached profile is not enough for a richer request
+    with pytest.raises(request.requests.exceptions.ConnectionError):
+        mlbgamedata.GameDataRetriever(
+            mlbgamedata.get_hydrate_profile(show_info=True)
+        ).process_game_data("2023-07-02")
+
+
+def test_ranged_schedule(retriever_config):
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ScheduleHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    retriever_config.parser["api_url"] = "http://127.0.0.1:{}".format(
+        httpd.server_address[1]
+    )
+    ScheduleHandler.requests.clear()
+    ScheduleHandler.revalidations.clear()
+    try:
+        retriever = mlbgamedata.GameDataRetriever()
+        game_days = retriever.process_game_data("2023-07-01", 7)
+        # the first day on its own, so it can be shown straight away
+        assert sorted(ScheduleHandler.requests) == [
+            ("2023-07-01", "2023-07-01"),
+            ("2023-07-02", "2023-07-07"),
+        ]
+        assert [date_str for date_str, _ in game_days] == [
+            "2023-07-01",
+            "2023-07-02",
+            "2023-07-03",
+            "2023-07-05",
+            "2023-07-06",
+            "2023-07-07",
+        ]
+        assert all(len(game_records) == 2 for _, game_records in game_days)
+
+        # an overlapping range only fetches the missing days, including from disk
+        request.CACHE.clear()
+        game_days = retriever.process_game_data("2023-07-03", 7)
+        assert ScheduleHandler.requests[2:] == [("2023-07-08", "2023-07-09")]
+        assert len(game_days) == 6
+
+        # stale days are revalidated one by one, with the validators of the ranges
+        # they were split from
+        retriever_config.parser["cache_ttl_policy"] = "final:60"
+        stale_time = time.time() - 120
+        for date_str in ("2023-07-01", "2023-07-02", "2023-07-03"):
+            url, output_filename, _, _ = retriever._get_schedule_job(date_str)
+            json_file = request._get_cache_file(
+                request._get_cache_key(url, output_filename)
+            )
+            os.utime(json_file, (stale_time, stale_time))
+        request.CACHE.clear()
+        ScheduleHandler.requests.clear()
+        game_days = retriever.process_game_data("2023-07-01", 3)
+        assert sorted(ScheduleHandler.revalidations) == [
+            "2023-07-01",
+            "2023-07-02",
+            "2023-07-03",
+        ]
+        assert sorted(ScheduleHandler.requests) == [
+            ("2023-07-01", "2023-07-01"),
+            ("2023-07-02", "2023-07-02"),
+            ("2023-07-03", "2023-07-03"),
+        ]
+        assert len(game_days) == 3
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_date_ranges():
+    assert mlbgamedata._get_date_ranges(
+        ["2023-07-03", "2023-06-30", "2023-07-01", "2023-07-05"]
+    ) == [
+        ("2023-06-30", "2023-07-01"),
+        ("2023-07-03", "2023-07-03"),
+        ("2023-07-05", "2023-07-05"),
+    ]
+    date_strs = mlbgamedata._get_dates_in_range("2023-07-01", "2023-07-20")
+    assert mlbgamedata._get_date_ranges(date_strs, first_day_alone=True) == [
+        ("2023-07-01", "2023-07-01"),
+        ("2023-07-02", "2023-07-08"),
+        ("2023-07-09", "2023-07-15"),
+        ("2023-07-16", "2023-07-20"),
+    ]
+
+
+def test_iter_game_data(retriever_config, monkeypatch):
+    # days are yielded before the later ranges have been retrieved
+    retrieved = list()
+
+    def request_json_iter(jobs, fetch=None):
+        for job in jobs:
+            start_date = job[0].split("startDate=")[1][:10]
+            end_date = job[0].split("endDate=")[1][:10]
+            num_days = len(mlbgamedata._get_dates_in_range(start_date, end_date))
+            retrieved.append(start_date)
+            yield (
+                sampledata.make_schedule(
+                    datetime.date.fromisoformat(start_date), num_days, games_per_day=1
+                ),
+                dict(),
+            ), None
+
+    monkeypatch.setattr(request, "request_json_iter", request_json_iter)
+    game_days = mlbgamedata.GameDataRetriever().iter_game_data("2023-07-01", 10)
+    assert next(game_days)[0] == "2023-07-01"
+    assert retrieved == ["2023-07-01"]
+    assert [date_str for date_str, _ in game_days][-1] == "2023-07-10"
+    assert retrieved == ["2023-07-01", "2023-07-02", "2023-07-09"]
+
+
+def test_game_record(mlbv_config):
+    mlbv_config.parser["favs"] = "tor"
+    schedule = sampledata.make_schedule(datetime.date(2023, 7, 1), state="Live")
+    game_records = mlbgamedata.GameDataRetriever()._parse_games(schedule, "2023-07-01")
+    game_pk, game_rec = next(iter(game_records.items()))
+
+    # native values
+    assert game_rec.game_pk == int(game_pk)
+    assert isinstance(game_rec.mlbdate, datetime.datetime)
+    assert game_rec.game_number == 1
+    assert game_rec.linescore.current_inning == 9
+    assert game_rec.linescore.away.runs == 5
+    assert game_rec.linescore.innings[0] == (1, 1, 0)
+    assert not hasattr(game_rec, "__dict__")
+
+    # the mapping shim gives the original dictionary forms
+    assert game_rec["game_pk"] == game_pk
+    assert game_rec["gameNumber"] == "1"
+    assert game_rec["linescore"]["away"]["runs"] == "5"
+    assert game_rec["away"]["abbrev"] == game_rec.away.abbrev
+    assert game_rec["mlbdate"] is game_rec.mlbdate
+    assert "resumeDate" not in game_rec
+    with pytest.raises(KeyError):
+        game_rec["resumeDate"]
+    assert game_rec.get("resumeDate") is None
+    assert "contentId" in game_rec["feed"]["home"]
+    assert game_rec["feed"]["home"]["mediaPlaybackId"].startswith(game_pk)
+    assert game_rec["feed"]["home"]["mediaPlaybackId"] == (
+        game_rec.feed["home"].media_playback_id
+    )
+    assert "mediaPlaybackId" not in game_rec["feed"]["recap"]
+
+    # the common gamedata helpers work on records
+    assert gamedata.apply_filter(game_rec, "tor,{}".format(game_rec.home.abbrev))
+    assert gamedata.is_fav(game_rec) == (
+        "tor" in (game_rec.away.abbrev, game_rec.home.abbrev)
+    )
+
+
+def test_lazy_game_sections(mlbv_config, monkeypatch):
+    parsed = list()
+
+    def tracked(name):
+        parse = getattr(mlbgamedata, name)
+
+        def wrapper(*args):
+            parsed.append(name)
+            return parse(*args)
+
+        return wrapper
+
+    for name in ("_parse_preview", "_parse_summary", "_parse_feeds"):
+        monkeypatch.setattr(mlbgamedata, name, tracked(name))
+    schedule = sampledata.make_schedule(datetime.date(2023, 7, 1))
+    game_records = mlbgamedata.GameDataRetriever()._parse_games(schedule, "2023-07-01")
+    assert parsed == []
+
+    game_rec = next(iter(game_records.values()))
+    game = schedule["dates"][0]["games"][0]
+    assert game_rec.summary[-1] is game["content"]["editorial"]["recap"]["mlb"]["body"]
+    assert "home" in game_rec["feed"]
+    assert game_rec.feed is game_rec.feed
+    assert parsed == ["_parse_summary", "_parse_feeds"]
+
+
+def test_boxscore_prefetch(retriever_config, capsys):
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), BoxscoreHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    retriever_config.parser["api_url"] = "http://127.0.0.1:{}".format(
+        httpd.server_address[1]
+    )
+    retriever_config.parser["scores"] = "true"
+    retriever_config.parser["boxscore"] = "true"
+    BoxscoreHandler.requests.clear()
+    schedule = sampledata.make_schedule(datetime.date(2023, 7, 1))
+    game_records = mlbgamedata.GameDataRetriever()._parse_games(schedule, "2023-07-01")
+    presenter = mlbgamedata.GameDatePresenter()
+    try:
+        start = time.monotonic()
+        presenter.display_game_data("2023-07-01", game_records, None, False)
+        # concurrently: about as long as one boxscore, not 15 of them
+        assert time.monotonic() - start < 1.5
+        assert sorted(BoxscoreHandler.requests) == sorted(game_records)
+        assert capsys.readouterr().out.count("TOTALS") == 15 * 4
+
+        # final boxscores are kept for good, on disk too
+        request.CACHE.clear()
+        presenter.display_game_data("2023-07-01", game_records, "tor", False)
+        assert len(BoxscoreHandler.requests) == 15
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,511 @@
+"""pytest test cases for the request module
+"""
+
+import collections
+import datetime
+import http.server
+import json
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from mlbv.mlbam.common import request
+from mlbv.test import sampledata
+
+
+class JsonHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = collections.Counter()  # requests per path
+
+    def do_GET(self):
+        JsonHandler.hits[self.path] += 1
+        if self.path.startswith("/slow"):
+            time.sleep(0.2)
+        if self.path.startswith("/stuck") and JsonHandler.hits[self.path] == 1:
+            time.sleep(1)
+        if self.path.startswith("/flaky") and JsonHandler.hits[self.path] <= 2:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if "missing" in self.path:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/etag"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        body = json.dumps({"path": self.path}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if self.path.startswith("/etag"):
+            self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), JsonHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}".format(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def fresh_request(mlbv_config, monkeypatch):
+    monkeypatch.setattr(request, "SESSION", None)
+    monkeypatch.setattr(request, "STATS", {"requests": 0})
+    monkeypatch.setattr(request, "CACHE", request.MemoryCache())
+    monkeypatch.setattr(request, "CACHE_STORE", None)
+    monkeypatch.setattr(request, "CACHEDIR", None)
+    monkeypatch.setattr(request, "CACHE_SHARDS", set())
+    monkeypatch.setattr(request, "REFRESHES", dict())
+    monkeypatch.setattr(request, "INFLIGHT", dict())
+    monkeypatch.setattr(request, "LATENCIES", collections.deque(maxlen=200))
+    monkeypatch.setattr(request, "HEDGE_EXECUTOR", None)
+    monkeypatch.setattr(request, "RATE_LIMITERS", dict())
+    JsonHandler.hits.clear()
+    yield request
+
+
+def test_connection_reuse(fresh_request, server):
+    for num in range(5):
+        json_data = request.request_json("{}/item/{}".format(server, num))
+        assert json_data["path"] == "/item/{}".format(num)
+    stats = request.get_connection_stats()
+    assert stats["requests"] == 5
+    assert stats["opened"] == 1
+    assert stats["reused"] == 4
+
+
+def test_request_json_many(fresh_request, server):
+    request.request_json("{}/cached".format(server), "cached", request.CACHE_SHORT)
+    jobs = [
+        ("{}/cached".format(server), "cached", request.CACHE_SHORT),
+        ("{}/missing".format(server), None, None),
+        ("{}/item/1".format(server), None, None),
+        ("{}/item/2".format(server), "item-2", request.CACHE_SHORT),
+    ]
+    results = request.request_json_many(jobs)
+    assert [json_data["path"] for json_data, _ in results if json_data] == [
+        "/cached",
+        "/item/1",
+        "/item/2",
+    ]
+    assert results[1][0] is None
+    assert results[1][1] is not None
+    # the cached entry was not re-requested
+    assert request.get_connection_stats()["requests"] == 4
+
+
+@pytest.mark.parametrize("path", ["/slow/item", "/slow/missing"])
+def test_single_flight(fresh_request, mlbv_config, server, path):
+    url = server + path
+    results = list()
+
+    def fetch():
+        try:
+            results.append(request.request_json(url, "slow", request.CACHE_SHORT))
+        except requests.exceptions.HTTPError as ex:
+            results.append(ex)
+
+    threads = [threading.Thread(target=fetch) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert request.get_connection_stats()["requests"] == 1
+    assert request.get_connection_stats()["coalesced"] == 5
+    assert all(result is results[0] for result in results)
+    assert not request.INFLIGHT
+
+
+def test_retries(fresh_request, mlbv_config, server):
+    mlbv_config.parser["http_retry_backoff"] = "0.01"
+    assert request.request_json(server + "/flaky/1") == {"path": "/flaky/1"}
+    assert request.get_connection_stats()["retries"] == 2
+
+    mlbv_config.parser["http_retries"] = "1"
+    with pytest.raises(requests.exceptions.HTTPError):
+        request.request_json(server + "/flaky/2")
+    assert request.get_connection_stats()["requests"] == 5
+
+    mlbv_config.parser["http_read_timeout"] = "0.05"
+    with pytest.raises(requests.exceptions.Timeout):
+        request.request_json(server + "/slow/timeout")
+    assert JsonHandler.hits["/slow/timeout"] == 2
+
+
+def test_hedged_request(fresh_request, mlbv_config, server, monkeypatch):
+    mlbv_config.parser["http_hedge"] = "true"
+    mlbv_config.parser["http_hedge_delay"] = "0.1"
+    closed = list()
+    close_response = request._close_response
+
+    def record_close(future):
+        close_response(future)
+        closed.append(future.result())
+
+    monkeypatch.setattr(request, "_close_response", record_close)
+    start = time.monotonic()
+    assert request.request_json(server + "/stuck/1") == {"path": "/stuck/1"}
+    assert time.monotonic() - start < 0.8
+    stats = request.get_connection_stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    # the losing request's response is closed once it completes
+    deadline = time.monotonic() + 2
+    while not closed and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert len(closed) == 1 and closed[0].json() == {"path": "/stuck/1"}
+    # quick requests are not hedged
+    request.request_json(server + "/item/1")
+    assert request.get_connection_stats()["hedged"] == 1
+
+
+def test_rate_limit(fresh_request, mlbv_config, server):
+    mlbv_config.parser["http_rate_limit"] = "127.0.0.1:20,*:0"
+    mlbv_config.parser["http_rate_burst"] = "2"
+    start = time.monotonic()
+    request.request_json_many(
+        [(server + "/item/{}".format(num), None, None) for num in range(6)]
+    )
+    # 2 at once, then the remaining 4 at 20/sec
+    assert time.monotonic() - start >= 0.18
+    stats = request.get_connection_stats()
+    assert stats["rate_limited"] >= 4
+    assert stats["rate_wait"] > 0
+    assert request._get_rate_limiter("statsapi.mlb.com") is None
+
+
+@pytest.mark.skipif(request.fcntl is None, reason="requires fcntl")
+def test_shared_rate_limit(tmp_path):
+    # two buckets (i.e. processes) sharing one state file take from the same tokens
+    state_file = str(tmp_path / "ratelimit")
+    bucket1 = request.SharedTokenBucket(10, 1, state_file)
+    bucket2 = request.SharedTokenBucket(10, 1, state_file)
+    assert bucket1.acquire() == 0
+    assert bucket2.acquire() > 0.05
+
+
+def test_conditional_revalidation(fresh_request, server, monkeypatch):
+    replaced = list()
+    os_replace = os.replace
+
+    def replace(src, dst):
+        replaced.append(dst)
+        os_replace(src, dst)
+
+    monkeypatch.setattr(request.os, "replace", replace)
+    url = "{}/etag".format(server)
+    assert request.request_json(url, "etag", request.CACHE_SHORT)["path"] == "/etag"
+    json_file = request._get_cache_file(request._get_cache_key(url, "etag"))
+    # the validators are written atomically, like the data
+    meta_file = request._get_cache_file(request._get_cache_key(url, "etag"), ".meta")
+    assert json_file in replaced and meta_file in replaced
+    stale_time = time.time() - 2 * request.CACHE_SHORT
+    os.utime(json_file, (stale_time, stale_time))
+    request.CACHE.clear()
+
+    assert request.request_json(url, "etag", request.CACHE_SHORT)["path"] == "/etag"
+    stats = request.get_connection_stats()
+    assert stats["requests"] == 2
+    assert stats["revalidated"] == 1
+    assert os.path.getmtime(json_file) > stale_time
+
+
+def _schedule(date_str, *states):
+    return {
+        "dates": [
+            {
+                "date": date_str,
+                "games": [
+                    {
+                        "gameDate": "{}T{:02d}:05:00Z".format(date_str, 17 + num),
+                        "status": {"abstractGameState": state},
+                    }
+                    for num, state in enumerate(states)
+                ],
+            }
+        ]
+    }
+
+
+def test_schedule_ttl_class(fresh_request):
+    today = time.strftime("%Y-%m-%d")
+    assert request.get_schedule_ttl_class(_schedule("2019-07-01", "Final")) == (
+        request.TTL_FINAL,
+        None,
+    )
+    # e.g. a postponed game, which is not frozen
+    assert request.get_schedule_ttl_class(_schedule("2019-07-01", "Preview")) == (
+        request.TTL_PAST,
+        None,
+    )
+    # off-days and unpublished dates can still get games
+    for json_data in ({"dates": []}, {}, _schedule("2019-07-01"), _schedule(today)):
+        assert request.get_schedule_ttl_class(json_data) == (request.TTL_EMPTY, None)
+    assert (
+        request._get_policy_stale_secs(
+            request.TTL_EMPTY, None, time.time(), request.CACHE_FOREVER
+        )
+        < request.CACHE_FOREVER
+    )
+    assert request.get_schedule_ttl_class(_schedule(today, "Final", "Live")) == (
+        request.TTL_LIVE,
+        None,
+    )
+    # recaps and archive media are still to come: not frozen yet
+    yesterday = time.strftime("%Y-%m-%d", time.localtime(time.time() - 86400))
+    for date_str in (today, yesterday):
+        assert request.get_schedule_ttl_class(
+            _schedule(date_str, "Final", "Final")
+        ) == (request.TTL_PAST, None)
+    game_datetime = datetime.datetime.now(datetime.timezone.utc)
+    assert request.get_game_ttl_policy("Final", game_datetime)(None)[0] == (
+        request.TTL_PAST
+    )
+    game_datetime -= datetime.timedelta(days=3)
+    assert request.get_game_ttl_policy("Final", game_datetime)(None)[0] == (
+        request.TTL_FINAL
+    )
+    assert request.get_game_ttl_policy("Final")(None)[0] == request.TTL_PAST
+    ttl_class, start_time = request.get_schedule_ttl_class(
+        _schedule(today, "Final", "Preview", "Preview")
+    )
+    assert ttl_class == request.TTL_PREVIEW
+    assert time.strftime("%H:%M", time.gmtime(start_time)) == "18:05"
+
+
+def test_ttl_policy(fresh_request, mlbv_config, server):
+    url = "{}/item/final".format(server)
+    request.request_json(
+        url,
+        "final",
+        request.CACHE_SHORT,
+        request.get_game_ttl_policy(
+            "Final", datetime.datetime(2019, 7, 1, 23, 5, tzinfo=datetime.timezone.utc)
+        ),
+    )
+    json_file = request._get_cache_file(request._get_cache_key(url, "final"))
+    old_time = time.time() - request.CACHE_DAY
+    os.utime(json_file, (old_time, old_time))
+    request.CACHE.clear()
+    request.request_json(url, "final", request.CACHE_SHORT)
+    assert request.get_connection_stats()["requests"] == 1
+
+    mlbv_config.parser["cache_ttl_policy"] = "final:60"
+    request.CACHE.clear()
+    request.request_json(url, "final", request.CACHE_SHORT)
+    assert request.get_connection_stats()["requests"] == 2
+
+
+def test_cache_index_eviction(fresh_request, mlbv_config, server):
+    keys = list()
+    for num in range(4):
+        url = "{}/item/{}".format(server, num)
+        request.request_json(url, "item", request.CACHE_SHORT)
+        keys.append(request._get_cache_key(url, "item"))
+        index = request._get_cache_store().index
+        index.entries[keys[-1]]["atime"] = num
+    mlbv_config.parser["cache_max_entries"] = "2"
+    index.save()
+    assert sorted(index.entries) == sorted(keys[2:])
+    assert not os.path.exists(request._get_cache_file(keys[0]))
+    assert os.path.exists(request._get_cache_file(keys[3]))
+
+    index.rebuild()
+    assert index.get_stats()["entries"] == 2
+
+
+def test_cache_index_unchanged(fresh_request, server):
+    url = "{}/item/1".format(server)
+    request.request_json(url, "item", request.CACHE_SHORT)
+    request._close_cache_store()
+    index_file = os.path.join(
+        request._get_cachedir(), request.CacheIndex.INDEX_FILENAME
+    )
+    mtime = os.path.getmtime(index_file)
+
+    # a warm run which only reads recently used entries leaves the index alone
+    request.CACHE.clear()
+    request.request_json(url, "item", request.CACHE_SHORT)
+    index = request._get_cache_store().index
+    assert not index.updated
+    request._close_cache_store()
+    assert os.path.getmtime(index_file) == mtime
+
+    # older access times are brought up to date
+    request.CACHE.clear()
+    index = request._get_cache_store().index
+    key = request._get_cache_key(url, "item")
+    index._get_entries()[key]["atime"] -= request.CacheIndex.ATIME_RESOLUTION
+    request.request_json(url, "item", request.CACHE_SHORT)
+    assert key in index.updated
+
+
+def test_sqlite_cache(fresh_request, mlbv_config, server):
+    mlbv_config.parser["cache_backend"] = "sqlite"
+    keys = list()
+    for num in range(4):
+        url = "{}/item/{}".format(server, num)
+        request.request_json(url, "item", request.CACHE_SHORT)
+        keys.append(request._get_cache_key(url, "item"))
+    store = request._get_cache_store()
+    assert isinstance(store, request.SqliteCacheStore)
+    assert not os.path.exists(request._get_cache_file(keys[0]))
+    assert store.get_stats()["entries"] == 4
+
+    # loaded from the database once the in-memory cache is gone
+    request.CACHE.clear()
+    url = "{}/item/0".format(server)
+    assert request.request_json(url, "item", request.CACHE_SHORT) == {"path": "/item/0"}
+    assert request.get_connection_stats()["requests"] == 4
+
+    # revalidation uses the stored validators
+    url = "{}/etag/sqlite".format(server)
+    request.request_json(url, "etag", request.CACHE_SHORT)
+    assert store.read_meta(request._get_cache_key(url, "etag"))["etag"] == '"v1"'
+
+    # reads of recently used entries do not write, older access times are written on close
+    conn = store._get_connection()
+    assert store.read(keys[0]) == {"path": "/item/0"}
+    assert not store.atimes
+    with conn:
+        conn.execute(
+            "UPDATE responses SET atime = atime - ?", (2 * request.CACHE_HOUR,)
+        )
+    assert store.read(keys[0]) == {"path": "/item/0"}
+    assert list(store.atimes) == [keys[0]]
+
+    mlbv_config.parser["cache_max_entries"] = "2"
+    store.close()
+    assert not store.atimes
+    assert store.get_stats()["entries"] == 2
+    assert store.read(keys[0]) == {"path": "/item/0"}
+    assert store.read(keys[3]) is None
+
+    # a run which only reads does not prune
+    store = request.SqliteCacheStore(request._get_cachedir())
+    mlbv_config.parser["cache_max_entries"] = "1"
+    assert store.read(keys[0]) == {"path": "/item/0"}
+    store.close()
+    assert store.get_stats()["entries"] == 2
+
+
+def test_binary_cache(fresh_request, mlbv_config, server):
+    url = "{}/item/bin".format(server)
+    request.request_json(url, "bin", request.CACHE_SHORT)
+    cache_key = request._get_cache_key(url, "bin")
+    json_file = request._get_cache_file(cache_key)
+    store = request._get_cache_store()
+    assert store._read_binary(cache_key, json_file) == {"path": "/item/bin"}
+
+    # a binary file older than its json is ignored
+    with open(json_file, "w") as out:
+        json.dump({"path": "updated"}, out)
+    old_time = os.path.getmtime(json_file) - 10
+    os.utime(request._get_cache_file(cache_key, ".bin"), (old_time, old_time))
+    assert store._read_binary(cache_key, json_file) is None
+    assert store.read(cache_key) == {"path": "updated"}
+    assert store._read_binary(cache_key, json_file) == {"path": "updated"}
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="needs posix permissions")
+def test_binary_cache_needs_private_dir(
+    fresh_request, mlbv_config, server, monkeypatch
+):
+    url = "{}/item/bin".format(server)
+    request.request_json(url, "bin", request.CACHE_SHORT)
+    cachedir = request._get_cachedir()
+    assert os.stat(cachedir).st_mode & 0o777 == 0o700
+    cache_key = request._get_cache_key(url, "bin")
+    binary_data = open(request._get_cache_file(cache_key, ".bin"), "rb").read()
+
+    # a cache directory owned by someone else is not trusted with marshal data, even
+    # when it is planted in the json file
+    other_uid = os.stat(cachedir).st_uid + 1
+    monkeypatch.setattr(os, "getuid", lambda: other_uid)
+    monkeypatch.setattr(request, "CACHEDIR", None)
+    assert request._get_cachedir() == cachedir
+    assert not request._use_binary_cache()
+    with open(request._get_cache_file(cache_key), "wb") as out:
+        out.write(binary_data)
+    assert request._get_cache_store().read(cache_key) is None
+
+
+def test_stale_while_revalidate(fresh_request, mlbv_config, server):
+    mlbv_config.parser["cache"] = "swr"
+    mlbv_config.parser["cache_swr_max_age"] = "3600"
+    url = "{}/item/swr".format(server)
+    request.request_json(url, "swr", request.CACHE_SHORT)
+    cache_key = request._get_cache_key(url, "swr")
+    json_file = request._get_cache_file(cache_key)
+
+    # stale: served from the cache, refreshed in the background
+    old_time = time.time() - 120
+    os.utime(json_file, (old_time, old_time))
+    request.CACHE.clear()
+    assert request.request_json(url, "swr", request.CACHE_SHORT) == {
+        "path": "/item/swr"
+    }
+    assert request.get_connection_stats()["stale"] == 1
+    request._join_refreshes()
+    assert request.get_connection_stats()["requests"] == 2
+    assert os.path.getmtime(json_file) > old_time + 60
+
+    # too old: fetched before returning
+    old_time = time.time() - 7200
+    os.utime(json_file, (old_time, old_time))
+    request.CACHE.clear()
+    request.request_json(url, "swr", request.CACHE_SHORT)
+    assert request.get_connection_stats()["requests"] == 3
+    assert request.get_connection_stats()["stale"] == 1
+
+
+@pytest.mark.parametrize("backend", ["files", "sqlite"])
+@pytest.mark.parametrize("compression", ["gzip", "lzma"])
+def test_cache_compression(fresh_request, mlbv_config, backend, compression):
+    mlbv_config.parser["cache_backend"] = backend
+    mlbv_config.parser["cache_compression"] = compression
+    schedule = sampledata.make_schedule(datetime.date(2023, 7, 1))
+    content = json.dumps(schedule).encode("utf-8")
+    cache_key = request._get_cache_key("https://statsapi.mlb.com/schedule", "zip")
+    store = request._get_cache_store()
+    store.write(cache_key, content, schedule, {"url": "zip"})
+    if backend == "files":
+        with open(request._get_cache_file(cache_key), "rb") as jfh:
+            assert jfh.read().startswith(request.COMPRESSION_HEADERS[compression])
+    assert store.read(cache_key) == schedule
+    stats = store.get_stats()
+    assert stats["raw_bytes"] > 3 * stats["bytes"]
+
+    # entries stay readable when the setting changes
+    mlbv_config.parser["cache_compression"] = "none"
+    assert store.read(cache_key) == schedule
+
+
+def test_cache_key(fresh_request):
+    url = "https://statsapi.mlb.com/api/v1/people?personIds={}&hydrate=stats"
+    key1 = request._get_cache_key(url.format(",".join(map(str, range(100)))), "people")
+    key2 = request._get_cache_key(url.format(",".join(map(str, range(101)))), "people")
+    assert key1 != key2
+    assert key1.startswith("people-")
+    # parameter order and host case do not matter
+    assert request._get_cache_key(
+        "https://STATSAPI.mlb.com/api/v1/schedule?b=2&a=1", "x"
+    ) == request._get_cache_key("https://statsapi.mlb.com/api/v1/schedule?a=1&b=2", "x")
+    assert len(request._get_cache_key(url, "p" * 500)) < 100
@@ -0,0 +1,336 @@
+"""pytest test cases for the stats module
+"""
+
+import urllib.parse
+
+from mlbv.mlbam import stats
+from mlbv.mlbam.common import request
+from mlbv.test import sampledata
+
+
+def _serve_leaders(monkeypatch, urls):
+    """Answers the leaders requests with synthetic data, recording the urls."""
+
+    def request_json_many(jobs, max_workers=None):
+        results = list()
+        for url, _, _ in jobs:
+            urls.append(url)
+            query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+            results.append(
+                (
+                    sampledata.make_league_leaders(
+                        query["leaderCategories"].split(","),
+                        query["statGroup"],
+                        int(query["limit"]),
+                    ),
+                    None,
+                )
+            )
+        return results
+
+    monkeypatch.setattr(request, "request_json_many", request_json_many)
+
+
+def test_league_stats_batched(mlbv_config, monkeypatch):
+    urls = list()
+    _serve_leaders(monkeypatch, urls)
+    for category in ("hitting", "fielding", "pitching"):
+        league_stats = stats._get_league_stats(category, "qualified", "2023", "", 5)
+        # each category demultiplexed into its own leaders
+        for leader_category, _, _ in stats.LEAGUE_STATS[category]:
+            assert [entry["name"] for entry in league_stats[leader_category]] == [
+                "{} Leader {}".format(leader_category, rank) for rank in range(1, 6)
+            ]
+    # one request per stat group
+    assert len(urls) == 3
+
+
+def test_league_stats_chunked(mlbv_config, monkeypatch):
+    urls = list()
+    _serve_leaders(monkeypatch, urls)
+    monkeypatch.setattr(stats, "MAX_LEADERS_URL_LENGTH", 400)
+    league_stats = stats._get_league_stats("pitching", "qualified", "2023", "104", 5)
+    assert len(urls) > 1
+    assert all(len(url) <= 400 for url in urls)
+    assert list(league_stats) == [
+        leader_category for leader_category, _, _ in stats.LEAGUE_STATS["pitching"]
+    ]
+    assert all(len(leaders) == 5 for leaders in league_stats.values())
+
+
+def _table(group, **kwargs):
+    return stats.StatsTable(
+        group, sampledata.make_season_stats(group, **kwargs)["stats"][0]["splits"]
+    )
+
+
+def test_rank_ties():
+    table = _table("hitting")
+    leaders = table.rank("homeRuns", 3)
+    # players 0 and 1 tie for first, 2 and 3 for third
+    assert [(leader["rank"], leader["value"]) for leader in leaders] == [
+        (1, 30),
+        (1, 30),
+        (3, 29),
+        (3, 29),
+    ]
+    # derived stats: doubles + triples + homeRuns
+    assert table.rank("extraBaseHits", 1)[0]["value"] == 20 + 1 + 30
+
+
+def test_rank_qualified():
+    table = _table("hitting")
+    assert table.team_games[sampledata.TEAMS[0][0]] == 100
+    qualified = table.rank("avg", 100, qualified=True)
+    assert 0 < len(qualified) < len(table.rows)
+    assert qualified[0]["name"] == "Player 0"
+    assert {leader["league"] for leader in table.rank("avg", 100, league_id=104)} == {
+        "National League"
+    }
+
+    table = _table("pitching")
+    # lower is better, and innings pitched are counted in thirds
+    leaders = table.rank("era", 3, qualified=True)
+    assert [leader["value"] for leader in leaders] == ["2.00", "2.10", "2.20"]
+    assert stats._get_stat_value({"inningsPitched": "12.2"}, "inningsPitched") == (
+        12 + 2 / 3
+    )
+    assert stats._get_stat_value({"era": "-.--"}, "era") is None
+
+
+def test_rank_qualified_counting_stats():
+    json_data = sampledata.make_season_stats("pitching", num_players=20)
+    splits = json_data["stats"][0]["splits"]
+    # a closer: not enough innings to qualify for era, but counting stats rank everyone
+    closer = dict(splits[0], player={"id": 400001, "fullName": "Closer"})
+    closer["stat"] = dict(closer["stat"], inningsPitched="60.0", era="1.20", saves=40)
+    table = stats.StatsTable("pitching", splits + [closer])
+    table.team_games[closer["team"]["id"]] = 162
+    assert not table.is_qualified(table.rows[-1])
+    assert table.rank("saves", 1, qualified=True)[0]["name"] == "Closer"
+    assert "Closer" not in [
+        leader["name"] for leader in table.rank("era", 100, qualified=True)
+    ]
+
+
+def test_rank_traded_player():
+    json_data = sampledata.make_season_stats("pitching", num_players=20)
+    splits = json_data["stats"][0]["splits"]
+    # a pitcher traded in season: the combined row has no team
+    traded = dict(splits[0], player={"id": 400000, "fullName": "Traded Pitcher"})
+    del traded["team"]
+    traded["stat"] = dict(traded["stat"], inningsPitched="175.0", era="1.50")
+    table = stats.StatsTable("pitching", splits + [traded])
+    assert None not in table.team_games
+    leaders = table.rank("era", 1, qualified=True)
+    assert leaders[0]["name"] == "Traded Pitcher"
+
+
+def test_rank_fielding_combined():
+    team = {"id": 141, "name": "Blue Jays"}
+    league = {"id": 103, "name": "American League"}
+
+    def split(player_id, games, innings, assists, put_outs, errors, team=team):
+        stat = {
+            "gamesPlayed": games,
+            "innings": innings,
+            "assists": assists,
+            "putOuts": put_outs,
+            "errors": errors,
+            "chances": assists + put_outs + errors,
+        }
+        split = {"player": {"id": player_id, "fullName": str(player_id)}, "stat": stat}
+        if team:
+            split.update(team=team, league=league)
+        return split
+
+    splits = [
+        # a utility player, at two positions
+        split(1, 60, "500.1", 150, 50, 4),
+        split(1, 40, "300.2", 10, 90, 2),
+        split(2, 150, "1300.0", 180, 100, 5),
+        # a player traded in season: the team splits and the combined split
+        split(3, 50, "400.0", 120, 0, 3),
+        split(3, 50, "400.0", 100, 0, 3, team={"id": 147, "name": "Yankees"}),
+        split(3, 100, "800.0", 220, 0, 6, team=None),
+    ]
+    table = stats.StatsTable("fielding", splits)
+    assert len(table.rows) == 3
+    leaders = table.rank("assists", 3)
+    assert [(leader["name"], leader["value"]) for leader in leaders] == [
+        ("3", 220),
+        ("2", 180),
+        ("1", 160),
+    ]
+    stat = table.rows[0]["stat"]
+    assert stat["errors"] == 6 and stat["innings"] == "801.0"
+    assert stat["fielding"] == ".980"
+    assert stat["rangeFactorPerGame"] == "3.00"
+    assert stat["rangeFactorPer9Inn"] == "3.37"
+
+
+def test_local_league_stats(mlbv_config, monkeypatch, capsys):
+    mlbv_config.parser["stats_leaders"] = "local"
+    monkeypatch.setattr(stats, "STATS_TABLES", dict())
+    urls = list()
+
+    def request_json(url, output_filename, cache_stale=None):
+        urls.append(url)
+        query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+        return sampledata.make_season_stats(query["group"])
+
+    monkeypatch.setattr(request, "request_json", request_json)
+    stats.handle_league_stats("hitting", None, "2023", "5", None)
+    assert len(urls) == 1
+    out = capsys.readouterr().out
+    assert "AVERAGE" in out and "HOME RUNS" in out
+
+    # any stat can be ranked, from the same download
+    stats.handle_league_stats("hitting", None, "2023", "3", None, "babip")
+    assert len(urls) == 1
+    out = capsys.readouterr().out
+    assert "BABIP" in out and "AVERAGE" not in out
+
+
+def _team_tables(category="all"):
+    return stats._get_team_person_stats(
+        sampledata.make_person_stats(), sampledata.TEAMS[0][0], category
+    )
+
+
+def test_team_stats_table():
+    tables = _team_tables()
+    assert list(tables) == ["hitting", "fielding", "pitching"]
+    hitting = tables["hitting"]
+    # keyed by player id: players with the same name are both kept
+    rows = [row for row in hitting if hitting.names[row] == "Smith, J"]
+    assert sorted(hitting.player_ids[row] for row in rows) == [600002, 600003]
+    # numeric columns, only for the team's own splits
+    row = hitting.player_ids.index(600001)
+    assert hitting.columns["atBats"][row] == 299
+    assert hitting.columns["avg"][row] == 0.297
+    # pitchers without an at bat are left out
+    assert 600000 not in hitting.player_ids
+
+    pitching = tables["pitching"]
+    row = pitching.player_ids.index(600004)
+    assert pitching.columns["inningsPitched"][row] == 130 + 1 / 3
+    assert stats._format_team_stat("inningsPitched", 130 + 1 / 3) == "130.1"
+    assert stats._format_team_stat("avg", 0.297) == ".297"
+    assert stats._format_team_stat("era", 0.54) == "0.54"
+    assert stats._format_team_stat("whip", 0.9) == "0.90"
+    assert stats._format_team_stat("era", stats.NAN) == "-.--"
+    assert stats._format_team_stat("hits", stats.NAN) == "-"
+
+    fielding = tables["fielding"]
+    rows = [row for row in fielding if fielding.player_ids[row] == 600003]
+    assert [fielding.split_positions[row] for row in rows] == ["SS", "LF"]
+    assert list(_team_tables("pitching")) == ["pitching"]
+
+
+def test_team_stats_undefined_rates(capsys):
+    json_data = sampledata.make_person_stats()
+    pitcher = json_data["people"][24]  # no innings pitched: no ERA
+    pitching_stat = pitcher["stats"][2]["splits"][0]["stat"]
+    # no at bats against: statsapi has no average either
+    pitching_stat.update(hits=0, avg=".---", whip="-.--")
+    fielding_stat = pitcher["stats"][1]["splits"][0]["stat"]
+    fielding_stat.update(chances=0, fielding=".---")
+    stats._display_team_stats(
+        stats._get_team_person_stats(json_data, sampledata.TEAMS[0][0], "all"), "all"
+    )
+    lines = capsys.readouterr().out.splitlines()
+
+    # as shown from the statsapi strings
+    for stat, group_stats in (
+        (pitching_stat, stats.PITCHING_STATS),
+        (fielding_stat, stats.FIELDING_STATS),
+    ):
+        baseline = " ".join(fmt for _, _, fmt in group_stats).format(
+            *[str(stat.get(stat_name, "-")) for stat_name, _, _ in group_stats]
+        )
+        assert ".---" in baseline
+        assert any(
+            line.startswith(pitcher["lastInitName"]) and line.endswith(baseline)
+            for line in lines
+        )
+
+
+def test_team_stats_sort():
+    pitching = _team_tables("pitching")["pitching"]
+    rows = list(pitching)
+    # lower ERA is better, and no ERA sorts last
+    by_era = pitching.sort(rows, "era")
+    assert pitching.player_ids[by_era[0]] == 600000
+    assert pitching.player_ids[by_era[-1]] == 600024
+    assert pitching.sort(rows, "era", ascending=False)[:-1] == by_era[-2::-1]
+    by_strikeouts = pitching.sort(rows, "strikeOuts")
+    assert pitching.player_ids[by_strikeouts[0]] == 600000
+
+    percentiles = pitching.percentiles(by_era, "era")
+    assert percentiles[0] > percentiles[1] > percentiles[-2] > 0
+    assert percentiles[-1] != percentiles[-1]  # NaN
+    assert stats._parse_sort("era:asc") == ("era", True)
+    assert stats._parse_sort("so:d") == ("so", False)
+    assert pitching.get_stat_name("so") == "strikeOuts"
+    assert pitching.get_stat_name("babip") is None
+
+
+def test_display_team_stats(capsys):
+    tables = _team_tables()
+    stats._display_team_stats(tables, "all")
+    out = capsys.readouterr().out
+    assert out.count("Smith, J") == 5
+    assert "PCT" not in out
+
+    stats._display_team_stats(_team_tables("hitting"), "hitting", "ops", 2)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1].endswith("PCT")
+    assert lines[2].startswith("Player01, P") and lines[2].endswith(" 96")
+    assert len(lines) == 8
+
+
+def test_person_stats_chunked(mlbv_config, monkeypatch):
+    monkeypatch.setattr(request, "CACHE", request.MemoryCache())
+    monkeypatch.setattr(request, "CACHE_STORE", None)
+    monkeypatch.setattr(request, "CACHEDIR", None)
+    monkeypatch.setattr(request, "CACHE_SHARDS", set())
+    batches = list()  # the person ids of each request, per request_json_many call
+
+    def request_json_many(jobs, max_workers=None):
+        batches.append(list())
+        results = list()
+        for url, _, _ in jobs:
+            query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+            person_ids = [pid for pid in query["personIds"].split(",") if pid]
+            batches[-1].append(person_ids)
+            people = [
+                {"id": int(pid), "lastInitName": pid}
+                for pid in person_ids
+                if pid != "999"  # no such player
+            ]
+            results.append(({"copyright": "Copyright notice", "people": people}, None))
+        return results
+
+    monkeypatch.setattr(request, "request_json_many", request_json_many)
+    roster = [str(person_id) for person_id in range(600044, 599999, -1)]
+    json_data = stats._get_person_stats(roster, "all", "2023")
+    # in sorted chunks, all fetched together
+    assert [len(person_ids) for person_ids in batches[0]] == [20, 20, 5]
+    assert batches[0][0][0] == "600000"
+    assert [str(person["id"]) for person in json_data["people"]] == roster
+
+    # all cached by player
+    assert stats._get_person_stats(roster, "all", "2023") == json_data
+    assert batches[1] == []
+
+    # a roster change only fetches the new player, and other teams share the cache
+    stats._get_person_stats(roster[1:] + ["600100", "999"], "all", "2023")
+    assert batches[2] == [["999", "600100"]]
+    json_data = stats._get_person_stats(["600100", "600001", "999"], "all", "2023")
+    assert batches[3] == []
+    assert [person["id"] for person in json_data["people"]] == [600100, 600001]
+
+    # each stats group has its own entries
+    stats._get_person_stats(["600001"], "pitching", "2023")
+    assert batches[4] == [["600001"]]
@@ -1,6 +1,10 @@
 """pytest test cases for the util module
 """
 
+import datetime
+
+from dateutil import parser
+
 from mlbv.mlbam.common import util
 
 
@@ -8,3 +12,14 @@ def test_csv_list():
     list1 = ["e1", "e2", "e3"]
     string1 = "e1, e2, e3"
     assert list1[1] == util.get_csv_list(string1)[1]
+
+
+def test_parse_datetime():
+    for value in (
+        "2023-07-01T23:05:00Z",
+        "2023-07-01T23:05:07.123Z",
+        "2023-07-01T23:05:07+00:00",  # not the statsapi format: via dateutil
+        "July 1 2023 7:05pm",
+    ):
+        assert util.parse_datetime(value) == parser.parse(value)
+    assert util.parse_datetime("2023-07-01T23:05:00Z").tzinfo == datetime.timezone.utc